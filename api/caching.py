@@ -0,0 +1,29 @@
+import hashlib
+
+from starlette.requests import Request
+
+from config.settings import Settings
+
+
+def make_etag(*parts: object) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def content_etag(content: bytes) -> str:
+    return f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+def cache_headers(etag: str, settings: Settings) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"{settings.http_cache_scope}, max-age={settings.http_cache_max_age}",
+    }
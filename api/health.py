@@ -0,0 +1,23 @@
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from starlette import status
+
+from config.containers import Container
+from config.lifecycle import Lifecycle
+
+health_router = APIRouter(prefix="/health")
+
+
+@health_router.get("/live", include_in_schema=False)
+async def live() -> JSONResponse:
+    return JSONResponse({"status": "ok"})
+
+
+@health_router.get("/ready", include_in_schema=False)
+@inject
+async def ready(lifecycle: Lifecycle = Depends(Provide[Container.lifecycle])) -> JSONResponse:
+    if lifecycle.ready:
+        return JSONResponse({"status": "ready"})
+    state = "draining" if lifecycle.draining else "starting"
+    return JSONResponse({"status": state}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
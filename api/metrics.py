@@ -0,0 +1,82 @@
+import time
+from collections.abc import Iterable
+
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.containers import Container
+from config.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, Labels, MultiprocessMetrics, ProcessStats, process_stats
+from infrastructure.cache import LRUCache
+
+metrics_router = APIRouter()
+
+DB_POOL = Gauge("db_pool", "Database connection pool stats", ["stat"], multiprocess_mode="liveall")
+DB_REPLICA = Gauge("db_replica", "Read replica sessions and health", ["replica", "stat"], multiprocess_mode="liveall")
+CACHE = Gauge("cache", "In-process cache stats", ["cache", "stat"], multiprocess_mode="liveall")
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+@inject
+async def metrics(metrics: MultiprocessMetrics = Depends(Provide[Container.metrics])) -> Response:
+    return Response(await metrics.render(), media_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """Records latency of HTTP requests by route template and number of requests in flight"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # route template keeps label cardinality bounded, unmatched paths are reported together
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(method=scope["method"], route=route, status=status_code).observe(
+                time.perf_counter() - started
+            )
+
+
+def register_container_metrics(container: Container, stats: ProcessStats = process_stats) -> None:
+    def pool_stats() -> Iterable[tuple[Labels, float]]:
+        return [((name,), value) for name, value in container.db().pool_stats().items()]
+
+    def replica_stats() -> Iterable[tuple[Labels, float]]:
+        for replica, stats in container.db().replica_stats().items():
+            for name, value in stats.items():
+                yield (replica, name), value
+
+    def cache_stats() -> Iterable[tuple[Labels, float]]:
+        caches: dict[str, LRUCache] = {
+            "company": container.company_cache(),
+            "company_list": container.company_list_cache(),
+        }
+        for name, cache in caches.items():
+            lookups = cache.hits + cache.misses
+            yield (name, "hits"), cache.hits
+            yield (name, "misses"), cache.misses
+            yield (name, "size"), len(cache)
+            yield (name, "hit_ratio"), cache.hits / lookups if lookups else 0.0
+
+    stats.add(DB_POOL, pool_stats)
+    stats.add(DB_REPLICA, replica_stats)
+    stats.add(CACHE, cache_stats)
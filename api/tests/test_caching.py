@@ -0,0 +1,29 @@
+from starlette.requests import Request
+
+from api.caching import cache_headers, is_not_modified, make_etag
+from config.settings import Settings
+
+
+def _request(if_none_match: str | None = None) -> Request:
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+class TestCaching:
+    def test_make_etag(self) -> None:
+        assert make_etag(1, 2) == make_etag(1, 2)
+        assert make_etag(1, 2) != make_etag(1, 3)
+        assert make_etag(1, 2).startswith('"')
+
+    def test_is_not_modified(self) -> None:
+        etag = make_etag(1, 1)
+        assert not is_not_modified(_request(), etag)
+        assert not is_not_modified(_request(make_etag(1, 2)), etag)
+        assert is_not_modified(_request(etag), etag)
+        assert is_not_modified(_request(f"{make_etag(1, 2)}, W/{etag}"), etag)
+        assert is_not_modified(_request("*"), etag)
+
+    def test_cache_headers(self) -> None:
+        settings = Settings(http_cache_max_age=30, http_cache_scope="public")
+        headers = cache_headers('"abc"', settings)
+        assert headers == {"ETag": '"abc"', "Cache-Control": "public, max-age=30"}
@@ -0,0 +1,47 @@
+from typing import Generator
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from dependency_injector import providers
+from httpx import AsyncClient
+from starlette import status
+
+from config.containers import Container
+from config.lifecycle import Lifecycle
+
+
+@pytest.fixture
+def lifecycle(container: Container) -> Generator[Lifecycle, None, None]:
+    lifecycle = Lifecycle(
+        db=MagicMock(),
+        company_db_repo=AsyncMock(),
+        company_repo=AsyncMock(),
+        activity_tree=AsyncMock(),
+        suggest_index=AsyncMock(),
+        warmup_companies=10,
+    )
+    container.lifecycle.override(providers.Object(lifecycle))
+    yield lifecycle
+
+
+@pytest.mark.asyncio
+class TestHealth:
+    async def test_live(self, guest_client: AsyncClient) -> None:
+        response = await guest_client.get("/health/live")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"status": "ok"}
+
+    async def test_ready(self, guest_client: AsyncClient, lifecycle: Lifecycle) -> None:
+        response = await guest_client.get("/health/ready")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json() == {"status": "starting"}
+
+        lifecycle.warmed_up = True
+        response = await guest_client.get("/health/ready")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"status": "ready"}
+
+        lifecycle.drain()
+        response = await guest_client.get("/health/ready")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json() == {"status": "draining"}
@@ -0,0 +1,23 @@
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+from config.containers import Container
+
+
+@pytest.mark.asyncio
+class TestMetrics:
+    async def test_metrics(self, guest_client: AsyncClient, container: Container) -> None:
+        await guest_client.get("/api/v1/companies/")
+        response = await guest_client.get("/metrics")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain")
+        lines = response.text.splitlines()
+        assert any(
+            x.startswith('http_request_duration_seconds_count{method="GET",route="')
+            and '/v1/companies/",status="401"}' in x
+            for x in lines
+        )
+        assert "http_requests_in_flight 1.0" in lines
+        assert any(x.startswith('db_pool{stat="checked_out"}') for x in lines)
+        assert any(x.startswith('cache{cache="company",stat="hit_ratio"}') for x in lines)
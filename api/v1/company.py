@@ -1,13 +1,27 @@
-import dataclasses
-
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette import status
 
+from api.caching import cache_headers, is_not_modified, make_etag
 from api.dependencies import token_auth
-from api.v1.schemas import CompanyResponse, CompanyListResponse, CompanySummaryResponse
+from api.v1.export import EXPORT_MEDIA_TYPES, ExportFormat, encode_companies
+from api.v1.schemas import (
+    CompanyBatchRequest,
+    CompanyBatchResponse,
+    CompanyResponse,
+    CompanyListResponse,
+)
+from api.v1.serializers import JSON_MEDIA_TYPE, encode_companies_list, encode_company, encode_company_batch
 from config.containers import Container
+from config.settings import Settings
+from domain.exceptions import InvalidCursorError, InvalidSortError
+from domain.models import CompanySort, CountMode, SearchMode
 from usecases.company import (
+    CompaniesExportUseCase,
+    CompaniesExportUseCaseRequest,
     CompaniesListUseCaseRequest,
+    GetCompaniesByIdsUseCase,
     GetCompanyByIdUseCase,
     CompaniesListUseCase,
 )
@@ -36,15 +50,27 @@ Filters companies by a particular activity ID.
 `/api/v1/companies/?activity_id=1`
 
 ## activity_children
-Used in pair with activity_id. If true takes into account 3 levels of activity depth. Defaults to false.
+Used in pair with activity_id. If true also includes companies of descendant activities. Defaults to false.
 
 `/api/v1/companies/?activity_id=1&activity_children=true`
 
+## activity_depth
+Used in pair with activity_children. Defines how many levels of descendant activities are taken into account.
+Defaults to 2, so 3 levels of activities are searched including the requested one.
+
+`/api/v1/companies/?activity_id=1&activity_children=true&activity_depth=3`
+
 ## name
 Search companies that contains provided string. Case insensitive.
 
 `/api/v1/companies/?name=test`
 
+## search_mode
+Used in pair with name. `substring` (default) searches the name for the provided string. `fulltext` searches by words
+with Russian morphology, words may be incomplete, results are ordered by relevance.
+
+`/api/v1/companies/?name=рога копы&search_mode=fulltext`
+
 ## lng, lat, radius
 Used together. Defines the longitude/latitude coordinate of the point and radius in meters within which to search for
 companies.
@@ -60,9 +86,117 @@ Used together. Defines the longitude/latitude coordinates of the rectangle withi
 Defines the offset for companies for pagination. Default to 0.
 
 `/api/v1/companies/?offset=10`
+
+## cursor
+Opaque pagination cursor. Pass `next_cursor` from the previous response to get the next page. Unlike offset, the cost
+of the request does not grow with the page number. `next_cursor` is null on the last page.
+
+`/api/v1/companies/?cursor=eyJpZCI6MTB9`
+
+## count
+Defines how `total` is calculated. `exact` (default) counts all matching companies, `estimate` returns the query
+planner estimate and sets `is_estimate` to true, `none` skips counting and returns null `total`.
+
+`/api/v1/companies/?count=estimate`
+
+## sort
+`id` (default) orders companies by ID. `distance` orders companies nearest first to the point given by lat and lng and
+returns `distance_m`, the distance in meters to the company building. May be combined with any filter, radius is not
+required.
+
+`/api/v1/companies/?lng=37.6173&lat=55.7558&sort=distance&activity_id=1`
 """
 
 
+@company_router.post(
+    "/batch/",
+    response_model=CompanyBatchResponse,
+    summary="Retrieve companies info by IDs",
+    description=(
+        "Returns detailed information about up to 500 companies in the order of requested IDs. "
+        "IDs of companies that do not exist are listed in `missing_ids`"
+    ),
+    dependencies=[Depends(token_auth)],
+)
+@inject
+async def get_companies_by_ids(
+    body: CompanyBatchRequest,
+    use_case: GetCompaniesByIdsUseCase = Depends(Provide[Container.get_companies_by_ids_uc]),
+) -> Response:
+    companies = await use_case.execute(body.ids)
+    found = {x.id for x in companies}
+    missing_ids = [x for x in dict.fromkeys(body.ids) if x not in found]
+    return Response(content=encode_company_batch(companies, missing_ids), media_type=JSON_MEDIA_TYPE)
+
+
+companies_export_description = """
+Streams all companies matching the filters as NDJSON (default) or CSV, ordered by ID. Filters are the same as for the
+companies list, there is no limit on the number of items.
+
+`/api/v1/companies/export/?activity_id=1&activity_children=true&format=csv`
+
+## after_id
+Resumes an interrupted export. Pass the ID of the last received company to get the companies after it.
+
+`/api/v1/companies/export/?after_id=1000`
+"""
+
+
+@company_router.get(
+    "/export/",
+    response_class=StreamingResponse,
+    summary="Export companies",
+    description=companies_export_description,
+    dependencies=[Depends(token_auth)],
+)
+@inject
+async def export_companies(
+    building_id: int | None = Query(None),
+    activity_id: int | None = Query(None),
+    activity_children: bool = Query(False),
+    activity_depth: int = Query(2, ge=0),
+    name: str | None = Query(None),
+    search_mode: SearchMode = Query(SearchMode.SUBSTRING),
+    lat: float | None = Query(None),
+    lng: float | None = Query(None),
+    radius: int | None = Query(None),
+    latx: float | None = Query(None),
+    lngx: float | None = Query(None),
+    laty: float | None = Query(None),
+    lngy: float | None = Query(None),
+    after_id: int | None = Query(None),
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    use_case: CompaniesExportUseCase = Depends(Provide[Container.companies_export_uc]),
+    settings: Settings = Depends(Provide[Container.settings]),
+) -> StreamingResponse:
+    request = CompaniesExportUseCaseRequest(
+        building_id=building_id,
+        activity_id=activity_id,
+        activity_children=activity_children,
+        activity_depth=activity_depth,
+        name=name,
+        search_mode=search_mode,
+        lat=lat,
+        lng=lng,
+        radius=radius,
+        latx=latx,
+        lngx=lngx,
+        laty=laty,
+        lngy=lngy,
+        after_id=after_id,
+    )
+    content = encode_companies(
+        use_case.execute(request),
+        export_format=export_format,
+        chunk_size=settings.company_export_batch_size,
+    )
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="companies.{export_format}"'},
+    )
+
+
 @company_router.get(
     "/{company_id}/",
     response_model=CompanyResponse,
@@ -73,12 +207,17 @@ Defines the offset for companies for pagination. Default to 0.
 @inject
 async def get_company_by_id(
     company_id: int,
+    request: Request,
     use_case: GetCompanyByIdUseCase = Depends(Provide[Container.get_company_by_id_uc]),
-) -> CompanyResponse:
+    settings: Settings = Depends(Provide[Container.settings]),
+) -> Response:
     company = await use_case.execute(company_id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
-    return CompanyResponse.model_validate(dataclasses.asdict(company))
+    headers = cache_headers(make_etag(company.id, company.version), settings)
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=encode_company(company), media_type=JSON_MEDIA_TYPE, headers=headers)
 
 
 @company_router.get(
@@ -90,10 +229,13 @@ async def get_company_by_id(
 )
 @inject
 async def list_companies(
+    request: Request,
     building_id: int | None = Query(None),
     activity_id: int | None = Query(None),
     activity_children: bool = Query(False),
+    activity_depth: int = Query(2, ge=0),
     name: str | None = Query(None),
+    search_mode: SearchMode = Query(SearchMode.SUBSTRING),
     lat: float | None = Query(None),
     lng: float | None = Query(None),
     radius: int | None = Query(None),
@@ -101,14 +243,19 @@ async def list_companies(
     lngx: float | None = Query(None),
     laty: float | None = Query(None),
     lngy: float | None = Query(None),
-    offset: int = Query(0),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None),
+    count: CountMode = Query(CountMode.EXACT),
+    sort: CompanySort = Query(CompanySort.ID),
     use_case: CompaniesListUseCase = Depends(Provide[Container.companies_list_uc]),
-) -> CompanyListResponse:
-    request = CompaniesListUseCaseRequest(
+    settings: Settings = Depends(Provide[Container.settings]),
+) -> Response:
+    use_case_request = CompaniesListUseCaseRequest(
         building_id=building_id,
         activity_id=activity_id,
         activity_children=activity_children,
         name=name,
+        search_mode=search_mode,
         lat=lat,
         lng=lng,
         radius=radius,
@@ -117,7 +264,19 @@ async def list_companies(
         laty=laty,
         lngy=lngy,
         offset=offset,
+        cursor=cursor,
+        count=count,
+        activity_depth=activity_depth,
+        sort=sort,
     )
-    response = await use_case.execute(request)
-    items = [CompanySummaryResponse.model_validate(x, from_attributes=True) for x in response.items]
-    return CompanyListResponse(items=items, total=response.total)
+    try:
+        result = await use_case.execute(use_case_request)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except InvalidSortError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # revalidated from the domain objects, the body is only encoded when it is sent
+    headers = cache_headers(make_etag(result.items, result.total, result.next_cursor, result.is_estimate), settings)
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=encode_companies_list(result), media_type=JSON_MEDIA_TYPE, headers=headers)
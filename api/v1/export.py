@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from enum import StrEnum
+
+from domain.models import CompanySummary
+
+
+class ExportFormat(StrEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+EXPORT_FIELDS = ["id", "name", "legal_form"]
+
+
+async def encode_companies(
+    companies: AsyncIterator[CompanySummary],
+    export_format: ExportFormat,
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    """
+    Encodes companies to NDJSON or CSV lines. Lines are sent by chunks of `chunk_size` rows, the next chunk is not
+    read from the database until the previous one is handed over to the client
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == ExportFormat.CSV else None
+    if writer is not None:
+        writer.writerow(EXPORT_FIELDS)
+
+    rows = 0
+    async for company in companies:
+        row = {x: getattr(company, x) for x in EXPORT_FIELDS}
+        if writer is not None:
+            writer.writerow(row.values())
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False))
+            buffer.write("\n")
+        rows += 1
+        if rows % chunk_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
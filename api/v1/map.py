@@ -0,0 +1,110 @@
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from starlette import status
+
+from api.caching import cache_headers, content_etag, is_not_modified
+from api.dependencies import token_auth
+from api.v1.schemas import MapClusterListResponse
+from api.v1.serializers import JSON_MEDIA_TYPE, encode_map_clusters
+from config.containers import Container
+from config.settings import Settings
+from domain.exceptions import MapAreaTooLargeError
+from usecases.map import MapClustersUseCase, MapClustersUseCaseRequest, MapTileUseCase, MapTileUseCaseRequest
+
+map_router = APIRouter(prefix="/v1")
+
+map_clusters_description = """
+Returns companies aggregated into clusters of a grid for the bounding box and the map zoom level. Each cluster has the
+number of companies and their centroid. A grid cell is 1/8 of a map tile wide at the zoom level. Clusters of zoom
+levels up to 12 are precomputed and refreshed periodically, so counts may lag behind recent changes. A bounding box
+spanning more map tiles at the zoom level than the configured limit (256 by default) is rejected with 400.
+
+`/api/v1/map/clusters/?lngx=19.6&latx=41.2&lngy=180&laty=81.9&zoom=3`
+"""
+
+
+@map_router.get(
+    "/map/clusters/",
+    response_model=MapClusterListResponse,
+    summary="Retrieve map clusters",
+    description=map_clusters_description,
+    dependencies=[Depends(token_auth)],
+)
+@inject
+async def map_clusters(
+    request: Request,
+    latx: float = Query(..., ge=-90, le=90),
+    lngx: float = Query(..., ge=-180, le=180),
+    laty: float = Query(..., ge=-90, le=90),
+    lngy: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+    use_case: MapClustersUseCase = Depends(Provide[Container.map_clusters_uc]),
+    settings: Settings = Depends(Provide[Container.settings]),
+) -> Response:
+    try:
+        clusters = await use_case.execute(
+            MapClustersUseCaseRequest(latx=latx, lngx=lngx, laty=laty, lngy=lngy, zoom=zoom)
+        )
+    except MapAreaTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    content = encode_map_clusters(clusters)
+    headers = cache_headers(content_etag(content), settings)
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=content, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+map_tile_description = """
+Returns a Mapbox vector tile with the `buildings` layer. Each feature is a building point with `address`, `companies`,
+the number of its companies, and `activity_ids`, comma separated IDs of their activities. The busiest buildings are
+kept when the tile has more of them than the configured limit. Empty tiles are returned as 204 No Content.
+
+`/api/v1/tiles/10/619/320.mvt`
+
+## activity_id, activity_children, activity_depth
+Only buildings with companies of the activity are included, same as for the companies list.
+
+`/api/v1/tiles/10/619/320.mvt?activity_id=1&activity_children=true`
+"""
+
+
+@map_router.get(
+    "/tiles/{z}/{x}/{y}.mvt",
+    response_class=Response,
+    responses={200: {"content": {MVT_MEDIA_TYPE: {}}}},
+    summary="Retrieve a vector tile of buildings",
+    description=map_tile_description,
+    dependencies=[Depends(token_auth)],
+)
+@inject
+async def map_tile(
+    request: Request,
+    z: int = Path(..., ge=0, le=22),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    activity_id: int | None = Query(None),
+    activity_children: bool = Query(False),
+    activity_depth: int = Query(2, ge=0),
+    use_case: MapTileUseCase = Depends(Provide[Container.map_tile_uc]),
+    settings: Settings = Depends(Provide[Container.settings]),
+) -> Response:
+    if x >= 2**z or y >= 2**z:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tile not found")
+    tile = await use_case.execute(
+        MapTileUseCaseRequest(
+            z=z,
+            x=x,
+            y=y,
+            activity_id=activity_id,
+            activity_children=activity_children,
+            activity_depth=activity_depth,
+        )
+    )
+    headers = cache_headers(content_etag(tile), settings)
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if not tile:
+        return Response(status_code=status.HTTP_204_NO_CONTENT, headers=headers)
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers=headers)
@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+COMPANY_BATCH_MAX_SIZE = 500
+SUGGEST_MAX_LIMIT = 20
 
 
 class PhoneResponse(BaseModel):
@@ -28,12 +31,44 @@ class CompanyResponse(BaseModel):
     activities: list[ActivityResponse]
 
 
+class CompanyBatchRequest(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=COMPANY_BATCH_MAX_SIZE)
+
+
+class CompanyBatchResponse(BaseModel):
+    items: list[CompanyResponse]
+    missing_ids: list[int]
+
+
 class CompanySummaryResponse(BaseModel):
     id: int
     name: str
     legal_form: str
+    distance_m: float | None = None
 
 
 class CompanyListResponse(BaseModel):
     items: list[CompanySummaryResponse]
-    total: int
+    total: int | None
+    next_cursor: str | None = None
+    is_estimate: bool = False
+
+
+class NameSuggestionResponse(BaseModel):
+    id: int
+    name: str
+
+
+class SuggestResponse(BaseModel):
+    companies: list[NameSuggestionResponse]
+    activities: list[NameSuggestionResponse]
+
+
+class MapClusterResponse(BaseModel):
+    count: int
+    latitude: float
+    longitude: float
+
+
+class MapClusterListResponse(BaseModel):
+    items: list[MapClusterResponse]
@@ -0,0 +1,55 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from pydantic import TypeAdapter
+
+from domain.models import Company, MapCluster, Suggestions
+from usecases.company import CompaniesListUseCaseResponse
+
+# Domain objects are dumped to JSON bytes by pydantic-core in one pass, without copying them into dicts and validating
+# them into response models first. Fields of the domain models match the response schemas, which are kept for the API
+# description, tests compare both outputs.
+
+JSON_MEDIA_TYPE = "application/json"
+COMPANY_EXCLUDE = {"version"}
+
+
+@dataclass
+class CompanyBatch:
+    items: Sequence[Company]
+    missing_ids: list[int]
+
+
+@dataclass
+class MapClusterList:
+    items: Sequence[MapCluster]
+
+
+company_adapter = TypeAdapter(Company)
+company_batch_adapter = TypeAdapter(CompanyBatch)
+companies_list_adapter = TypeAdapter(CompaniesListUseCaseResponse)
+suggestions_adapter = TypeAdapter(Suggestions)
+map_cluster_list_adapter = TypeAdapter(MapClusterList)
+
+
+def encode_company(company: Company) -> bytes:
+    return company_adapter.dump_json(company, exclude=COMPANY_EXCLUDE)
+
+
+def encode_company_batch(companies: Sequence[Company], missing_ids: list[int]) -> bytes:
+    return company_batch_adapter.dump_json(
+        CompanyBatch(items=companies, missing_ids=missing_ids),
+        exclude={"items": {"__all__": COMPANY_EXCLUDE}},
+    )
+
+
+def encode_companies_list(result: CompaniesListUseCaseResponse) -> bytes:
+    return companies_list_adapter.dump_json(result)
+
+
+def encode_suggestions(suggestions: Suggestions) -> bytes:
+    return suggestions_adapter.dump_json(suggestions)
+
+
+def encode_map_clusters(clusters: Sequence[MapCluster]) -> bytes:
+    return map_cluster_list_adapter.dump_json(MapClusterList(items=clusters))
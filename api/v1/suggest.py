@@ -0,0 +1,34 @@
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends, Query, Response
+
+from api.dependencies import token_auth
+from api.v1.schemas import SUGGEST_MAX_LIMIT, SuggestResponse
+from api.v1.serializers import JSON_MEDIA_TYPE, encode_suggestions
+from config.containers import Container
+from usecases.suggest import SuggestUseCase
+
+suggest_router = APIRouter(prefix="/v1/suggest")
+
+suggest_description = """
+Returns up to `limit` companies and activities whose name has a word starting with the provided prefix. Case
+insensitive, intended for autocomplete on every keystroke. Newly added companies appear within a few seconds.
+
+`/api/v1/suggest/?q=рог&limit=5`
+"""
+
+
+@suggest_router.get(
+    "/",
+    response_model=SuggestResponse,
+    summary="Suggest company and activity names",
+    description=suggest_description,
+    dependencies=[Depends(token_auth)],
+)
+@inject
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=SUGGEST_MAX_LIMIT),
+    use_case: SuggestUseCase = Depends(Provide[Container.suggest_uc]),
+) -> Response:
+    suggestions = await use_case.execute(q, limit)
+    return Response(content=encode_suggestions(suggestions), media_type=JSON_MEDIA_TYPE)
@@ -1,5 +1,5 @@
 from typing import Generator
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
@@ -18,3 +18,38 @@ def companies_list_mock(container: Container) -> Generator[AsyncMock, None, None
     mock = AsyncMock()
     container.companies_list_uc.override(mock)
     yield mock
+
+
+@pytest.fixture
+def get_companies_by_ids_mock(container: Container) -> Generator[AsyncMock, None, None]:
+    mock = AsyncMock()
+    container.get_companies_by_ids_uc.override(mock)
+    yield mock
+
+
+@pytest.fixture
+def companies_export_mock(container: Container) -> Generator[MagicMock, None, None]:
+    mock = MagicMock()
+    container.companies_export_uc.override(mock)
+    yield mock
+
+
+@pytest.fixture
+def suggest_mock(container: Container) -> Generator[AsyncMock, None, None]:
+    mock = AsyncMock()
+    container.suggest_uc.override(mock)
+    yield mock
+
+
+@pytest.fixture
+def map_clusters_mock(container: Container) -> Generator[AsyncMock, None, None]:
+    mock = AsyncMock()
+    container.map_clusters_uc.override(mock)
+    yield mock
+
+
+@pytest.fixture
+def map_tile_mock(container: Container) -> Generator[AsyncMock, None, None]:
+    mock = AsyncMock()
+    container.map_tile_uc.override(mock)
+    yield mock
@@ -1,4 +1,6 @@
-from unittest.mock import AsyncMock
+import json
+from collections.abc import AsyncIterator
+from unittest.mock import AsyncMock, MagicMock, patch
 from urllib.parse import urlencode
 
 import pytest
@@ -6,8 +8,14 @@ from httpx import AsyncClient
 from starlette import status
 
 from api.v1.schemas import CompanyResponse, CompanyListResponse, CompanySummaryResponse
+from domain.exceptions import InvalidCursorError, InvalidSortError
+from domain.models import CompanySort, CompanySummary, CountMode, SearchMode
 from domain.tests.factories import CompanyFactory, CompanySummaryFactory
-from usecases.company import CompaniesListUseCaseResponse, CompaniesListUseCaseRequest
+from usecases.company import (
+    CompaniesExportUseCaseRequest,
+    CompaniesListUseCaseResponse,
+    CompaniesListUseCaseRequest,
+)
 
 
 @pytest.mark.asyncio
@@ -38,6 +46,81 @@ class TestGetCompanyById:
         assert response.status_code == status.HTTP_404_NOT_FOUND
         get_company_by_id_mock.execute.assert_awaited_once_with(1)
 
+    async def test_not_modified(self, get_company_by_id_mock: AsyncMock, client: AsyncClient) -> None:
+        get_company_by_id_mock.execute.return_value = CompanyFactory(version=1)
+        request_response = await client.get("/api/v1/companies/1/")
+        assert request_response.status_code == status.HTTP_200_OK
+        etag = request_response.headers["etag"]
+        assert "max-age" in request_response.headers["cache-control"]
+
+        request_response = await client.get("/api/v1/companies/1/", headers={"If-None-Match": etag})
+        assert request_response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert request_response.headers["etag"] == etag
+        assert request_response.content == b""
+
+        get_company_by_id_mock.execute.return_value.version = 2
+        request_response = await client.get("/api/v1/companies/1/", headers={"If-None-Match": etag})
+        assert request_response.status_code == status.HTTP_200_OK
+        assert request_response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+class TestGetCompaniesByIds:
+    async def test_unauthorized_no_token(self, guest_client: AsyncClient) -> None:
+        request_response = await guest_client.post("/api/v1/companies/batch/", json={"ids": [1]})
+        assert request_response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_found(self, get_companies_by_ids_mock: AsyncMock, client: AsyncClient) -> None:
+        companies = CompanyFactory.build_batch(size=2)
+        get_companies_by_ids_mock.execute.return_value = companies
+        ids = [companies[1].id, -1, companies[0].id]
+        request_response = await client.post("/api/v1/companies/batch/", json={"ids": ids})
+        assert request_response.status_code == status.HTTP_200_OK
+        data = request_response.json()
+        assert [CompanyResponse(**x) for x in data["items"]] == [
+            CompanyResponse.model_validate(x, from_attributes=True) for x in companies
+        ]
+        assert data["missing_ids"] == [-1]
+        get_companies_by_ids_mock.execute.assert_awaited_once_with(ids)
+
+    async def test_too_many_ids(self, get_companies_by_ids_mock: AsyncMock, client: AsyncClient) -> None:
+        request_response = await client.post("/api/v1/companies/batch/", json={"ids": list(range(501))})
+        assert request_response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        get_companies_by_ids_mock.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+class TestExportCompanies:
+    async def test_unauthorized_no_token(self, guest_client: AsyncClient) -> None:
+        request_response = await guest_client.get("/api/v1/companies/export/")
+        assert request_response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_ndjson(self, companies_export_mock: MagicMock, client: AsyncClient) -> None:
+        companies = CompanySummaryFactory.build_batch(size=3)
+
+        async def execute(request: CompaniesExportUseCaseRequest) -> AsyncIterator[CompanySummary]:
+            for company in companies:
+                yield company
+
+        companies_export_mock.execute.side_effect = execute
+        request_response = await client.get("/api/v1/companies/export/?activity_id=1&after_id=10")
+        assert request_response.status_code == status.HTTP_200_OK
+        assert request_response.headers["content-type"] == "application/x-ndjson"
+        lines = request_response.text.splitlines()
+        assert [json.loads(x)["id"] for x in lines] == [x.id for x in companies]
+        expected_request = CompaniesExportUseCaseRequest(activity_id=1, after_id=10)
+        companies_export_mock.execute.assert_called_once_with(expected_request)
+
+    async def test_csv(self, companies_export_mock: MagicMock, client: AsyncClient) -> None:
+        async def execute(request: CompaniesExportUseCaseRequest) -> AsyncIterator[CompanySummary]:
+            yield CompanySummaryFactory()
+
+        companies_export_mock.execute.side_effect = execute
+        request_response = await client.get("/api/v1/companies/export/?format=csv")
+        assert request_response.status_code == status.HTTP_200_OK
+        assert request_response.headers["content-type"].startswith("text/csv")
+        assert request_response.text.splitlines()[0] == "id,name,legal_form"
+
 
 @pytest.mark.asyncio
 class TestCompaniesList:
@@ -80,6 +163,7 @@ class TestCompaniesList:
             laty=None,
             lngy=None,
             offset=0,
+            cursor=None,
         )
         companies_list_mock.execute.assert_awaited_once_with(expected_request)
 
@@ -104,6 +188,9 @@ class TestCompaniesList:
             laty=66.66,
             lngy=77.77,
             offset=8,
+            cursor="eyJpZCI6MTB9",
+            count="estimate",
+            activity_depth=3,
         )
         request_response = await client.get(f"/api/v1/companies/?{urlencode(params)}")
         assert request_response.status_code == status.HTTP_200_OK
@@ -117,3 +204,75 @@ class TestCompaniesList:
         params["activity_children"] = True
         expected_request = CompaniesListUseCaseRequest(**params)  # type: ignore[arg-type]
         companies_list_mock.execute.assert_awaited_once_with(expected_request)
+
+    async def test_next_cursor(self, companies_list_mock: AsyncMock, client: AsyncClient) -> None:
+        companies = CompanySummaryFactory.build_batch(size=10)
+        companies_list_mock.execute.return_value = CompaniesListUseCaseResponse(
+            items=companies,
+            total=15,
+            next_cursor="eyJpZCI6MTB9",
+        )
+        request_response = await client.get("/api/v1/companies/")
+        assert request_response.status_code == status.HTTP_200_OK
+        assert request_response.json()["next_cursor"] == "eyJpZCI6MTB9"
+
+    async def test_invalid_cursor(self, companies_list_mock: AsyncMock, client: AsyncClient) -> None:
+        companies_list_mock.execute.side_effect = InvalidCursorError("wrong")
+        request_response = await client.get("/api/v1/companies/?cursor=wrong")
+        assert request_response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_negative_offset(self, companies_list_mock: AsyncMock, client: AsyncClient) -> None:
+        request_response = await client.get("/api/v1/companies/?offset=-10")
+        assert request_response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        companies_list_mock.execute.assert_not_awaited()
+
+    async def test_search_mode(self, companies_list_mock: AsyncMock, client: AsyncClient) -> None:
+        companies_list_mock.execute.return_value = CompaniesListUseCaseResponse(items=[], total=0)
+        request_response = await client.get("/api/v1/companies/?name=рога&search_mode=fulltext")
+        assert request_response.status_code == status.HTTP_200_OK
+        assert companies_list_mock.execute.await_args.args[0].search_mode == SearchMode.FULLTEXT
+
+        request_response = await client.get("/api/v1/companies/?name=рога&search_mode=wrong")
+        assert request_response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    async def test_sort_distance(self, companies_list_mock: AsyncMock, client: AsyncClient) -> None:
+        companies_list_mock.execute.return_value = CompaniesListUseCaseResponse(
+            items=[CompanySummary(id=1, name="Рога", legal_form="ООО", distance_m=12.5)],
+            total=1,
+        )
+        request_response = await client.get("/api/v1/companies/?lat=55.75&lng=37.61&sort=distance")
+        assert request_response.status_code == status.HTTP_200_OK
+        assert request_response.json()["items"][0]["distance_m"] == 12.5
+        assert companies_list_mock.execute.await_args.args[0].sort == CompanySort.DISTANCE
+
+        companies_list_mock.execute.side_effect = InvalidSortError("Sorting by distance requires lat and lng")
+        request_response = await client.get("/api/v1/companies/?sort=distance")
+        assert request_response.status_code == status.HTTP_400_BAD_REQUEST
+
+        request_response = await client.get("/api/v1/companies/?sort=wrong")
+        assert request_response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    async def test_not_modified(self, companies_list_mock: AsyncMock, client: AsyncClient) -> None:
+        companies_list_mock.execute.return_value = CompaniesListUseCaseResponse(
+            items=CompanySummaryFactory.build_batch(size=2),
+            total=2,
+        )
+        request_response = await client.get("/api/v1/companies/")
+        etag = request_response.headers["etag"]
+        # revalidated without encoding the body
+        with patch("api.v1.company.encode_companies_list") as encode_mock:
+            request_response = await client.get("/api/v1/companies/", headers={"If-None-Match": etag})
+        assert request_response.status_code == status.HTTP_304_NOT_MODIFIED
+        encode_mock.assert_not_called()
+
+    async def test_count_none(self, companies_list_mock: AsyncMock, client: AsyncClient) -> None:
+        companies_list_mock.execute.return_value = CompaniesListUseCaseResponse(
+            items=CompanySummaryFactory.build_batch(size=2),
+            total=None,
+        )
+        request_response = await client.get("/api/v1/companies/?count=none")
+        assert request_response.status_code == status.HTTP_200_OK
+        data = request_response.json()
+        assert data["total"] is None
+        assert data["is_estimate"] is False
+        assert companies_list_mock.execute.await_args.args[0].count == CountMode.NONE
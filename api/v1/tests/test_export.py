@@ -0,0 +1,36 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+
+import pytest
+
+from api.v1.export import ExportFormat, encode_companies
+from domain.models import CompanySummary
+from domain.tests.factories import CompanySummaryFactory
+
+
+async def _iterate(companies: list[CompanySummary]) -> AsyncIterator[CompanySummary]:
+    for company in companies:
+        yield company
+
+
+@pytest.mark.asyncio
+class TestEncodeCompanies:
+    async def test_ndjson(self) -> None:
+        companies = CompanySummaryFactory.build_batch(size=5)
+        chunks = [x async for x in encode_companies(_iterate(companies), ExportFormat.NDJSON, chunk_size=2)]
+        assert len(chunks) == 3
+        lines = b"".join(chunks).decode().splitlines()
+        assert [json.loads(x) for x in lines] == [
+            {"id": x.id, "name": x.name, "legal_form": x.legal_form} for x in companies
+        ]
+
+    async def test_csv(self) -> None:
+        companies = CompanySummaryFactory.build_batch(size=3)
+        chunks = [x async for x in encode_companies(_iterate(companies), ExportFormat.CSV, chunk_size=10)]
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        assert rows == [["id", "name", "legal_form"]] + [[str(x.id), x.name, x.legal_form] for x in companies]
+
+    async def test_empty(self) -> None:
+        assert [x async for x in encode_companies(_iterate([]), ExportFormat.NDJSON, chunk_size=10)] == []
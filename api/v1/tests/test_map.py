@@ -0,0 +1,82 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+from domain.exceptions import MapAreaTooLargeError
+from domain.models import MapCluster
+from usecases.map import MapClustersUseCaseRequest, MapTileUseCaseRequest
+
+BBOX = {"latx": 41.2, "lngx": 19.6, "laty": 81.9, "lngy": 180, "zoom": 3}
+
+
+@pytest.mark.asyncio
+class TestMapClusters:
+    async def test_unauthorized(self, guest_client: AsyncClient) -> None:
+        response = await guest_client.get("/api/v1/map/clusters/", params=BBOX)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_clusters(self, map_clusters_mock: AsyncMock, client: AsyncClient) -> None:
+        map_clusters_mock.execute.return_value = [MapCluster(count=4, latitude=55.75, longitude=37.61)]
+        response = await client.get("/api/v1/map/clusters/", params=BBOX)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"items": [{"count": 4, "latitude": 55.75, "longitude": 37.61}]}
+        map_clusters_mock.execute.assert_awaited_once_with(
+            MapClustersUseCaseRequest(latx=41.2, lngx=19.6, laty=81.9, lngy=180, zoom=3)
+        )
+
+        etag = response.headers["etag"]
+        response = await client.get("/api/v1/map/clusters/", params=BBOX, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    async def test_area_too_large(self, map_clusters_mock: AsyncMock, client: AsyncClient) -> None:
+        map_clusters_mock.execute.side_effect = MapAreaTooLargeError(
+            "Bounding box spans more than 256 tiles at zoom 18"
+        )
+        response = await client.get("/api/v1/map/clusters/", params={**BBOX, "zoom": 18})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {"detail": "Bounding box spans more than 256 tiles at zoom 18"}
+
+    @pytest.mark.parametrize("params", [{"zoom": 3}, {**BBOX, "zoom": 30}, {**BBOX, "latx": 100}])
+    async def test_invalid_params(self, params: dict, map_clusters_mock: AsyncMock, client: AsyncClient) -> None:
+        response = await client.get("/api/v1/map/clusters/", params=params)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        map_clusters_mock.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+class TestMapTile:
+    async def test_unauthorized(self, guest_client: AsyncClient) -> None:
+        response = await guest_client.get("/api/v1/tiles/0/0/0.mvt")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_tile(self, map_tile_mock: AsyncMock, client: AsyncClient) -> None:
+        map_tile_mock.execute.return_value = b"\x1a\x02tile"
+        response = await client.get("/api/v1/tiles/10/619/320.mvt?activity_id=1&activity_children=true")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+        assert response.content == b"\x1a\x02tile"
+        map_tile_mock.execute.assert_awaited_once_with(
+            MapTileUseCaseRequest(z=10, x=619, y=320, activity_id=1, activity_children=True)
+        )
+
+        etag = response.headers["etag"]
+        assert "max-age" in response.headers["cache-control"]
+        response = await client.get(
+            "/api/v1/tiles/10/619/320.mvt?activity_id=1&activity_children=true", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    async def test_empty_tile(self, map_tile_mock: AsyncMock, client: AsyncClient) -> None:
+        map_tile_mock.execute.return_value = b""
+        response = await client.get("/api/v1/tiles/3/1/1.mvt")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert response.content == b""
+
+    async def test_out_of_range(self, map_tile_mock: AsyncMock, client: AsyncClient) -> None:
+        response = await client.get("/api/v1/tiles/1/2/0.mvt")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        response = await client.get("/api/v1/tiles/23/0/0.mvt")
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        map_tile_mock.execute.assert_not_awaited()
@@ -0,0 +1,69 @@
+import dataclasses
+import json
+import warnings
+from collections.abc import Generator
+
+import pytest
+
+from api.v1.schemas import (
+    CompanyBatchResponse,
+    CompanyListResponse,
+    CompanyResponse,
+    MapClusterListResponse,
+    SuggestResponse,
+)
+from api.v1.serializers import (
+    encode_companies_list,
+    encode_company,
+    encode_company_batch,
+    encode_map_clusters,
+    encode_suggestions,
+)
+from domain.models import CompanySummary, MapCluster, NameSuggestion, Suggestions
+from domain.tests.factories import CompanyFactory, CompanySummaryFactory
+from usecases.company import CompaniesListUseCaseResponse
+
+
+@pytest.fixture(autouse=True)
+def serialization_warnings_as_errors() -> Generator[None, None, None]:
+    # pydantic falls back to a generic encoding with a warning when a value does not match the field type
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        yield
+
+
+class TestSerializers:
+    def test_company(self) -> None:
+        company = CompanyFactory(version=3)
+        expected = CompanyResponse.model_validate(dataclasses.asdict(company)).model_dump(mode="json")
+        assert json.loads(encode_company(company)) == expected
+
+    def test_company_batch(self) -> None:
+        companies = CompanyFactory.build_batch(size=3)
+        expected = CompanyBatchResponse(
+            items=[CompanyResponse.model_validate(dataclasses.asdict(x)) for x in companies],
+            missing_ids=[10],
+        ).model_dump(mode="json")
+        assert json.loads(encode_company_batch(companies, [10])) == expected
+
+    @pytest.mark.parametrize("distance_m", [None, 12.5])
+    def test_companies_list(self, distance_m: float | None) -> None:
+        result = CompaniesListUseCaseResponse(
+            items=CompanySummaryFactory.build_batch(size=2, distance_m=distance_m)
+            + [CompanySummary(id=1, name='"Рога" и копыта', legal_form="ООО")],
+            total=30,
+            next_cursor="eyJpZCI6MTB9",
+            is_estimate=True,
+        )
+        expected = CompanyListResponse.model_validate(result, from_attributes=True).model_dump(mode="json")
+        assert json.loads(encode_companies_list(result)) == expected
+
+    def test_suggestions(self) -> None:
+        suggestions = Suggestions(companies=[NameSuggestion(id=1, name="Рога")], activities=[])
+        expected = SuggestResponse.model_validate(dataclasses.asdict(suggestions)).model_dump(mode="json")
+        assert json.loads(encode_suggestions(suggestions)) == expected
+
+    def test_map_clusters(self) -> None:
+        clusters = [MapCluster(count=2, latitude=55.75, longitude=37.61)]
+        expected = MapClusterListResponse(items=[dataclasses.asdict(x) for x in clusters]).model_dump(mode="json")
+        assert json.loads(encode_map_clusters(clusters)) == expected
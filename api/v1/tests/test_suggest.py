@@ -0,0 +1,42 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+from api.v1.schemas import SUGGEST_MAX_LIMIT
+from domain.models import NameSuggestion, Suggestions
+
+
+@pytest.mark.asyncio
+class TestSuggest:
+    async def test_unauthorized(self, guest_client: AsyncClient) -> None:
+        response = await guest_client.get("/api/v1/suggest/", params={"q": "рог"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_suggest(self, suggest_mock: AsyncMock, client: AsyncClient) -> None:
+        suggest_mock.execute.return_value = Suggestions(
+            companies=[NameSuggestion(id=1, name="Рога и копыта")],
+            activities=[NameSuggestion(id=2, name="Рогатки")],
+        )
+        response = await client.get("/api/v1/suggest/", params={"q": "рог", "limit": 5})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "companies": [{"id": 1, "name": "Рога и копыта"}],
+            "activities": [{"id": 2, "name": "Рогатки"}],
+        }
+        suggest_mock.execute.assert_awaited_once_with("рог", 5)
+
+    @pytest.mark.parametrize(
+        "params", [{}, {"q": ""}, {"q": "рог", "limit": 0}, {"q": "рог", "limit": SUGGEST_MAX_LIMIT + 1}]
+    )
+    async def test_invalid_params(self, params: dict, suggest_mock: AsyncMock, client: AsyncClient) -> None:
+        response = await client.get("/api/v1/suggest/", params=params)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        suggest_mock.execute.assert_not_awaited()
+
+    async def test_default_limit(self, suggest_mock: AsyncMock, client: AsyncClient) -> None:
+        suggest_mock.execute.return_value = Suggestions(companies=[], activities=[])
+        response = await client.get("/api/v1/suggest/", params={"q": "р"})
+        assert response.status_code == status.HTTP_200_OK
+        suggest_mock.execute.assert_awaited_once_with("р", 10)
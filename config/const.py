@@ -1 +1,8 @@
 COORDS_SYSTEM_2D = 4326
+TEXT_SEARCH_CONFIG = "russian"
+# zoom levels and grid of the company_map_cluster materialized view, cell width is 1/8 of the map tile
+MAP_CLUSTER_MAX_ZOOM = 12
+MAP_CLUSTER_CELLS_PER_TILE = 8
+# vector tile coordinates extent and the buffer around the tile in the same units
+MAP_TILE_EXTENT = 4096
+MAP_TILE_BUFFER = 64
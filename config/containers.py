@@ -2,20 +2,180 @@ from dependency_injector import providers
 from dependency_injector.containers import DeclarativeContainer, WiringConfiguration
 
 from config.database import DbManager
+from config.lifecycle import Lifecycle
+from config.metrics import InstrumentedUseCase, MultiprocessMetrics, process_stats
 from config.settings import Settings
+from infrastructure.cache import LRUCache, SingleFlight
+from infrastructure.notifications import CacheInvalidator, ChangeListener
+from infrastructure.repositories.activity_tree import ActivityTreeIndex
+from infrastructure.repositories.cached_company import CachedCompanyRepository
 from infrastructure.repositories.company import CompanyRepository
-from usecases.company import GetCompanyByIdUseCase, CompaniesListUseCase
+from infrastructure.repositories.instrumented import InstrumentedCompanyRepository
+from infrastructure.repositories.json_company import JsonCompanyRepository
+from infrastructure.repositories.map import MapRepository
+from infrastructure.repositories.suggest import SuggestIndex, SuggestRepository
+from usecases.company import (
+    CachedCompaniesListUseCase,
+    CompaniesExportUseCase,
+    CompaniesImportUseCase,
+    CompaniesListUseCase,
+    GetCompaniesByIdsUseCase,
+    GetCompanyByIdUseCase,
+)
+from usecases.map import MapClustersUseCase, MapTileUseCase
+from usecases.suggest import SuggestUseCase
 
 
 class Container(DeclarativeContainer):
     wiring_config = WiringConfiguration(
         modules=[
+            "api.health",
+            "api.metrics",
             "api.v1.company",
+            "api.v1.map",
+            "api.v1.suggest",
         ],
     )
 
     settings = providers.Singleton(Settings)
-    db = providers.Factory(DbManager, settings=settings)
-    company_repo = providers.Factory(CompanyRepository, session=db.provided.session, settings=settings)
-    get_company_by_id_uc = providers.Factory(GetCompanyByIdUseCase, company_repo=company_repo)
-    companies_list_uc = providers.Factory(CompaniesListUseCase, company_repo=company_repo)
+    db = providers.Singleton(DbManager, settings=settings)
+    metrics = providers.Singleton(
+        MultiprocessMetrics,
+        stats=providers.Object(process_stats),
+        interval=settings.provided.metrics_write_interval,
+    )
+    activity_tree = providers.Singleton(
+        ActivityTreeIndex,
+        session=db.provided.read_session,
+        ttl=settings.provided.activity_tree_ttl,
+        primary_reads=db.provided.primary_reads,
+        replica_lag=settings.provided.db_replica_max_lag,
+    )
+    # implementation of company lookups, switched by settings to compare them under load
+    company_db_repo = providers.Selector(
+        settings.provided.company_repository,
+        rows=providers.Factory(
+            CompanyRepository,
+            session=db.provided.session,
+            read_session=db.provided.read_session,
+            settings=settings,
+            activity_tree=activity_tree,
+        ),
+        json=providers.Factory(
+            JsonCompanyRepository,
+            session=db.provided.session,
+            read_session=db.provided.read_session,
+            settings=settings,
+            activity_tree=activity_tree,
+        ),
+    )
+    company_cache = providers.Singleton(
+        LRUCache,
+        maxsize=settings.provided.company_cache_size,
+        ttl=settings.provided.company_cache_ttl,
+    )
+    company_shared_cache = providers.Object(None)
+    company_single_flight = providers.Singleton(SingleFlight)
+    company_cached_repo = providers.Factory(
+        CachedCompanyRepository,
+        repo=providers.Factory(InstrumentedCompanyRepository, repo=company_db_repo),
+        cache=company_cache,
+        single_flight=company_single_flight,
+        shared_cache=company_shared_cache,
+        shared_cache_ttl=settings.provided.company_shared_cache_ttl,
+        primary_reads=db.provided.primary_reads,
+        replica_lag=settings.provided.db_replica_max_lag,
+    )
+    company_repo = providers.Factory(InstrumentedCompanyRepository, repo=company_cached_repo)
+    get_company_by_id_uc = providers.Factory(
+        InstrumentedUseCase,
+        use_case=providers.Factory(GetCompanyByIdUseCase, company_repo=company_repo),
+        name="get_company_by_id",
+    )
+    get_companies_by_ids_uc = providers.Factory(
+        InstrumentedUseCase,
+        use_case=providers.Factory(GetCompaniesByIdsUseCase, company_repo=company_repo),
+        name="get_companies_by_ids",
+    )
+    companies_list_uncached_uc = providers.Factory(CompaniesListUseCase, company_repo=company_repo)
+    company_list_cache = providers.Singleton(
+        LRUCache,
+        maxsize=settings.provided.company_list_cache_size,
+        ttl=settings.provided.company_list_cache_ttl,
+    )
+    companies_list_uc = providers.Factory(
+        InstrumentedUseCase,
+        use_case=providers.Factory(
+            CachedCompaniesListUseCase,
+            use_case=companies_list_uncached_uc,
+            cache=company_list_cache,
+            coords_precision=settings.provided.company_list_cache_coords_precision,
+        ),
+        name="companies_list",
+    )
+    companies_export_uc = providers.Factory(
+        InstrumentedUseCase,
+        use_case=providers.Factory(CompaniesExportUseCase, company_repo=company_repo),
+        name="companies_export",
+    )
+    companies_import_uc = providers.Factory(
+        CompaniesImportUseCase,
+        company_repo=company_repo,
+        batch_size=settings.provided.company_import_batch_size,
+    )
+    suggest_index = providers.Singleton(
+        SuggestIndex,
+        session=db.provided.read_session,
+        refresh_interval=settings.provided.suggest_refresh_interval,
+        rebuild_interval=settings.provided.suggest_rebuild_interval,
+        primary_reads=db.provided.primary_reads,
+        replica_lag=settings.provided.db_replica_max_lag,
+    )
+    suggest_repo = providers.Factory(SuggestRepository, index=suggest_index)
+    suggest_uc = providers.Factory(
+        InstrumentedUseCase,
+        use_case=providers.Factory(SuggestUseCase, suggest_repo=suggest_repo),
+        name="suggest",
+    )
+    map_repo = providers.Factory(
+        MapRepository,
+        session=db.provided.session,
+        read_session=db.provided.read_session,
+        settings=settings,
+        activity_tree=activity_tree,
+    )
+    map_clusters_uc = providers.Factory(
+        InstrumentedUseCase,
+        use_case=providers.Factory(MapClustersUseCase, map_repo=map_repo),
+        name="map_clusters",
+    )
+    map_tile_uc = providers.Factory(
+        InstrumentedUseCase,
+        use_case=providers.Factory(MapTileUseCase, map_repo=map_repo),
+        name="map_tile",
+    )
+    # every worker drops what changed from its caches, whichever process committed the change
+    change_listener = providers.Singleton(
+        ChangeListener,
+        dsn=settings.provided.db_dsn,
+        subscribers=providers.List(
+            providers.Factory(
+                CacheInvalidator,
+                company_repo=company_cached_repo,
+                list_cache=company_list_cache,
+                activity_tree=activity_tree,
+            ),
+            suggest_index,
+        ),
+        check_interval=settings.provided.db_listen_check_interval,
+        reconnect_delay=settings.provided.db_listen_reconnect_delay,
+    )
+    lifecycle = providers.Singleton(
+        Lifecycle,
+        db=db,
+        company_db_repo=company_db_repo,
+        company_repo=company_repo,
+        activity_tree=activity_tree,
+        suggest_index=suggest_index,
+        warmup_companies=settings.provided.warmup_companies,
+    )
@@ -1,31 +1,200 @@
-from asyncio import current_task
-from contextlib import asynccontextmanager
+import asyncio
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any
 
-from pydantic_settings import BaseSettings
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError, InterfaceError
 from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
     AsyncSession,
-    async_scoped_session,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+from config.query_log import QueryLogger
+from config.settings import Settings
+
+
+@dataclass
+class PoolWaitStats:
+    checkouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait to get a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.wait_stats.record(time.perf_counter() - started)
+
+
+def is_disconnect(exc: BaseException) -> bool:
+    """Errors of an unreachable or failed server, as opposed to errors of a statement"""
+    if isinstance(exc, DBAPIError):
+        return exc.connection_invalidated or isinstance(exc, InterfaceError)
+    # refused connections and timeouts are raised by asyncpg as they are
+    return isinstance(exc, OSError)
+
+
+@dataclass(eq=False)
+class Replica:
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    in_use: int = 0
+    ejected_until: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.engine.url.host}:{self.engine.url.port or 5432}"
+
+
+class ReplicaBalancer:
+    """
+    Picks a replica for a read session, by turns or by the least number of sessions in use. A replica failing a
+    connection or a health check is ejected for `eject_seconds`, or until it passes a health check
+    """
+
+    def __init__(
+        self,
+        replicas: list[Replica],
+        strategy: str = "round_robin",
+        eject_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.replicas = replicas
+        self.strategy = strategy
+        self.eject_seconds = eject_seconds
+        self.clock = clock
+        self._turn = 0
+
+    def pick(self) -> Replica | None:
+        now = self.clock()
+        available = [x for x in self.replicas if x.ejected_until <= now]
+        if not available:
+            return None
+        # candidates are rotated on every pick, so least connections ties are spread over replicas too
+        start = self._turn % len(available)
+        self._turn += 1
+        candidates = available[start:] + available[:start]
+        if self.strategy == "least_connections":
+            return min(candidates, key=attrgetter("in_use"))
+        return candidates[0]
+
+    def eject(self, replica: Replica) -> None:
+        replica.ejected_until = self.clock() + self.eject_seconds
+
+    def readmit(self, replica: Replica) -> None:
+        replica.ejected_until = 0.0
+
+    def is_ejected(self, replica: Replica) -> bool:
+        return replica.ejected_until > self.clock()
 
 
 class DbManager:
-    def __init__(self, settings: BaseSettings):
+    """
+    Sessions of the primary database, and read sessions balanced over replicas. Every session is a new one, reads go
+    to the primary if there are no replicas available, the sessions of the task are bound to a primary connection,
+    or the task may read its own writes: while it has a primary session open, for `db_replica_max_lag` seconds after
+    closing it, and within `primary_reads`
+    """
+
+    def __init__(self, settings: Settings):
         self.settings = settings
-        self.engine = create_async_engine(settings.db_dsn, echo=True)
-        self.session_factory = async_scoped_session(
-            async_sessionmaker(
-                self.engine,
-                expire_on_commit=False,
-                autoflush=False,
-            ),
-            scopefunc=current_task,
+        self.query_logger = QueryLogger(
+            sample_rate=settings.db_query_log_sample_rate,
+            slow_threshold=settings.db_query_log_slow_threshold,
+        )
+        self.engine = self._create_engine(settings.db_dsn)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False, autoflush=False)
+        self._connection: ContextVar[AsyncConnection | None] = ContextVar("connection", default=None)
+        self._primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+        self._written_at: ContextVar[float | None] = ContextVar("written_at", default=None)
+        replicas = []
+        for dsn in settings.db_replica_dsns:
+            engine = self._create_engine(dsn)
+            replicas.append(Replica(engine, async_sessionmaker(engine, expire_on_commit=False, autoflush=False)))
+        self.balancer = ReplicaBalancer(
+            replicas,
+            strategy=settings.db_replica_balancing,
+            eject_seconds=settings.db_replica_eject_seconds,
         )
 
+    def _create_engine(self, dsn: str) -> AsyncEngine:
+        engine = create_async_engine(
+            dsn,
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=self.settings.db_pool_size,
+            max_overflow=self.settings.db_pool_max_overflow,
+            pool_timeout=self.settings.db_pool_timeout,
+            pool_recycle=self.settings.db_pool_recycle,
+            pool_pre_ping=self.settings.db_pool_pre_ping,
+            connect_args={"prepared_statement_cache_size": self.settings.db_statement_cache_size},
+            echo=self.settings.db_echo,
+        )
+        self.query_logger.attach(engine.sync_engine)
+        return engine
+
+    @contextmanager
+    def bind(self, connection: AsyncConnection) -> Iterator[None]:
+        """Sessions opened by the current task use the given primary connection, e.g. to prepare statements on it"""
+        token = self._connection.set(connection)
+        try:
+            yield
+        finally:
+            self._connection.reset(token)
+
+    @contextmanager
+    def primary_reads(self) -> Iterator[None]:
+        """Read sessions opened by the current task use the primary, e.g. to load what was just written elsewhere"""
+        token = self._primary_reads.set(True)
+        try:
+            yield
+        finally:
+            self._primary_reads.reset(token)
+
+    def _reads_primary(self) -> bool:
+        if self._connection.get() is not None or self._primary_reads.get():
+            return True
+        written_at = self._written_at.get()
+        return written_at is not None and time.monotonic() - written_at < self.settings.db_replica_max_lag
+
     @asynccontextmanager
-    async def session(self) -> AsyncSession:
-        session = self.session_factory()
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        # replicas may not have replayed the writes of the session yet, so reads of the task go to the primary while
+        # it is open and shortly after
+        token = self._primary_reads.set(True)
+        try:
+            async with self._primary_session() as session:
+                yield session
+        finally:
+            self._primary_reads.reset(token)
+            self._written_at.set(time.monotonic())
+
+    @asynccontextmanager
+    async def _primary_session(self) -> AsyncIterator[AsyncSession]:
+        connection = self._connection.get()
+        session = self.session_factory() if connection is None else self.session_factory(bind=connection)
         try:
             yield session
         except Exception:
@@ -33,3 +202,74 @@ class DbManager:
             raise
         finally:
             await session.close()
+
+    @asynccontextmanager
+    async def read_session(self) -> AsyncIterator[AsyncSession]:
+        replica = None if self._reads_primary() else self.balancer.pick()
+        if replica is None:
+            async with self._primary_session() as session:
+                yield session
+            return
+
+        replica.in_use += 1
+        session = replica.session_factory()
+        try:
+            yield session
+        except Exception as e:
+            if is_disconnect(e):
+                self.balancer.eject(replica)
+            await session.rollback()
+            raise
+        finally:
+            replica.in_use -= 1
+            await session.close()
+
+    async def check_replicas(self) -> None:
+        await asyncio.gather(*(self._check_replica(x) for x in self.balancer.replicas))
+
+    async def _check_replica(self, replica: Replica) -> None:
+        try:
+            async with asyncio.timeout(self.settings.db_replica_check_timeout):
+                async with replica.engine.connect() as conn:
+                    await conn.execute(select(1))
+        except (OSError, DBAPIError, TimeoutError):
+            self.balancer.eject(replica)
+        else:
+            self.balancer.readmit(replica)
+
+    async def run_replica_checks(self) -> None:
+        while True:
+            await self.check_replicas()
+            await asyncio.sleep(self.settings.db_replica_check_interval)
+
+    def pool_stats(self) -> dict[str, int | float]:
+        pool = self.engine.sync_engine.pool
+        stats: dict[str, int | float] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+        if isinstance(pool, InstrumentedAsyncQueuePool):
+            stats.update(
+                checkouts=pool.wait_stats.checkouts,
+                wait_seconds_total=pool.wait_stats.wait_seconds_total,
+                wait_seconds_max=pool.wait_stats.wait_seconds_max,
+            )
+        return stats
+
+    def replica_stats(self) -> dict[str, dict[str, int | float]]:
+        stats = {}
+        for replica in self.balancer.replicas:
+            pool = replica.engine.sync_engine.pool
+            stats[replica.name] = {
+                "in_use": replica.in_use,
+                "ejected": int(self.balancer.is_ejected(replica)),
+                "checked_out": pool.checkedout(),
+            }
+        return stats
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+        for replica in self.balancer.replicas:
+            await replica.engine.dispose()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config.database import DbManager
+from domain.models import CountMode
+from domain.repositories import ICompanyRepository
+from infrastructure.models.models import CompanyOrm
+from infrastructure.repositories.activity_tree import ActivityTreeIndex
+from infrastructure.repositories.suggest import SuggestIndex
+
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """
+    State of the worker process. It is not ready until its pool, caches and prepared statements are warmed up, and
+    stops being ready once draining on shutdown, while still serving requests in flight
+    """
+
+    def __init__(
+        self,
+        db: DbManager,
+        company_db_repo: ICompanyRepository,
+        company_repo: ICompanyRepository,
+        activity_tree: ActivityTreeIndex,
+        suggest_index: SuggestIndex,
+        warmup_companies: int,
+    ) -> None:
+        self.db = db
+        self.company_db_repo = company_db_repo
+        self.company_repo = company_repo
+        self.activity_tree = activity_tree
+        self.suggest_index = suggest_index
+        self.warmup_companies = warmup_companies
+        self.started_at = time.monotonic()
+        self.warmed_up = False
+        self.draining = False
+
+    @property
+    def ready(self) -> bool:
+        return self.warmed_up and not self.draining
+
+    def drain(self) -> None:
+        self.draining = True
+
+    async def warm_up(self) -> None:
+        started = time.perf_counter()
+        await self.activity_tree.refresh()
+        async with self.db.read_session() as session:
+            result = await session.execute(select(CompanyOrm.id).order_by(CompanyOrm.id).limit(self.warmup_companies))
+            company_ids = list(result.scalars())
+        pool_size = self.db.settings.db_pool_size
+        connected = asyncio.Barrier(pool_size)
+        # a failed connection cancels the rest of the group instead of leaving them waiting at the barrier
+        async with asyncio.TaskGroup() as group:
+            for _ in range(pool_size):
+                group.create_task(self._warm_connection(connected, company_ids))
+        # replicas failing the health check are skipped, they are warmed by traffic once readmitted
+        await self.db.check_replicas()
+        for replica in self.db.balancer.replicas:
+            if not self.db.balancer.is_ejected(replica):
+                replica_connected = asyncio.Barrier(pool_size)
+                async with asyncio.TaskGroup() as group:
+                    for _ in range(pool_size):
+                        group.create_task(self._open_connection(replica.engine, replica_connected))
+        await self.company_repo.get_many(company_ids)
+        await self.suggest_index.get()
+        self.warmed_up = True
+        logger.info(
+            "warmed up %s connections per database and %s companies in %.2fs",
+            pool_size,
+            len(company_ids),
+            time.perf_counter() - started,
+        )
+
+    async def _open_connection(self, engine: AsyncEngine, connected: asyncio.Barrier) -> None:
+        async with engine.connect():
+            await connected.wait()
+
+    async def _warm_connection(self, connected: asyncio.Barrier, company_ids: list[int]) -> None:
+        # every task holds its connection until all of them are connected, so the pool opens all of its connections,
+        # and statements are prepared on each of them by running the hot queries in sessions bound to it
+        async with self.db.engine.connect() as conn:
+            await connected.wait()
+            with self.db.bind(conn):
+                # statements of the details endpoint, the same for an id missing from the table
+                await self.company_db_repo.get_by_id(company_ids[0] if company_ids else 0)
+                await self.company_db_repo.list_filtered(count=CountMode.ESTIMATE)
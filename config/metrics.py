@@ -0,0 +1,110 @@
+import asyncio
+import inspect
+import os
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from prometheus_client import REGISTRY, CollectorRegistry, Gauge, Histogram, generate_latest, multiprocess
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being processed", multiprocess_mode="livesum")
+USE_CASE_LATENCY = Histogram(
+    "use_case_duration_seconds", "Use case execution latency", ["use_case", "outcome"], buckets=LATENCY_BUCKETS
+)
+REPOSITORY_LATENCY = Histogram(
+    "repository_duration_seconds",
+    "Repository method latency",
+    ["repository", "method", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class ProcessStats:
+    """Gauges of the state of this process, like its pool, set from callbacks when updated"""
+
+    def __init__(self) -> None:
+        self.gauges: list[tuple[Gauge, Callable[[], Iterable[tuple[Labels, float]]]]] = []
+
+    def add(self, gauge: Gauge, callback: Callable[[], Iterable[tuple[Labels, float]]]) -> None:
+        self.gauges.append((gauge, callback))
+
+    def update(self) -> None:
+        for gauge, callback in self.gauges:
+            for labels, value in callback():
+                gauge.labels(*labels).set(value)
+
+
+process_stats = ProcessStats()
+
+
+class MultiprocessMetrics:
+    """
+    Metrics of all workers sharing the listening socket, as a scrape reaches a single one of them. With
+    PROMETHEUS_MULTIPROC_DIR set before the workers start, prometheus_client records the metrics of every worker in
+    files of that directory, which the worker serving the scrape aggregates. Gauges of `stats` are updated every
+    `interval` seconds and on scrape, and reported by worker pid. Without the directory, only the metrics of this
+    process are rendered
+    """
+
+    def __init__(
+        self, stats: ProcessStats = process_stats, interval: float = 5.0, directory: str | None = None
+    ) -> None:
+        self.stats = stats
+        self.interval = interval
+        self.directory = directory if directory is not None else os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+    async def run(self) -> None:
+        if self.directory is None:
+            return
+        try:
+            while True:
+                self.stats.update()
+                await asyncio.sleep(self.interval)
+        finally:
+            # live gauges of the worker are removed, so a stopped worker is not reported
+            await asyncio.to_thread(multiprocess.mark_process_dead, os.getpid(), self.directory)
+
+    async def render(self) -> bytes:
+        self.stats.update()
+        if self.directory is None:
+            return generate_latest(REGISTRY)
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, self.directory)
+        return await asyncio.to_thread(generate_latest, registry)
+
+
+class InstrumentedUseCase:
+    """Records latency of `execute` of the wrapped use case"""
+
+    def __init__(self, use_case: Any, name: str, histogram: Histogram = USE_CASE_LATENCY) -> None:
+        self.use_case = use_case
+        self.name = name
+        self.histogram = histogram
+
+    async def _timed(self, result: Any, started: float) -> Any:
+        outcome = "error"
+        try:
+            result = await result
+            outcome = "ok"
+            return result
+        finally:
+            self.histogram.labels(use_case=self.name, outcome=outcome).observe(time.perf_counter() - started)
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        result = self.use_case.execute(*args, **kwargs)
+        if inspect.isawaitable(result):
+            return self._timed(result, started)
+        # streaming use cases return an iterator, only the time to build it is recorded
+        self.histogram.labels(use_case=self.name, outcome="ok").observe(time.perf_counter() - started)
+        return result
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self.use_case, item)
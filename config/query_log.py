@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import random
+import re
+import time
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+logger = logging.getLogger("db.query")
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_PARAM_RE = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):(?!:)\w+|\?")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Replaces literals and bound parameters with `?`, so statements differing only by values match"""
+    statement = _STRING_RE.sub("?", statement)
+    statement = _PARAM_RE.sub("?", statement)
+    statement = _NUMBER_RE.sub("?", statement)
+    statement = _LIST_RE.sub("(?, ...)", statement)
+    return _SPACE_RE.sub(" ", statement).strip()
+
+
+def fingerprint(normalized_statement: str) -> str:
+    return hashlib.blake2b(normalized_statement.encode(), digest_size=8).hexdigest()
+
+
+class QueryLogger:
+    """
+    Logs executed statements with fingerprint, duration and row count. Statements slower than `slow_threshold`
+    seconds are always logged with WARNING level, others are logged with INFO level for `sample_rate` share of
+    executions. Parameters are never logged
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        slow_threshold: float | None = None,
+        max_statement_length: int = 2000,
+        sampler: Callable[[], float] = random.random,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.max_statement_length = max_statement_length
+        self.sampler = sampler
+        self.clock = clock
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def detach(self, engine: Engine) -> None:
+        event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.remove(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        conn.info.setdefault("query_started", []).append(self.clock())
+
+    def _after_cursor_execute(
+        self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        duration = self.clock() - conn.info["query_started"].pop()
+        self._log(statement, duration, rowcount=cursor.rowcount, executemany=executemany)
+
+    def _handle_error(self, context: Any) -> None:
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if not started:
+            return
+        duration = self.clock() - started.pop()
+        self._log(context.statement or "", duration, rowcount=None, error=type(context.original_exception).__name__)
+
+    def _log(self, statement: str, duration: float, **fields: Any) -> None:
+        slow = self.slow_threshold is not None and duration >= self.slow_threshold
+        if not slow and not fields.get("error") and (self.sample_rate <= 0 or self.sampler() >= self.sample_rate):
+            return
+        normalized = normalize_statement(statement)
+        record = {
+            "fingerprint": fingerprint(normalized),
+            "statement": normalized[: self.max_statement_length],
+            "duration_ms": round(duration * 1000, 3),
+            "slow": slow,
+            **fields,
+        }
+        level = logging.WARNING if slow or fields.get("error") else logging.INFO
+        logger.log(
+            level,
+            "db query %s %.3fms rows=%s",
+            record["fingerprint"],
+            record["duration_ms"],
+            record["rowcount"],
+            extra={"db_query": record},
+        )
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 from config.utils import assemble_dsn
@@ -9,8 +11,49 @@ class Settings(BaseSettings):
     db_name: str = "db_name"
     db_user: str = "db_user"
     db_password: str = "db_password"
+    db_pool_size: int = 10
+    db_pool_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+    db_echo: bool = False
+    db_query_log_sample_rate: float = 0.0
+    db_query_log_slow_threshold: float | None = 0.5
+    db_replica_dsns: list[str] = []
+    db_replica_balancing: Literal["round_robin", "least_connections"] = "round_robin"
+    db_replica_eject_seconds: float = 30.0
+    db_replica_check_interval: float = 5.0
+    db_replica_check_timeout: float = 2.0
+    db_replica_max_lag: float = 2.0
+    db_listen_check_interval: float = 10.0
+    db_listen_reconnect_delay: float = 1.0
+    company_repository: Literal["rows", "json"] = "rows"
     company_items_per_page: int = 10
+    company_list_window_count: bool = True
+    company_export_batch_size: int = 1000
+    company_import_batch_size: int = 5000
+    activity_tree_ttl: float = 300.0
+    suggest_refresh_interval: float = 5.0
+    suggest_rebuild_interval: float = 900.0
+    map_tile_max_features: int = 5000
+    map_clusters_max_tiles: int = 256
+    company_cache_size: int = 10000
+    company_cache_ttl: float = 60.0
+    company_shared_cache_ttl: float = 300.0
+    company_list_cache_size: int = 1000
+    company_list_cache_ttl: float = 30.0
+    company_list_cache_coords_precision: int = 4
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    web_workers: int | None = None
+    web_drain_delay: float = 5.0
+    web_shutdown_timeout: float = 30.0
+    warmup_companies: int = 1000
+    metrics_write_interval: float = 5.0
     api_key: str = "api_key"
+    http_cache_max_age: int = 60
+    http_cache_scope: str = "private"
 
     @property
     def db_dsn(self) -> str:
@@ -0,0 +1,42 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from dependency_injector import providers
+
+from config.containers import Container
+from config.lifecycle import Lifecycle
+from config.settings import Settings
+
+
+class TestLifecycle:
+    def test_ready_after_warm_up_until_draining(self) -> None:
+        lifecycle = Lifecycle(
+            db=MagicMock(),
+            company_db_repo=AsyncMock(),
+            company_repo=AsyncMock(),
+            activity_tree=AsyncMock(),
+            suggest_index=AsyncMock(),
+            warmup_companies=10,
+        )
+        assert not lifecycle.ready
+        lifecycle.warmed_up = True
+        assert lifecycle.ready
+        lifecycle.drain()
+        assert not lifecycle.ready and lifecycle.draining
+
+    @pytest.mark.asyncio
+    async def test_warm_up(self) -> None:
+        container = Container()
+        container.settings.override(providers.Object(Settings(db_pool_size=3)))
+        db = container.db()
+        try:
+            lifecycle = container.lifecycle()
+            await lifecycle.warm_up()
+            pool = db.engine.sync_engine.pool
+            assert lifecycle.ready
+            # every connection of the pool is opened and returned
+            assert pool.checkedin() == 3
+            assert pool.checkedout() == 0
+            assert pool.overflow() == 0
+        finally:
+            await db.dispose()
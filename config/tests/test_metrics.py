@@ -0,0 +1,106 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from prometheus_client import CollectorRegistry, Gauge, Histogram
+
+from config.metrics import InstrumentedUseCase, MultiprocessMetrics, ProcessStats
+
+# a worker recording a request, then stopping, or killed without cleaning up
+WORKER = """
+import asyncio
+import os
+import sys
+from contextlib import suppress
+
+from prometheus_client import Gauge
+
+from config.metrics import REQUEST_LATENCY, MultiprocessMetrics, ProcessStats
+
+
+async def main(value: float, stop: bool) -> None:
+    REQUEST_LATENCY.labels(method="GET", route="/", status=200).observe(value)
+    stats = ProcessStats()
+    stats.add(Gauge("pool", "Pool", ["stat"], multiprocess_mode="liveall"), lambda: [(("size",), value)])
+    metrics = MultiprocessMetrics(stats, interval=60)
+    run = asyncio.create_task(metrics.run())
+    await asyncio.sleep(0)
+    print(os.getpid(), flush=True)
+    if not stop:
+        os._exit(0)
+    run.cancel()
+    with suppress(asyncio.CancelledError):
+        await run
+
+
+asyncio.run(main(float(sys.argv[1]), sys.argv[2] == "stop"))
+"""
+
+
+async def run_worker(directory: Path, value: float, stop: bool) -> str:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        WORKER,
+        str(value),
+        "stop" if stop else "kill",
+        env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(directory)},
+        cwd=Path(__file__).parents[2],
+        stdout=asyncio.subprocess.PIPE,
+    )
+    stdout, _ = await process.communicate()
+    assert process.returncode == 0
+    return stdout.decode().strip()
+
+
+@pytest.mark.asyncio
+class TestMultiprocessMetrics:
+    async def test_workers_merged(self, tmp_path: Path) -> None:
+        await run_worker(tmp_path, 0.5, stop=True)
+        pid = await run_worker(tmp_path, 2.0, stop=False)
+
+        metrics = MultiprocessMetrics(ProcessStats(), directory=str(tmp_path))
+        lines = (await metrics.render()).decode().splitlines()
+        labels = 'method="GET",route="/",status="200"'
+        assert f"http_request_duration_seconds_count{{{labels}}} 2.0" in lines
+        assert f"http_request_duration_seconds_sum{{{labels}}} 2.5" in lines
+        assert f'http_request_duration_seconds_bucket{{le="1.0",{labels}}} 1.0' in lines
+        # gauges are reported by worker, those of the stopped worker are removed on stop
+        assert [x for x in lines if x.startswith("pool{")] == [f'pool{{pid="{pid}",stat="size"}} 2.0']
+
+    async def test_single_process(self) -> None:
+        registry = CollectorRegistry()
+        gauge = Gauge("pool", "Pool", ["stat"], registry=registry)
+        stats = ProcessStats()
+        stats.add(gauge, lambda: [(("size",), 10)])
+        metrics = MultiprocessMetrics(stats, directory=None)
+        await metrics.run()
+        assert b"# TYPE http_requests_in_flight gauge" in await metrics.render()
+        assert registry.get_sample_value("pool", {"stat": "size"}) == 10
+
+
+def make_histogram() -> tuple[Histogram, CollectorRegistry]:
+    registry = CollectorRegistry()
+    return Histogram("h", "H", ["use_case", "outcome"], registry=registry), registry
+
+
+@pytest.mark.asyncio
+class TestInstrumentedUseCase:
+    async def test_async_execute(self) -> None:
+        histogram, registry = make_histogram()
+        use_case = MagicMock()
+        use_case.execute = AsyncMock(return_value=1)
+        assert await InstrumentedUseCase(use_case, name="uc", histogram=histogram).execute(10) == 1
+        use_case.execute.assert_awaited_once_with(10)
+        assert registry.get_sample_value("h_count", {"use_case": "uc", "outcome": "ok"}) == 1
+
+    async def test_error_recorded(self) -> None:
+        histogram, registry = make_histogram()
+        use_case = MagicMock()
+        use_case.execute = AsyncMock(side_effect=ValueError)
+        with pytest.raises(ValueError):
+            await InstrumentedUseCase(use_case, name="uc", histogram=histogram).execute()
+        assert registry.get_sample_value("h_count", {"use_case": "uc", "outcome": "error"}) == 1
@@ -0,0 +1,71 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from config.query_log import QueryLogger, fingerprint, normalize_statement
+
+
+class FakeClock:
+    def __init__(self, step: float) -> None:
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self) -> float:
+        self.now += self.step
+        return self.now
+
+
+class TestNormalizeStatement:
+    def test_literals_and_params_replaced(self) -> None:
+        assert normalize_statement("SELECT *\n  FROM company WHERE id = $1 AND name = 'a''b' LIMIT 10") == (
+            "SELECT * FROM company WHERE id = ? AND name = ? LIMIT ?"
+        )
+
+    def test_in_list_collapsed(self) -> None:
+        assert normalize_statement("SELECT id FROM company WHERE id IN ($1, $2, $3)") == normalize_statement(
+            "SELECT id FROM company WHERE id IN ($1, $2)"
+        )
+
+    def test_identifiers_and_casts_kept(self) -> None:
+        statement = "SELECT company_1.id, name::text FROM company AS company_1"
+        assert normalize_statement(statement) == statement
+
+    def test_fingerprint(self) -> None:
+        assert fingerprint("SELECT ?") == fingerprint("SELECT ?")
+        assert fingerprint("SELECT ?") != fingerprint("SELECT ? FROM company")
+
+
+class TestQueryLogger:
+    @staticmethod
+    def execute(query_logger: QueryLogger, statement: str) -> None:
+        engine = create_engine("sqlite://")
+        query_logger.attach(engine)
+        with engine.connect() as conn:
+            conn.execute(text(statement))
+
+    def test_slow_query_logged(self, caplog: pytest.LogCaptureFixture) -> None:
+        query_logger = QueryLogger(slow_threshold=1.0, clock=FakeClock(step=2.0))
+        with caplog.at_level(logging.INFO, logger="db.query"):
+            self.execute(query_logger, "SELECT 1")
+        assert len(caplog.records) == 1
+        record = caplog.records[0]
+        assert record.levelno == logging.WARNING
+        assert record.db_query["statement"] == "SELECT ?"
+        assert record.db_query["duration_ms"] == 2000.0
+        assert record.db_query["slow"] is True
+
+    def test_fast_query_sampled(self, caplog: pytest.LogCaptureFixture) -> None:
+        with caplog.at_level(logging.INFO, logger="db.query"):
+            self.execute(QueryLogger(slow_threshold=1.0, clock=FakeClock(step=0.1)), "SELECT 1")
+            assert not caplog.records
+            self.execute(QueryLogger(sample_rate=0.5, sampler=lambda: 0.1), "SELECT 1")
+        assert len(caplog.records) == 1
+        assert caplog.records[0].levelno == logging.INFO
+        assert caplog.records[0].db_query["slow"] is False
+
+    def test_error_logged(self, caplog: pytest.LogCaptureFixture) -> None:
+        with caplog.at_level(logging.INFO, logger="db.query"), pytest.raises(OperationalError):
+            self.execute(QueryLogger(), "SELECT * FROM missing")
+        assert caplog.records[0].db_query["error"] == "OperationalError"
@@ -1,5 +1,5 @@
 import asyncio
-from contextlib import asynccontextmanager
+from contextlib import AbstractContextManager, asynccontextmanager, nullcontext
 from typing import Generator
 
 import asyncpg
@@ -81,6 +81,11 @@ def container(db: AsyncSession) -> Generator[Container, None, None]:
         async def session(self) -> AsyncSession:
             yield db
 
+        read_session = session
+
+        def primary_reads(self) -> AbstractContextManager[None]:
+            return nullcontext()
+
     container.db.override(TestDbManager())
     yield container
     container.unwire()
@@ -0,0 +1,20 @@
+from abc import ABC, abstractmethod
+from collections.abc import Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class ICache(ABC, Generic[K, V]):
+    @abstractmethod
+    def get(self, key: K) -> V | None: ...
+
+    @abstractmethod
+    def set(self, key: K, value: V) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: K) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
@@ -0,0 +1,14 @@
+class InvalidCursorError(ValueError):
+    pass
+
+
+class InvalidSortError(ValueError):
+    pass
+
+
+class MapAreaTooLargeError(ValueError):
+    pass
+
+
+class UnknownActivityParentError(ValueError):
+    pass
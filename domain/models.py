@@ -1,13 +1,30 @@
 from dataclasses import dataclass
+from enum import StrEnum
 
 
-@dataclass
+class CountMode(StrEnum):
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class SearchMode(StrEnum):
+    SUBSTRING = "substring"
+    FULLTEXT = "fulltext"
+
+
+class CompanySort(StrEnum):
+    ID = "id"
+    DISTANCE = "distance"
+
+
+@dataclass(slots=True)
 class Phone:
     id: int
     number: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Building:
     id: int
     address: str
@@ -15,14 +32,14 @@ class Building:
     longitude: float
 
 
-@dataclass
+@dataclass(slots=True)
 class Activity:
     id: int
     name: str
     parent_id: int | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Company:
     id: int
     name: str
@@ -30,10 +47,39 @@ class Company:
     building: Building
     phones: list[Phone]
     activities: list[Activity]
+    version: int = 1
 
 
-@dataclass
+@dataclass(slots=True)
 class CompanySummary:
     id: int
     name: str
     legal_form: str
+    distance_m: float | None = None
+
+
+@dataclass(slots=True)
+class CompanySummaryPage:
+    items: list[CompanySummary]
+    total: int | None
+    next_cursor: str | None = None
+    is_estimate: bool = False
+
+
+@dataclass(slots=True)
+class NameSuggestion:
+    id: int
+    name: str
+
+
+@dataclass(slots=True)
+class Suggestions:
+    companies: list[NameSuggestion]
+    activities: list[NameSuggestion]
+
+
+@dataclass(slots=True)
+class MapCluster:
+    count: int
+    latitude: float
+    longitude: float
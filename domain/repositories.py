@@ -1,19 +1,37 @@
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Sequence
 
-from domain.models import Company, CompanySummary
+from domain.models import (
+    Company,
+    CompanySort,
+    CompanySummary,
+    CompanySummaryPage,
+    CountMode,
+    MapCluster,
+    SearchMode,
+    Suggestions,
+)
 
 
 class ICompanyRepository(ABC):
     @abstractmethod
     async def get_by_id(self, company_id: int) -> Company | None: ...
 
+    @abstractmethod
+    async def get_many(self, company_ids: Sequence[int]) -> list[Company]: ...
+
+    @abstractmethod
+    async def bulk_upsert(self, companies: Sequence[Company]) -> int: ...
+
     @abstractmethod
     async def list_filtered(
         self,
         building_id: int | None = None,
         activity_id: int | None = None,
         activity_children: bool = False,
+        activity_depth: int = 2,
         name: str | None = None,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
         lat: float | None = None,
         lng: float | None = None,
         radius: int | None = None,
@@ -22,4 +40,57 @@ class ICompanyRepository(ABC):
         laty: float | None = None,
         lngy: float | None = None,
         offset: int = 0,
-    ) -> tuple[list[CompanySummary], int]: ...
+        cursor: str | None = None,
+        count: CountMode = CountMode.EXACT,
+        sort: CompanySort = CompanySort.ID,
+    ) -> CompanySummaryPage: ...
+
+    @abstractmethod
+    def stream_filtered(
+        self,
+        building_id: int | None = None,
+        activity_id: int | None = None,
+        activity_children: bool = False,
+        activity_depth: int = 2,
+        name: str | None = None,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
+        lat: float | None = None,
+        lng: float | None = None,
+        radius: int | None = None,
+        latx: float | None = None,
+        lngx: float | None = None,
+        laty: float | None = None,
+        lngy: float | None = None,
+        after_id: int | None = None,
+    ) -> AsyncIterator[CompanySummary]: ...
+
+
+class ISuggestRepository(ABC):
+    @abstractmethod
+    async def suggest(self, prefix: str, limit: int) -> Suggestions: ...
+
+
+class IMapRepository(ABC):
+    @abstractmethod
+    async def clusters(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        zoom: int,
+    ) -> list[MapCluster]: ...
+
+    @abstractmethod
+    async def refresh_clusters(self) -> None: ...
+
+    @abstractmethod
+    async def tile(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        activity_id: int | None = None,
+        activity_children: bool = False,
+        activity_depth: int = 2,
+    ) -> bytes: ...
@@ -11,8 +11,8 @@ class BuildingFactory(Factory):
 
     id = factory.Sequence(lambda n: n)
     address = factory.Faker("address", locale="ru_RU")
-    longitude = factory.Faker("longitude")
-    latitude = factory.Faker("latitude")
+    longitude = factory.Faker("pyfloat", min_value=-180, max_value=180)
+    latitude = factory.Faker("pyfloat", min_value=-90, max_value=90)
 
 
 class PhoneFactory(Factory):
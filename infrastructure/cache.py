@@ -0,0 +1,120 @@
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from functools import partial
+from typing import Generic, TypeVar
+
+from domain.cache import ICache
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(ICache[K, V]):
+    """
+    In-process cache bounded by size, entries also expire after TTL seconds. Deletes bump `generation`, so a loader
+    can tell whether the key was deleted while its value was being loaded, see `deleted_since`, or shortly before,
+    see `deleted_within`
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        # generation and time of the last delete of recently deleted keys, bounded by maxsize like the entries
+        self._deleted: OrderedDict[K, tuple[int, float]] = OrderedDict()
+        self._forgotten: tuple[int, float] = (0, -math.inf)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at <= self.clock():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (self.clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        self._data.pop(key, None)
+        self.generation += 1
+        self._deleted[key] = (self.generation, self.clock())
+        self._deleted.move_to_end(key)
+        while len(self._deleted) > max(self.maxsize, 1):
+            _, self._forgotten = self._deleted.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.generation += 1
+        self._deleted.clear()
+        self._forgotten = (self.generation, self.clock())
+
+    def deleted_since(self, key: K, generation: int) -> bool:
+        """Whether the key was deleted after `generation`, assumed so when its delete is no longer remembered"""
+        return self._deleted.get(key, self._forgotten)[0] > generation
+
+    def deleted_within(self, key: K, seconds: float) -> bool:
+        """Whether the key was deleted in the last `seconds`, assumed so when its delete is no longer remembered"""
+        return self.clock() - self._deleted.get(key, self._forgotten)[1] < seconds
+
+
+class ISharedCacheBackend(ABC):
+    """Cache shared between processes, e.g. Redis or memcached"""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None: ...
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Coalesces concurrent calls for the same key into a single call of the loader. A forgotten key is loaded again by
+    the next call, while the call in flight still completes for its waiters
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, asyncio.Future[V]] = {}
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(partial(self._done, key))
+        # waiter cancellation must not cancel the load shared with other waiters
+        return await asyncio.shield(call)
+
+    def forget(self, key: K) -> None:
+        self._calls.pop(key, None)
+
+    def _done(self, key: K, call: asyncio.Future[V]) -> None:
+        # the key may be loaded by a newer call already, if it was forgotten
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -13,6 +13,7 @@ from infrastructure.tests.utils import (
     create_async,
     create_demo_activities,
     create_demo_companies,
+    create_large_dataset,
 )
 
 T = TypeVar("T")
@@ -44,3 +45,8 @@ async def companies_search_setup(
         db=db,
         activities=activities_tree_orm,
     )
+
+
+@pytest_asyncio.fixture
+async def large_dataset(db: AsyncSession) -> None:
+    await create_large_dataset(db=db)
@@ -0,0 +1,99 @@
+"""company child version per statement
+
+Revision ID: 3f8d1c7a5b92
+Revises: e7c2b9a4f613
+Create Date: 2025-09-18 09:12:37.604518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f8d1c7a5b92"
+down_revision: Union[str, Sequence[str], None] = "e7c2b9a4f613"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHILD_TABLES = ("phone", "company_activity")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a row trigger updates the company once per phone or activity link, a statement writing many children of the
+    # same company, like the bulk import, updates it once per statement instead. Transition tables are only allowed
+    # on triggers of a single event, hence a trigger per event
+    for table in CHILD_TABLES:
+        op.execute(f"DROP TRIGGER company_version ON {table}")
+    op.execute("DROP FUNCTION company_child_bump_version()")
+    op.execute(
+        """
+        CREATE FUNCTION company_children_bump_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE company SET version = version + 1 WHERE id IN (SELECT company_id FROM new_rows);
+            ELSIF TG_OP = 'UPDATE' THEN
+                UPDATE company SET version = version + 1
+                WHERE id IN (SELECT company_id FROM old_rows UNION SELECT company_id FROM new_rows);
+            ELSE
+                UPDATE company SET version = version + 1 WHERE id IN (SELECT company_id FROM old_rows);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in CHILD_TABLES:
+        op.execute(
+            f"""
+            CREATE TRIGGER company_version_insert AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION company_children_bump_version()
+            """
+        )
+        op.execute(
+            f"""
+            CREATE TRIGGER company_version_update AFTER UPDATE ON {table}
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION company_children_bump_version()
+            """
+        )
+        op.execute(
+            f"""
+            CREATE TRIGGER company_version_delete AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION company_children_bump_version()
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in CHILD_TABLES:
+        for event in ("insert", "update", "delete"):
+            op.execute(f"DROP TRIGGER company_version_{event} ON {table}")
+    op.execute("DROP FUNCTION company_children_bump_version()")
+    op.execute(
+        """
+        CREATE FUNCTION company_child_bump_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE company SET version = version + 1 WHERE id = OLD.company_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE company SET version = version + 1 WHERE id = NEW.company_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in CHILD_TABLES:
+        op.execute(
+            f"""
+            CREATE TRIGGER company_version AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION company_child_bump_version()
+            """
+        )
@@ -0,0 +1,46 @@
+"""indexes
+
+Revision ID: 5c2f8a1d9e34
+Revises: 0285bccbf11b
+Create Date: 2025-09-02 12:14:08.531907
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5c2f8a1d9e34"
+down_revision: Union[str, Sequence[str], None] = "0285bccbf11b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # spatial index may already exist, it is created together with the geography column by geoalchemy2
+    op.execute("CREATE INDEX IF NOT EXISTS idx_building_coordinates ON building USING gist (coordinates)")
+    op.create_index(
+        "ix_company_name_trgm",
+        "company",
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(op.f("ix_company_building_id"), "company", ["building_id"])
+    op.create_index(op.f("ix_company_activity_activity_id"), "company_activity", ["activity_id"])
+    op.create_index(op.f("ix_phone_company_id"), "phone", ["company_id"])
+    op.create_index(op.f("ix_activity_parent_id"), "activity", ["parent_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # idx_building_coordinates is dropped by the init revision
+    op.drop_index(op.f("ix_activity_parent_id"), table_name="activity")
+    op.drop_index(op.f("ix_phone_company_id"), table_name="phone")
+    op.drop_index(op.f("ix_company_activity_activity_id"), table_name="company_activity")
+    op.drop_index(op.f("ix_company_building_id"), table_name="company")
+    op.drop_index("ix_company_name_trgm", table_name="company", postgresql_using="gin")
@@ -0,0 +1,111 @@
+"""company version
+
+Revision ID: 9b7e3c41d2a6
+Revises: 5c2f8a1d9e34
+Create Date: 2025-09-09 10:41:52.117384
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9b7e3c41d2a6"
+down_revision: Union[str, Sequence[str], None] = "5c2f8a1d9e34"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("company", sa.Column("version", sa.Integer(), server_default=sa.text("1"), nullable=False))
+
+    # any change of the company card (company row, its phones, activities links, building or activity names)
+    # increments company version
+    op.execute(
+        """
+        CREATE FUNCTION company_bump_version() RETURNS trigger AS $$
+        BEGIN
+            IF NEW IS DISTINCT FROM OLD THEN
+                NEW.version := OLD.version + 1;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER company_version BEFORE UPDATE ON company
+        FOR EACH ROW EXECUTE FUNCTION company_bump_version()
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION company_child_bump_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE company SET version = version + 1 WHERE id = OLD.company_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE company SET version = version + 1 WHERE id = NEW.company_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in ("phone", "company_activity"):
+        op.execute(
+            f"""
+            CREATE TRIGGER company_version AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION company_child_bump_version()
+            """
+        )
+    op.execute(
+        """
+        CREATE FUNCTION building_bump_company_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE company SET version = version + 1 WHERE building_id = NEW.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER company_version AFTER UPDATE ON building
+        FOR EACH ROW WHEN (NEW IS DISTINCT FROM OLD) EXECUTE FUNCTION building_bump_company_version()
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION activity_bump_company_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE company SET version = version + 1
+            WHERE id IN (SELECT company_id FROM company_activity WHERE activity_id = NEW.id);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER company_version AFTER UPDATE ON activity
+        FOR EACH ROW WHEN (NEW IS DISTINCT FROM OLD) EXECUTE FUNCTION activity_bump_company_version()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("activity", "building", "company_activity", "phone", "company"):
+        op.execute(f"DROP TRIGGER company_version ON {table}")
+    op.execute("DROP FUNCTION activity_bump_company_version()")
+    op.execute("DROP FUNCTION building_bump_company_version()")
+    op.execute("DROP FUNCTION company_child_bump_version()")
+    op.execute("DROP FUNCTION company_bump_version()")
+    op.drop_column("company", "version")
@@ -0,0 +1,34 @@
+"""building coordinates mercator
+
+Revision ID: a4c9e2d7f1b8
+Revises: 3f8d1c7a5b92
+Create Date: 2025-09-18 14:27:51.339026
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4c9e2d7f1b8"
+down_revision: Union[str, Sequence[str], None] = "3f8d1c7a5b92"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # map tiles filter buildings by their envelope in Web Mercator, the same expression is indexed
+    op.execute(
+        """
+        CREATE INDEX ix_building_coordinates_mercator ON building
+        USING gist (ST_Transform(CAST(coordinates AS geometry), 3857))
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX ix_building_coordinates_mercator")
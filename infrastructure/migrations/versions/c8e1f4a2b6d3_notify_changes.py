@@ -0,0 +1,71 @@
+"""notify changes
+
+Revision ID: c8e1f4a2b6d3
+Revises: a4c9e2d7f1b8
+Create Date: 2025-09-19 10:42:13.871204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c8e1f4a2b6d3"
+down_revision: Union[str, Sequence[str], None] = "a4c9e2d7f1b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRANSITION_TABLES = {"insert": "NEW", "update": "NEW", "delete": "OLD"}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # workers drop cached state of the changed companies when the transaction commits. Changes of phones, activity
+    # links and buildings bump the version of their companies, so they are notified as well. Ids are sent in chunks,
+    # as a payload is limited to 8000 bytes
+    op.execute(
+        """
+        CREATE FUNCTION company_notify_changes() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('company_changes', ids)
+            FROM (
+                SELECT string_agg(id::text, ',') AS ids
+                FROM (SELECT id, row_number() OVER () / 500 AS chunk FROM changed_rows) AS numbered
+                GROUP BY chunk
+            ) AS chunks;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION activity_notify_changes() RETURNS trigger AS $$
+        BEGIN
+            IF EXISTS (SELECT FROM changed_rows) THEN
+                PERFORM pg_notify('activity_changes', '');
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in ("company", "activity"):
+        for event, transition in TRANSITION_TABLES.items():
+            op.execute(
+                f"""
+                CREATE TRIGGER {table}_notify_{event} AFTER {event.upper()} ON {table}
+                REFERENCING {transition} TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION {table}_notify_changes()
+                """
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("company", "activity"):
+        for event in TRANSITION_TABLES:
+            op.execute(f"DROP TRIGGER {table}_notify_{event} ON {table}")
+        op.execute(f"DROP FUNCTION {table}_notify_changes()")
@@ -0,0 +1,46 @@
+"""company search vector
+
+Revision ID: d41a7f0c8b25
+Revises: 9b7e3c41d2a6
+Create Date: 2025-09-10 12:03:27.481920
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d41a7f0c8b25"
+down_revision: Union[str, Sequence[str], None] = "9b7e3c41d2a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "company",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('russian', name)", persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_company_search_vector",
+        "company",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_company_search_vector", table_name="company", postgresql_using="gin")
+    op.drop_column("company", "search_vector")
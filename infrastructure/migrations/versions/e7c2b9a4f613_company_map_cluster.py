@@ -0,0 +1,59 @@
+"""company map cluster
+
+Revision ID: e7c2b9a4f613
+Revises: d41a7f0c8b25
+Create Date: 2025-09-17 10:41:08.215364
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7c2b9a4f613"
+down_revision: Union[str, Sequence[str], None] = "d41a7f0c8b25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # companies per grid cell for zoom levels 0-12, a cell is 1/8 of the tile width
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW company_map_cluster AS
+        WITH building_companies AS (
+            SELECT CAST(b.coordinates AS geometry) AS geom, count(*) AS companies
+            FROM building b JOIN company c ON c.building_id = b.id
+            GROUP BY b.id
+        ),
+        cells AS (
+            SELECT zoom, ST_SnapToGrid(geom, 360.0 / (8 * 2 ^ zoom)) AS cell, geom, companies
+            FROM building_companies CROSS JOIN generate_series(0, 12) AS zoom
+        )
+        SELECT
+            zoom,
+            ST_X(cell) AS cell_lng,
+            ST_Y(cell) AS cell_lat,
+            CAST(sum(companies) AS integer) AS companies,
+            ST_SetSRID(
+                ST_MakePoint(
+                    sum(ST_X(geom) * companies) / sum(companies),
+                    sum(ST_Y(geom) * companies) / sum(companies)
+                ),
+                4326
+            ) AS centroid
+        FROM cells
+        GROUP BY zoom, cell
+        """
+    )
+    # unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute("CREATE UNIQUE INDEX ix_company_map_cluster_cell ON company_map_cluster (zoom, cell_lng, cell_lat)")
+    op.execute("CREATE INDEX ix_company_map_cluster_centroid ON company_map_cluster USING gist (centroid)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW company_map_cluster")
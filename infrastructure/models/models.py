@@ -1,10 +1,11 @@
 from typing import Optional
 
 from geoalchemy2 import Geography
-from sqlalchemy import ForeignKey, Table, Column
+from sqlalchemy import Computed, ForeignKey, Table, Column, Index, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
-from config.const import COORDS_SYSTEM_2D
+from config.const import COORDS_SYSTEM_2D, TEXT_SEARCH_CONFIG
 
 
 class Base(DeclarativeBase):
@@ -15,7 +16,7 @@ company_activity = Table(
     "company_activity",
     Base.metadata,
     Column("company_id", ForeignKey("company.id"), primary_key=True),
-    Column("activity_id", ForeignKey("activity.id"), primary_key=True),
+    Column("activity_id", ForeignKey("activity.id"), primary_key=True, index=True),
 )
 
 
@@ -23,7 +24,7 @@ class PhoneOrm(Base):
     __tablename__ = "phone"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    company_id: Mapped[int] = mapped_column(ForeignKey("company.id"))
+    company_id: Mapped[int] = mapped_column(ForeignKey("company.id"), index=True)
     number: Mapped[str]
 
     company: Mapped["CompanyOrm"] = relationship(back_populates="phones")
@@ -31,11 +32,28 @@ class PhoneOrm(Base):
 
 class CompanyOrm(Base):
     __tablename__ = "company"
+    __table_args__ = (
+        Index(
+            "ix_company_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index("ix_company_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
     legal_form: Mapped[str]
-    building_id: Mapped[int] = mapped_column(ForeignKey("building.id"))
+    building_id: Mapped[int] = mapped_column(ForeignKey("building.id"), index=True)
+    # maintained by database triggers, incremented on any change of the company card
+    version: Mapped[int] = mapped_column(server_default=text("1"))
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', name)", persisted=True),
+        deferred=True,
+    )
 
     building: Mapped["BuildingOrm"] = relationship(back_populates="companies")
     phones: Mapped[list[PhoneOrm]] = relationship(
@@ -54,7 +72,7 @@ class ActivityOrm(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
-    parent_id: Mapped[int | None] = mapped_column(ForeignKey("activity.id"), nullable=True)
+    parent_id: Mapped[int | None] = mapped_column(ForeignKey("activity.id"), nullable=True, index=True)
 
     parent: Mapped[Optional["ActivityOrm"]] = relationship(remote_side=[id], backref="children")
     companies: Mapped[list["CompanyOrm"]] = relationship(secondary=company_activity, back_populates="activities")
@@ -62,6 +80,14 @@ class ActivityOrm(Base):
 
 class BuildingOrm(Base):
     __tablename__ = "building"
+    __table_args__ = (
+        # coordinates in Web Mercator, filtered by map tile envelopes
+        Index(
+            "ix_building_coordinates_mercator",
+            text("ST_Transform(CAST(coordinates AS geometry), 3857)"),
+            postgresql_using="gist",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     address: Mapped[str]
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+
+import asyncpg
+from sqlalchemy import make_url
+
+from domain.cache import ICache
+from infrastructure.repositories.activity_tree import ActivityTreeIndex
+from infrastructure.repositories.cached_company import CachedCompanyRepository
+
+logger = logging.getLogger(__name__)
+
+COMPANY_CHANNEL = "company_changes"
+ACTIVITY_CHANNEL = "activity_changes"
+
+CONNECTION_ERRORS = (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, TimeoutError)
+
+
+class IChangeSubscriber(ABC):
+    """State of the process derived from the database, updated on changes committed by any process"""
+
+    @abstractmethod
+    async def companies_changed(self, company_ids: Sequence[int]) -> None: ...
+
+    @abstractmethod
+    async def activities_changed(self) -> None: ...
+
+    @abstractmethod
+    async def reset(self) -> None:
+        """Anything may have changed, as notifications were lost while disconnected"""
+
+
+class ChangeListener:
+    """
+    Receives the notifications sent by the triggers of the company and activity tables when a transaction commits,
+    and passes them to the subscribers in order. The connection is checked every `check_interval` seconds without
+    notifications, as a connection dropped by the network is not noticed otherwise. Notifications sent while
+    disconnected are lost, so subscribers are reset after reconnecting
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        subscribers: Sequence[IChangeSubscriber],
+        check_interval: float = 10.0,
+        check_timeout: float = 2.0,
+        reconnect_delay: float = 1.0,
+    ) -> None:
+        # asyncpg takes libpq URLs, without the driver of SQLAlchemy
+        self.dsn = make_url(dsn).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.subscribers = subscribers
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.reconnect_delay = reconnect_delay
+        self._connection: asyncpg.Connection | None = None
+        self._notifications: asyncio.Queue[tuple[str, str] | None] = asyncio.Queue()
+
+    async def start(self) -> None:
+        """Listens from now on, changes committed before are not notified"""
+        self._connection = await self._connect()
+
+    async def _connect(self) -> asyncpg.Connection:
+        connection = await asyncpg.connect(self.dsn, timeout=self.check_timeout)
+        connection.add_termination_listener(self._terminated)
+        await connection.add_listener(COMPANY_CHANNEL, self._notified)
+        await connection.add_listener(ACTIVITY_CHANNEL, self._notified)
+        return connection
+
+    def _notified(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        self._notifications.put_nowait((channel, payload))
+
+    def _terminated(self, connection: asyncpg.Connection) -> None:
+        if connection is self._connection:
+            self._notifications.put_nowait(None)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                async with asyncio.timeout(self.check_interval):
+                    notification = await self._notifications.get()
+            except TimeoutError:
+                if await self._is_alive():
+                    continue
+                notification = None
+            if notification is None:
+                await self._reconnect()
+            else:
+                await self.dispatch(*notification)
+
+    async def _is_alive(self) -> bool:
+        if self._connection is None:
+            return False
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                await self._connection.execute("SELECT 1")
+        except CONNECTION_ERRORS:
+            return False
+        return True
+
+    async def _reconnect(self) -> None:
+        logger.warning("connection listening to changes is lost, reconnecting")
+        await self.close()
+        while True:
+            try:
+                self._connection = await self._connect()
+                break
+            except CONNECTION_ERRORS as e:
+                logger.warning("reconnecting to listen to changes failed: %s", e)
+                await asyncio.sleep(self.reconnect_delay)
+        for subscriber in self.subscribers:
+            await subscriber.reset()
+
+    async def dispatch(self, channel: str, payload: str) -> None:
+        if channel == COMPANY_CHANNEL:
+            company_ids = [int(x) for x in payload.split(",")]
+            for subscriber in self.subscribers:
+                await subscriber.companies_changed(company_ids)
+        elif channel == ACTIVITY_CHANNEL:
+            for subscriber in self.subscribers:
+                await subscriber.activities_changed()
+
+    async def close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.terminate()
+
+
+class CacheInvalidator(IChangeSubscriber):
+    """
+    Drops the cached companies that changed, and all cached lists and the activity tree, as any change may alter
+    which companies they contain
+    """
+
+    def __init__(
+        self, company_repo: CachedCompanyRepository, list_cache: ICache, activity_tree: ActivityTreeIndex
+    ) -> None:
+        self.company_repo = company_repo
+        self.list_cache = list_cache
+        self.activity_tree = activity_tree
+
+    async def companies_changed(self, company_ids: Sequence[int]) -> None:
+        await self.company_repo.invalidate(*company_ids)
+        self.list_cache.clear()
+
+    async def activities_changed(self) -> None:
+        self.activity_tree.invalidate()
+        self.list_cache.clear()
+
+    async def reset(self) -> None:
+        self.company_repo.cache.clear()
+        self.list_cache.clear()
+        self.activity_tree.invalidate()
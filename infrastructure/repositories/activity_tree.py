@@ -0,0 +1,111 @@
+import asyncio
+import math
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from contextlib import AbstractContextManager, nullcontext
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from infrastructure.models.models import ActivityOrm
+
+
+class ActivityTree:
+    """
+    Activity taxonomy stored in depth-first (Euler tour) order, so descendants of any activity occupy a contiguous
+    slice right after it
+    """
+
+    def __init__(self, activities: Iterable[tuple[int, int | None]]) -> None:
+        children: dict[int | None, list[int]] = defaultdict(list)
+        ids = set()
+        for activity_id, parent_id in activities:
+            children[parent_id].append(activity_id)
+            ids.add(activity_id)
+
+        self._order: list[int] = []
+        self._depth: dict[int, int] = {}
+        self._enter: dict[int, int] = {}
+        self._exit: dict[int, int] = {}
+
+        roots = [activity_id for parent_id, nodes in children.items() if parent_id not in ids for activity_id in nodes]
+        for root_id in sorted(roots):
+            self._walk(root_id, children)
+
+    def _walk(self, root_id: int, children: dict[int | None, list[int]]) -> None:
+        stack: list[tuple[int, int, bool]] = [(root_id, 0, False)]
+        while stack:
+            activity_id, depth, visited = stack.pop()
+            if visited:
+                self._exit[activity_id] = len(self._order)
+                continue
+            self._enter[activity_id] = len(self._order)
+            self._depth[activity_id] = depth
+            self._order.append(activity_id)
+            stack.append((activity_id, depth, True))
+            for child_id in sorted(children.get(activity_id, ()), reverse=True):
+                stack.append((child_id, depth + 1, False))
+
+    def __contains__(self, activity_id: int) -> bool:
+        return activity_id in self._enter
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def descendants(self, activity_id: int, depth: int | None = None) -> list[int]:
+        """Descendants of the activity not deeper than `depth` levels below it, all of them if depth is None"""
+        if activity_id not in self._enter:
+            return []
+        subtree = self._order[self._enter[activity_id] + 1 : self._exit[activity_id]]
+        if depth is None:
+            return subtree
+        max_depth = self._depth[activity_id] + depth
+        return [x for x in subtree if self._depth[x] <= max_depth]
+
+
+class ActivityTreeIndex:
+    """
+    Per process activity tree, loaded from the database and reloaded after TTL or explicit invalidation. Reloads less
+    than `replica_lag` seconds after an invalidation are done within `primary_reads`, so they see the write
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        ttl: float,
+        primary_reads: Callable[[], AbstractContextManager[None]] | None = None,
+        replica_lag: float = 0.0,
+    ) -> None:
+        self.session = session
+        self.ttl = ttl
+        self.primary_reads = primary_reads
+        self.replica_lag = replica_lag
+        self._tree: ActivityTree | None = None
+        self._loaded_at = 0.0
+        self._invalidated_at = -math.inf
+        self._lock = asyncio.Lock()
+
+    def _is_stale(self) -> bool:
+        return self._tree is None or time.monotonic() - self._loaded_at > self.ttl
+
+    async def get(self) -> ActivityTree:
+        if self._is_stale():
+            async with self._lock:
+                if self._is_stale():
+                    await self.refresh()
+        assert self._tree is not None
+        return self._tree
+
+    async def refresh(self) -> None:
+        recently_invalidated = time.monotonic() - self._invalidated_at < self.replica_lag
+        with self.primary_reads() if self.primary_reads is not None and recently_invalidated else nullcontext():
+            async with self.session() as session:
+                result = await session.execute(select(ActivityOrm.id, ActivityOrm.parent_id))
+                rows = result.all()
+        self._tree = ActivityTree((row.id, row.parent_id) for row in rows)
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self._tree = None
+        self._invalidated_at = time.monotonic()
@@ -0,0 +1,179 @@
+from collections.abc import Sequence
+from typing import cast
+
+from sqlalchemy import CursorResult, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.const import COORDS_SYSTEM_2D
+from domain.exceptions import UnknownActivityParentError
+from domain.models import Activity, Company
+
+# Rows are passed as one array per column and expanded with unnest, so a statement has a fixed number of parameters
+# regardless of the batch size. Updates are skipped for unchanged rows to avoid dead tuples and version bumps.
+
+EXISTING_ACTIVITIES = text("SELECT id FROM activity WHERE id = ANY(CAST(:ids AS integer[]))")
+
+UPSERT_ACTIVITIES = text(
+    """
+    INSERT INTO activity (id, name, parent_id)
+    SELECT * FROM unnest(CAST(:ids AS integer[]), CAST(:names AS varchar[]), CAST(:parent_ids AS integer[]))
+    ON CONFLICT (id) DO UPDATE SET name = excluded.name, parent_id = excluded.parent_id
+    WHERE (activity.name, activity.parent_id) IS DISTINCT FROM (excluded.name, excluded.parent_id)
+    """
+)
+
+UPSERT_BUILDINGS = text(
+    """
+    INSERT INTO building (id, address, coordinates)
+    SELECT id, address, CAST(coordinates AS geography)
+    FROM unnest(CAST(:ids AS integer[]), CAST(:addresses AS varchar[]), CAST(:coordinates AS text[]))
+        AS b(id, address, coordinates)
+    ON CONFLICT (id) DO UPDATE SET address = excluded.address, coordinates = excluded.coordinates
+    WHERE (building.address, CAST(building.coordinates AS text))
+        IS DISTINCT FROM (excluded.address, CAST(excluded.coordinates AS text))
+    """
+)
+
+UPSERT_COMPANIES = text(
+    """
+    INSERT INTO company (id, name, legal_form, building_id)
+    SELECT * FROM unnest(
+        CAST(:ids AS integer[]), CAST(:names AS varchar[]), CAST(:legal_forms AS varchar[]),
+        CAST(:building_ids AS integer[])
+    )
+    ON CONFLICT (id) DO UPDATE
+    SET name = excluded.name, legal_form = excluded.legal_form, building_id = excluded.building_id
+    WHERE (company.name, company.legal_form, company.building_id)
+        IS DISTINCT FROM (excluded.name, excluded.legal_form, excluded.building_id)
+    """
+)
+
+DELETE_STALE_PHONES = text(
+    """
+    DELETE FROM phone
+    WHERE company_id = ANY(CAST(:company_ids AS integer[])) AND NOT id = ANY(CAST(:ids AS integer[]))
+    """
+)
+
+UPSERT_PHONES = text(
+    """
+    INSERT INTO phone (id, company_id, number)
+    SELECT * FROM unnest(CAST(:ids AS integer[]), CAST(:company_ids AS integer[]), CAST(:numbers AS varchar[]))
+    ON CONFLICT (id) DO UPDATE SET company_id = excluded.company_id, number = excluded.number
+    WHERE (phone.company_id, phone.number) IS DISTINCT FROM (excluded.company_id, excluded.number)
+    """
+)
+
+DELETE_STALE_COMPANY_ACTIVITIES = text(
+    """
+    DELETE FROM company_activity ca
+    WHERE ca.company_id = ANY(CAST(:company_ids AS integer[]))
+    AND NOT EXISTS (
+        SELECT 1 FROM unnest(CAST(:link_company_ids AS integer[]), CAST(:link_activity_ids AS integer[]))
+            AS l(company_id, activity_id)
+        WHERE l.company_id = ca.company_id AND l.activity_id = ca.activity_id
+    )
+    """
+)
+
+INSERT_COMPANY_ACTIVITIES = text(
+    """
+    INSERT INTO company_activity (company_id, activity_id)
+    SELECT * FROM unnest(CAST(:company_ids AS integer[]), CAST(:activity_ids AS integer[]))
+    ON CONFLICT DO NOTHING
+    """
+)
+
+# explicit ids from the source do not advance sequences
+SYNC_SEQUENCE = (
+    "SELECT setval(pg_get_serial_sequence('{table}', 'id'), max(id)) FROM {table} HAVING max(id) IS NOT NULL"
+)
+
+
+async def check_activity_parents(session: AsyncSession, activities: dict[int, Activity]) -> None:
+    """
+    Companies only carry the activities they are linked to, so a parent of those missing from the database can only
+    come with another company of the batch. Otherwise the batch is rejected before anything is written
+    """
+    parent_ids = {x.parent_id for x in activities.values() if x.parent_id is not None} - activities.keys()
+    if not parent_ids:
+        return
+    result = await session.execute(EXISTING_ACTIVITIES, {"ids": list(parent_ids)})
+    missing = parent_ids - set(result.scalars())
+    if missing:
+        orphans = sorted(x.id for x in activities.values() if x.parent_id in missing)
+        raise UnknownActivityParentError(
+            f"activities {orphans} refer to parents {sorted(missing)} that are neither in the database nor linked "
+            "to a company of the batch, import companies of the parent activities first"
+        )
+
+
+async def upsert_companies(session: AsyncSession, companies: Sequence[Company]) -> tuple[int, int]:
+    """
+    Inserts or updates companies with their buildings and activities, phones and activity links of the companies are
+    replaced with the given ones. Returns numbers of written companies and activities, raises
+    UnknownActivityParentError if a parent of the activities is unknown
+    """
+    activities = {x.id: x for company in companies for x in company.activities}
+    await check_activity_parents(session, activities)
+    buildings = {x.building.id: x.building for x in companies}
+    phones = list({phone.id: (x.id, phone) for x in companies for phone in x.phones}.values())
+    links = [(x.id, activity.id) for x in companies for activity in x.activities]
+    company_ids = [x.id for x in companies]
+
+    # DML statements return cursor results, the rowcount of which is the number of written rows
+    activities_result = cast(
+        CursorResult,
+        await session.execute(
+            UPSERT_ACTIVITIES,
+            {
+                "ids": list(activities),
+                "names": [x.name for x in activities.values()],
+                "parent_ids": [x.parent_id for x in activities.values()],
+            },
+        ),
+    )
+    await session.execute(
+        UPSERT_BUILDINGS,
+        {
+            "ids": list(buildings),
+            "addresses": [x.address for x in buildings.values()],
+            "coordinates": [f"SRID={COORDS_SYSTEM_2D};POINT({x.longitude} {x.latitude})" for x in buildings.values()],
+        },
+    )
+    companies_result = cast(
+        CursorResult,
+        await session.execute(
+            UPSERT_COMPANIES,
+            {
+                "ids": company_ids,
+                "names": [x.name for x in companies],
+                "legal_forms": [x.legal_form for x in companies],
+                "building_ids": [x.building.id for x in companies],
+            },
+        ),
+    )
+    await session.execute(DELETE_STALE_PHONES, {"company_ids": company_ids, "ids": [x[1].id for x in phones]})
+    await session.execute(
+        UPSERT_PHONES,
+        {
+            "ids": [x[1].id for x in phones],
+            "company_ids": [x[0] for x in phones],
+            "numbers": [x[1].number for x in phones],
+        },
+    )
+    await session.execute(
+        DELETE_STALE_COMPANY_ACTIVITIES,
+        {
+            "company_ids": company_ids,
+            "link_company_ids": [x[0] for x in links],
+            "link_activity_ids": [x[1] for x in links],
+        },
+    )
+    await session.execute(
+        INSERT_COMPANY_ACTIVITIES,
+        {"company_ids": [x[0] for x in links], "activity_ids": [x[1] for x in links]},
+    )
+    for table in ("activity", "building", "company", "phone"):
+        await session.execute(text(SYNC_SEQUENCE.format(table=table)))
+    return companies_result.rowcount, activities_result.rowcount
@@ -0,0 +1,196 @@
+import dataclasses
+import json
+from collections.abc import AsyncIterator, Callable, Sequence
+from contextlib import AbstractContextManager, nullcontext
+
+from domain.models import (
+    Activity,
+    Building,
+    Company,
+    CompanySort,
+    CompanySummary,
+    CompanySummaryPage,
+    CountMode,
+    Phone,
+    SearchMode,
+)
+from domain.repositories import ICompanyRepository
+from infrastructure.cache import ISharedCacheBackend, LRUCache, SingleFlight
+
+
+class CachedCompanyRepository(ICompanyRepository):
+    """
+    Read-through cache of company details in front of another repository. Entries are looked up in the process
+    local LRU first, then in the optional shared backend, then loaded from the wrapped repository. Loads racing an
+    invalidation of the same company are returned to their callers but not cached, as they may predate the write.
+    Companies invalidated less than `replica_lag` seconds ago are loaded within `primary_reads`, so a replica that
+    has not replayed the write yet does not put the old version back into the cache
+    """
+
+    def __init__(
+        self,
+        repo: ICompanyRepository,
+        cache: LRUCache[int, Company],
+        single_flight: SingleFlight[int, Company | None],
+        shared_cache: ISharedCacheBackend | None = None,
+        shared_cache_ttl: float = 300.0,
+        primary_reads: Callable[[], AbstractContextManager[None]] | None = None,
+        replica_lag: float = 0.0,
+    ) -> None:
+        self.repo = repo
+        self.cache = cache
+        self.single_flight = single_flight
+        self.shared_cache = shared_cache
+        self.shared_cache_ttl = shared_cache_ttl
+        self.primary_reads = primary_reads
+        self.replica_lag = replica_lag
+
+    def _reads(self, company_ids: Sequence[int]) -> AbstractContextManager[None]:
+        if self.primary_reads is not None and any(self.cache.deleted_within(x, self.replica_lag) for x in company_ids):
+            return self.primary_reads()
+        return nullcontext()
+
+    async def get_by_id(self, company_id: int) -> Company | None:
+        company = self.cache.get(company_id)
+        if company is not None:
+            return company
+        return await self.single_flight.do(company_id, lambda: self._load(company_id))
+
+    async def _load(self, company_id: int) -> Company | None:
+        generation = self.cache.generation
+        if self.shared_cache is not None:
+            data = await self.shared_cache.get(self._shared_key(company_id))
+            if data is not None:
+                cached = self._loads(data)
+                if not self.cache.deleted_since(company_id, generation):
+                    self.cache.set(company_id, cached)
+                return cached
+
+        with self._reads([company_id]):
+            company = await self.repo.get_by_id(company_id)
+        if company is not None and not self.cache.deleted_since(company_id, generation):
+            self.cache.set(company_id, company)
+            if self.shared_cache is not None:
+                await self.shared_cache.set(self._shared_key(company_id), self._dumps(company), self.shared_cache_ttl)
+        return company
+
+    async def get_many(self, company_ids: Sequence[int]) -> list[Company]:
+        company_ids = list(dict.fromkeys(company_ids))
+        companies = {x: company for x in company_ids if (company := self.cache.get(x)) is not None}
+        missing = [x for x in company_ids if x not in companies]
+        if missing:
+            generation = self.cache.generation
+            with self._reads(missing):
+                loaded = await self.repo.get_many(missing)
+            for company in loaded:
+                if not self.cache.deleted_since(company.id, generation):
+                    self.cache.set(company.id, company)
+                companies[company.id] = company
+        return [companies[x] for x in company_ids if x in companies]
+
+    async def bulk_upsert(self, companies: Sequence[Company]) -> int:
+        written = await self.repo.bulk_upsert(companies)
+        await self.invalidate(*(x.id for x in companies))
+        return written
+
+    async def invalidate(self, *company_ids: int) -> None:
+        for company_id in company_ids:
+            self.cache.delete(company_id)
+            self.single_flight.forget(company_id)
+        if self.shared_cache is not None and company_ids:
+            await self.shared_cache.delete(*(self._shared_key(x) for x in company_ids))
+
+    async def list_filtered(
+        self,
+        building_id: int | None = None,
+        activity_id: int | None = None,
+        activity_children: bool = False,
+        activity_depth: int = 2,
+        name: str | None = None,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
+        lat: float | None = None,
+        lng: float | None = None,
+        radius: int | None = None,
+        latx: float | None = None,
+        lngx: float | None = None,
+        laty: float | None = None,
+        lngy: float | None = None,
+        offset: int = 0,
+        cursor: str | None = None,
+        count: CountMode = CountMode.EXACT,
+        sort: CompanySort = CompanySort.ID,
+    ) -> CompanySummaryPage:
+        return await self.repo.list_filtered(
+            building_id=building_id,
+            activity_id=activity_id,
+            activity_children=activity_children,
+            activity_depth=activity_depth,
+            name=name,
+            search_mode=search_mode,
+            lat=lat,
+            lng=lng,
+            radius=radius,
+            latx=latx,
+            lngx=lngx,
+            laty=laty,
+            lngy=lngy,
+            offset=offset,
+            cursor=cursor,
+            count=count,
+            sort=sort,
+        )
+
+    def stream_filtered(
+        self,
+        building_id: int | None = None,
+        activity_id: int | None = None,
+        activity_children: bool = False,
+        activity_depth: int = 2,
+        name: str | None = None,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
+        lat: float | None = None,
+        lng: float | None = None,
+        radius: int | None = None,
+        latx: float | None = None,
+        lngx: float | None = None,
+        laty: float | None = None,
+        lngy: float | None = None,
+        after_id: int | None = None,
+    ) -> AsyncIterator[CompanySummary]:
+        return self.repo.stream_filtered(
+            building_id=building_id,
+            activity_id=activity_id,
+            activity_children=activity_children,
+            activity_depth=activity_depth,
+            name=name,
+            search_mode=search_mode,
+            lat=lat,
+            lng=lng,
+            radius=radius,
+            latx=latx,
+            lngx=lngx,
+            laty=laty,
+            lngy=lngy,
+            after_id=after_id,
+        )
+
+    @staticmethod
+    def _shared_key(company_id: int) -> str:
+        return f"company:{company_id}"
+
+    @staticmethod
+    def _dumps(company: Company) -> bytes:
+        return json.dumps(dataclasses.asdict(company), ensure_ascii=False, default=float).encode()
+
+    @staticmethod
+    def _loads(data: bytes) -> Company:
+        raw = json.loads(data)
+        return Company(
+            id=raw["id"],
+            name=raw["name"],
+            legal_form=raw["legal_form"],
+            building=Building(**raw["building"]),
+            phones=[Phone(**x) for x in raw["phones"]],
+            activities=[Activity(**x) for x in raw["activities"]],
+            version=raw["version"],
+        )
@@ -1,74 +1,142 @@
-from operator import and_, attrgetter
+import json
+from collections import defaultdict
+from collections.abc import AsyncIterator, Collection, Sequence
 
+from geoalchemy2 import Geography, Geometry, WKTElement
 from geoalchemy2.functions import ST_DWithin
-from geoalchemy2.shape import to_shape
-from sqlalchemy import select, func, literal
+from shapely import Polygon
+from sqlalchemy import ColumnElement, Float, and_, cast, or_, select, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload, aliased
 
 from config.const import COORDS_SYSTEM_2D
 from config.settings import Settings
-from domain.models import Company, Building, Phone, Activity, CompanySummary
+from domain.exceptions import InvalidCursorError, InvalidSortError
+from domain.models import (
+    Company,
+    Building,
+    Phone,
+    Activity,
+    CompanySort,
+    CompanySummary,
+    CompanySummaryPage,
+    CountMode,
+    SearchMode,
+)
 from domain.repositories import ICompanyRepository
 from infrastructure.models.models import (
+    ActivityOrm,
     CompanyOrm,
     BuildingOrm,
-    ActivityOrm,
+    PhoneOrm,
     company_activity,
 )
+from infrastructure.repositories.activity_tree import ActivityTreeIndex
+from infrastructure.repositories.bulk import upsert_companies
+from infrastructure.repositories.pagination import decode_cursor, encode_cursor
+from infrastructure.repositories.search import company_search
+from infrastructure.sql import Explain
 
 
 class CompanyRepository(ICompanyRepository):
-    def __init__(self, session: AsyncSession, settings: Settings) -> None:
+    def __init__(
+        self,
+        session: AsyncSession,
+        settings: Settings,
+        activity_tree: ActivityTreeIndex,
+        read_session: AsyncSession | None = None,
+    ) -> None:
         self.session = session
+        self.read_session = read_session or session
         self.settings = settings
+        self.activity_tree = activity_tree
 
     async def get_by_id(self, company_id: int) -> Company | None:
-        query = (
-            select(CompanyOrm)
-            .where(CompanyOrm.id == company_id)
-            .options(
-                selectinload(CompanyOrm.phones),
-                selectinload(CompanyOrm.activities),
-                selectinload(CompanyOrm.building),
+        async with self.read_session() as session:
+            companies = await self._load_companies(session, [company_id])
+        return companies.get(company_id)
+
+    async def get_many(self, company_ids: Sequence[int]) -> list[Company]:
+        if not company_ids:
+            return []
+        async with self.read_session() as session:
+            companies = await self._load_companies(session, set(company_ids))
+        return [companies[x] for x in dict.fromkeys(company_ids) if x in companies]
+
+    async def bulk_upsert(self, companies: Sequence[Company]) -> int:
+        if not companies:
+            return 0
+        async with self.session() as session:
+            companies_written, activities_written = await upsert_companies(session, companies)
+            await session.commit()
+        if activities_written:
+            self.activity_tree.invalidate()
+        return companies_written
+
+    @staticmethod
+    async def _load_companies(session: AsyncSession, company_ids: Collection[int]) -> dict[int, Company]:
+        """
+        Loads companies with buildings, phones and activities in three statements regardless of the number of ids.
+        Rows are mapped straight to domain objects, without building ORM objects tracked by the session
+        """
+        coordinates = cast(BuildingOrm.coordinates, Geometry(geometry_type="POINT", srid=COORDS_SYSTEM_2D))
+        result = await session.execute(
+            select(
+                CompanyOrm.id,
+                CompanyOrm.name,
+                CompanyOrm.legal_form,
+                CompanyOrm.version,
+                BuildingOrm.id.label("building_id"),
+                BuildingOrm.address,
+                func.ST_X(coordinates).label("x"),
+                func.ST_Y(coordinates).label("y"),
             )
+            .join(BuildingOrm, BuildingOrm.id == CompanyOrm.building_id)
+            .where(CompanyOrm.id.in_(company_ids))
         )
-        async with self.session() as session:
-            result = await session.execute(query)
-        company_orm = result.scalar_one_or_none()
-
-        if not company_orm:
-            return None
-
-        point = to_shape(company_orm.building.coordinates)
-
-        return Company(
-            id=company_orm.id,
-            name=company_orm.name,
-            legal_form=company_orm.legal_form,
-            building=Building(
-                id=company_orm.building.id,
-                address=company_orm.building.address,
-                latitude=point.x,
-                longitude=point.y,
-            ),
-            phones=[Phone(id=phone.id, number=phone.number) for phone in company_orm.phones],
-            activities=[
-                Activity(
-                    id=activity.id,
-                    name=activity.name,
-                    parent_id=activity.parent_id,
-                )
-                for activity in sorted(company_orm.activities, key=attrgetter("id"))
-            ],
+        company_rows = result.all()
+        if not company_rows:
+            return {}
+
+        phones: dict[int, list[Phone]] = defaultdict(list)
+        result = await session.execute(
+            select(PhoneOrm.company_id, PhoneOrm.id, PhoneOrm.number)
+            .where(PhoneOrm.company_id.in_(company_ids))
+            .order_by(PhoneOrm.id)
+        )
+        for row in result:
+            phones[row.company_id].append(Phone(id=row.id, number=row.number))
+
+        activities: dict[int, list[Activity]] = defaultdict(list)
+        result = await session.execute(
+            select(company_activity.c.company_id, ActivityOrm.id, ActivityOrm.name, ActivityOrm.parent_id)
+            .join(ActivityOrm, ActivityOrm.id == company_activity.c.activity_id)
+            .where(company_activity.c.company_id.in_(company_ids))
+            .order_by(ActivityOrm.id)
         )
+        for row in result:
+            activities[row.company_id].append(Activity(id=row.id, name=row.name, parent_id=row.parent_id))
+
+        return {
+            row.id: Company(
+                id=row.id,
+                name=row.name,
+                legal_form=row.legal_form,
+                building=Building(id=row.building_id, address=row.address, latitude=row.y, longitude=row.x),
+                phones=phones[row.id],
+                activities=activities[row.id],
+                version=row.version,
+            )
+            for row in company_rows
+        }
 
     async def list_filtered(
         self,
         building_id: int | None = None,
         activity_id: int | None = None,
         activity_children: bool = False,
+        activity_depth: int = 2,
         name: str | None = None,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
         lat: float | None = None,
         lng: float | None = None,
         radius: int | None = None,
@@ -77,103 +145,269 @@ class CompanyRepository(ICompanyRepository):
         laty: float | None = None,
         lngy: float | None = None,
         offset: int = 0,
-    ) -> tuple[list[CompanySummary], int]:
-        async with self.session() as session:
-            query = (
-                select(CompanyOrm)
-                .options(selectinload(CompanyOrm.building))
-                .limit(self.settings.company_items_per_page)
-                .offset(offset)
+        cursor: str | None = None,
+        count: CountMode = CountMode.EXACT,
+        sort: CompanySort = CompanySort.ID,
+    ) -> CompanySummaryPage:
+        async with self.read_session() as session:
+            conditions = await self._get_filter_conditions(
+                session=session,
+                building_id=building_id,
+                activity_id=activity_id,
+                activity_children=activity_children,
+                activity_depth=activity_depth,
+                name=name,
+                search_mode=search_mode,
+                lat=lat,
+                lng=lng,
+                radius=radius,
+                latx=latx,
+                lngx=lngx,
+                laty=laty,
+                lngy=lngy,
             )
-            count_query = select(func.count()).select_from(CompanyOrm)
-
-            conditions = []
-
-            # search by building
-            if building_id is not None:
-                conditions.append(CompanyOrm.building_id == building_id)
-
-            # search by name
-            if name:
-                conditions.append(CompanyOrm.name.ilike(f"%{name}%"))
-
-            # search by geo point and radius
-            if lat is not None and lng is not None and radius is not None:
-                point = func.ST_MakePoint(lng, lat)
-                subq = select(BuildingOrm.id).where(ST_DWithin(BuildingOrm.coordinates, point, radius))
-                conditions.append(CompanyOrm.building_id.in_(subq))
-
-            # search by geo square
-            if all(v is not None for v in (latx, lngx, laty, lngy)):
-                from shapely import Polygon
-                from geoalchemy2 import WKTElement
-
-                polygon = Polygon(
-                    [
-                        (lngx, latx),
-                        (lngx, laty),
-                        (lngy, laty),
-                        (lngy, latx),
-                        (lngx, latx),
-                    ]
-                )
-
-                polygon_wkt = WKTElement(polygon.wkt, srid=COORDS_SYSTEM_2D, extended=True)
-                subq = select(BuildingOrm.id).where(
-                    func.ST_Covers(
-                        polygon_wkt,
-                        BuildingOrm.coordinates,
-                    )
-                )
-                conditions.append(CompanyOrm.building_id.in_(subq))
-
-            # search by activity/activities
-            if activity_id is not None:
-                activity_ids = [activity_id]
-                if activity_children:
-                    activity_ids += await self._get_descendant_activity_ids(
-                        root_id=activity_id, depth=2, session=session
-                    )
-                subq = select(company_activity.c.company_id).where(company_activity.c.activity_id.in_(activity_ids))
-                conditions.append(CompanyOrm.id.in_(subq))
-
-            if len(conditions) > 1:
-                query = query.where(and_(*conditions))
-                count_query = count_query.where(and_(*conditions))
-            elif len(conditions) > 0:
-                query = query.where(conditions[0])
-                count_query = count_query.where(conditions[0])
-
+            per_page = self.settings.company_items_per_page
+            distance = self._get_distance(lat=lat, lng=lng) if sort == CompanySort.DISTANCE else None
+            # exact total comes with the page in the same statement, unless keyset condition narrows the window.
+            # Distance order is not, as the window over all matches would stop the index returning nearest first
+            window_count = (
+                self.settings.company_list_window_count
+                and count == CountMode.EXACT
+                and cursor is None
+                and distance is None
+            )
+            # full-text matches are ordered by relevance unless sorted by distance, ties and other searches by id
+            search = company_search(name) if name and search_mode == SearchMode.FULLTEXT else None
+            rank = search[1] if search is not None and distance is None else None
+            columns = [CompanyOrm.id, CompanyOrm.name, CompanyOrm.legal_form]
+            order_by = [CompanyOrm.id]
+            if distance is not None:
+                columns.append(distance.label("distance"))
+                order_by.insert(0, distance)
+            elif rank is not None:
+                columns.append(rank.label("rank"))
+                order_by.insert(0, rank.desc())
+            if window_count:
+                columns.append(func.count().over().label("total"))
+            query = select(*columns).where(*conditions)
+            if distance is not None:
+                query = query.join(BuildingOrm, BuildingOrm.id == CompanyOrm.building_id)
+            query = query.order_by(*order_by).limit(per_page + 1).offset(offset)
+            if cursor is not None:
+                query = query.where(self._get_cursor_condition(cursor, rank=rank, distance=distance))
             result = await session.execute(query)
-            companies = result.scalars().all()
+            rows = result.all()
+            next_cursor = None
+            if len(rows) > per_page:
+                last = rows[per_page - 1]
+                key = {"id": last.id}
+                if distance is not None:
+                    key["distance"] = last.distance
+                elif rank is not None:
+                    key["rank"] = last.rank
+                next_cursor = encode_cursor(key)
 
-            count_result = await session.execute(count_query)
-            total = count_result.scalar_one()
+            if window_count and rows:
+                total, is_estimate = rows[0].total, False
+            elif window_count and offset == 0:
+                total, is_estimate = 0, False
+            else:
+                total, is_estimate = await self._count(session=session, conditions=conditions, count=count)
             domain_companies = [
                 CompanySummary(
-                    id=c.id,
-                    name=c.name,
-                    legal_form=c.legal_form,
+                    id=row.id,
+                    name=row.name,
+                    legal_form=row.legal_form,
+                    distance_m=row.distance if distance is not None else None,
                 )
-                for c in companies
+                for row in rows[:per_page]
             ]
-        return domain_companies, total
+        return CompanySummaryPage(
+            items=domain_companies,
+            total=total,
+            next_cursor=next_cursor,
+            is_estimate=is_estimate,
+        )
 
-    async def _get_descendant_activity_ids(self, root_id: int, depth: int, session: AsyncSession) -> list[int]:
-        base = select(ActivityOrm.id, literal(1).label("level")).where(ActivityOrm.parent_id == root_id)
+    async def stream_filtered(
+        self,
+        building_id: int | None = None,
+        activity_id: int | None = None,
+        activity_children: bool = False,
+        activity_depth: int = 2,
+        name: str | None = None,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
+        lat: float | None = None,
+        lng: float | None = None,
+        radius: int | None = None,
+        latx: float | None = None,
+        lngx: float | None = None,
+        laty: float | None = None,
+        lngy: float | None = None,
+        after_id: int | None = None,
+    ) -> AsyncIterator[CompanySummary]:
+        async with self.read_session() as session:
+            conditions = await self._get_filter_conditions(
+                session=session,
+                building_id=building_id,
+                activity_id=activity_id,
+                activity_children=activity_children,
+                activity_depth=activity_depth,
+                name=name,
+                search_mode=search_mode,
+                lat=lat,
+                lng=lng,
+                radius=radius,
+                latx=latx,
+                lngx=lngx,
+                laty=laty,
+                lngy=lngy,
+            )
+            if after_id is not None:
+                conditions.append(CompanyOrm.id > after_id)
+            query = (
+                select(CompanyOrm.id, CompanyOrm.name, CompanyOrm.legal_form)
+                .where(*conditions)
+                .order_by(CompanyOrm.id)
+                .execution_options(yield_per=self.settings.company_export_batch_size)
+            )
+            # server side cursor, rows are fetched by batches as the consumer iterates
+            result = await session.stream(query)
+            async for row in result:
+                yield CompanySummary(id=row.id, name=row.name, legal_form=row.legal_form)
+
+    async def _count(
+        self,
+        session: AsyncSession,
+        conditions: list[ColumnElement[bool]],
+        count: CountMode,
+    ) -> tuple[int | None, bool]:
+        if count == CountMode.NONE:
+            return None, False
 
-        activity_cte = base.cte(name="activity_tree", recursive=True)
+        if count == CountMode.ESTIMATE:
+            estimate = await self._estimate_count(session=session, conditions=conditions)
+            if estimate is not None:
+                return estimate, True
 
-        activity_alias = aliased(ActivityOrm)
+        count_query = select(func.count()).select_from(CompanyOrm).where(*conditions)
+        count_result = await session.execute(count_query)
+        return count_result.scalar_one(), False
 
-        recursive = select(activity_alias.id, (activity_cte.c.level + 1).label("level")).where(
-            activity_alias.parent_id == activity_cte.c.id, activity_cte.c.level < depth
+    async def _estimate_count(self, session: AsyncSession, conditions: list[ColumnElement[bool]]) -> int | None:
+        # unfiltered estimate comes from table statistics, filtered one from the planner row estimate
+        if not conditions:
+            result = await session.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"),
+                {"table": CompanyOrm.__tablename__},
+            )
+            reltuples = result.scalar_one()
+            # table has never been analyzed
+            if reltuples < 0:
+                return None
+            return int(reltuples)
+
+        result = await session.execute(Explain(select(CompanyOrm.id).where(*conditions)))
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @staticmethod
+    def _get_distance(lat: float | None, lng: float | None) -> ColumnElement[float]:
+        if lat is None or lng is None:
+            raise InvalidSortError("Sorting by distance requires lat and lng")
+        point = cast(
+            func.ST_SetSRID(func.ST_MakePoint(lng, lat), COORDS_SYSTEM_2D),
+            Geography(geometry_type="POINT", srid=COORDS_SYSTEM_2D),
         )
+        # KNN operator in ORDER BY lets the GIST index of building coordinates return buildings nearest first,
+        # instead of computing and sorting distances of all matches. Distance is in meters on the sphere.
+        return BuildingOrm.coordinates.op("<->", return_type=Float)(point)
+
+    @staticmethod
+    def _get_cursor_condition(
+        cursor: str,
+        rank: ColumnElement[float] | None = None,
+        distance: ColumnElement[float] | None = None,
+    ) -> ColumnElement[bool]:
+        key = decode_cursor(cursor)
+        if not isinstance(key.get("id"), int):
+            raise InvalidCursorError(cursor)
+        if distance is not None:
+            if not isinstance(key.get("distance"), (int, float)):
+                raise InvalidCursorError(cursor)
+            return or_(distance > key["distance"], and_(distance == key["distance"], CompanyOrm.id > key["id"]))
+        if rank is not None:
+            if not isinstance(key.get("rank"), (int, float)):
+                raise InvalidCursorError(cursor)
+            return or_(rank < key["rank"], and_(rank == key["rank"], CompanyOrm.id > key["id"]))
+        return CompanyOrm.id > key["id"]
+
+    async def _get_filter_conditions(
+        self,
+        session: AsyncSession,
+        building_id: int | None = None,
+        activity_id: int | None = None,
+        activity_children: bool = False,
+        activity_depth: int = 2,
+        name: str | None = None,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
+        lat: float | None = None,
+        lng: float | None = None,
+        radius: int | None = None,
+        latx: float | None = None,
+        lngx: float | None = None,
+        laty: float | None = None,
+        lngy: float | None = None,
+    ) -> list[ColumnElement[bool]]:
+        conditions: list[ColumnElement[bool]] = []
+
+        # search by building
+        if building_id is not None:
+            conditions.append(CompanyOrm.building_id == building_id)
+
+        # search by name
+        search = company_search(name) if name and search_mode == SearchMode.FULLTEXT else None
+        if search is not None:
+            conditions.append(search[0])
+        elif name:
+            conditions.append(CompanyOrm.name.ilike(f"%{name}%"))
+
+        # search by geo point and radius
+        if lat is not None and lng is not None and radius is not None:
+            point = func.ST_MakePoint(lng, lat)
+            subq = select(BuildingOrm.id).where(ST_DWithin(BuildingOrm.coordinates, point, radius))
+            conditions.append(CompanyOrm.building_id.in_(subq))
 
-        activity_cte = activity_cte.union_all(recursive)
+        # search by geo square
+        if all(v is not None for v in (latx, lngx, laty, lngy)):
+            polygon = Polygon(
+                [
+                    (lngx, latx),
+                    (lngx, laty),
+                    (lngy, laty),
+                    (lngy, latx),
+                    (lngx, latx),
+                ]
+            )
+
+            polygon_wkt = WKTElement(polygon.wkt, srid=COORDS_SYSTEM_2D, extended=True)
+            subq = select(BuildingOrm.id).where(
+                func.ST_Covers(
+                    polygon_wkt,
+                    BuildingOrm.coordinates,
+                )
+            )
+            conditions.append(CompanyOrm.building_id.in_(subq))
 
-        query = select(activity_cte.c.id)
+        # search by activity/activities
+        if activity_id is not None:
+            activity_ids = [activity_id]
+            if activity_children:
+                activity_tree = await self.activity_tree.get()
+                activity_ids += activity_tree.descendants(activity_id, depth=activity_depth)
+            subq = select(company_activity.c.company_id).where(company_activity.c.activity_id.in_(activity_ids))
+            conditions.append(CompanyOrm.id.in_(subq))
 
-        result = await session.execute(query)
-        ids = [row[0] for row in result.all()]
-        return ids
+        return conditions
@@ -0,0 +1,128 @@
+import time
+from collections.abc import AsyncIterator, Awaitable, Sequence
+from typing import Any, TypeVar
+
+from config.metrics import REPOSITORY_LATENCY, Histogram
+from domain.models import Company, CompanySort, CompanySummary, CompanySummaryPage, CountMode, SearchMode
+from domain.repositories import ICompanyRepository
+
+T = TypeVar("T")
+
+
+class InstrumentedCompanyRepository(ICompanyRepository):
+    """Records latency of every call to the wrapped repository, labelled by its class name and method"""
+
+    def __init__(self, repo: ICompanyRepository, histogram: Histogram = REPOSITORY_LATENCY) -> None:
+        self.repo = repo
+        self.histogram = histogram
+        self.name = type(repo).__name__
+
+    async def _timed(self, method: str, call: Awaitable[T]) -> T:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await call
+            outcome = "ok"
+            return result
+        finally:
+            self.histogram.labels(repository=self.name, method=method, outcome=outcome).observe(
+                time.perf_counter() - started
+            )
+
+    async def get_by_id(self, company_id: int) -> Company | None:
+        return await self._timed("get_by_id", self.repo.get_by_id(company_id))
+
+    async def get_many(self, company_ids: Sequence[int]) -> list[Company]:
+        return await self._timed("get_many", self.repo.get_many(company_ids))
+
+    async def bulk_upsert(self, companies: Sequence[Company]) -> int:
+        return await self._timed("bulk_upsert", self.repo.bulk_upsert(companies))
+
+    async def list_filtered(
+        self,
+        building_id: int | None = None,
+        activity_id: int | None = None,
+        activity_children: bool = False,
+        activity_depth: int = 2,
+        name: str | None = None,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
+        lat: float | None = None,
+        lng: float | None = None,
+        radius: int | None = None,
+        latx: float | None = None,
+        lngx: float | None = None,
+        laty: float | None = None,
+        lngy: float | None = None,
+        offset: int = 0,
+        cursor: str | None = None,
+        count: CountMode = CountMode.EXACT,
+        sort: CompanySort = CompanySort.ID,
+    ) -> CompanySummaryPage:
+        call = self.repo.list_filtered(
+            building_id=building_id,
+            activity_id=activity_id,
+            activity_children=activity_children,
+            activity_depth=activity_depth,
+            name=name,
+            search_mode=search_mode,
+            lat=lat,
+            lng=lng,
+            radius=radius,
+            latx=latx,
+            lngx=lngx,
+            laty=laty,
+            lngy=lngy,
+            offset=offset,
+            cursor=cursor,
+            count=count,
+            sort=sort,
+        )
+        return await self._timed("list_filtered", call)
+
+    async def stream_filtered(
+        self,
+        building_id: int | None = None,
+        activity_id: int | None = None,
+        activity_children: bool = False,
+        activity_depth: int = 2,
+        name: str | None = None,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
+        lat: float | None = None,
+        lng: float | None = None,
+        radius: int | None = None,
+        latx: float | None = None,
+        lngx: float | None = None,
+        laty: float | None = None,
+        lngy: float | None = None,
+        after_id: int | None = None,
+    ) -> AsyncIterator[CompanySummary]:
+        # whole stream duration is recorded, including time the consumer spends between items
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            companies = self.repo.stream_filtered(
+                building_id=building_id,
+                activity_id=activity_id,
+                activity_children=activity_children,
+                activity_depth=activity_depth,
+                name=name,
+                search_mode=search_mode,
+                lat=lat,
+                lng=lng,
+                radius=radius,
+                latx=latx,
+                lngx=lngx,
+                laty=laty,
+                lngy=lngy,
+                after_id=after_id,
+            )
+            async for company in companies:
+                yield company
+            outcome = "ok"
+        finally:
+            self.histogram.labels(repository=self.name, method="stream_filtered", outcome=outcome).observe(
+                time.perf_counter() - started
+            )
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self.repo, item)
@@ -0,0 +1,73 @@
+from collections.abc import Collection
+from typing import Any
+
+from geoalchemy2 import Geometry
+from sqlalchemy import JSON, ColumnElement, ColumnExpressionArgument, cast, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.const import COORDS_SYSTEM_2D
+from domain.models import Activity, Building, Company, Phone
+from infrastructure.models.models import ActivityOrm, BuildingOrm, CompanyOrm, PhoneOrm, company_activity
+from infrastructure.repositories.company import CompanyRepository
+
+
+def _json_list(value: ColumnElement[Any], order_by: ColumnExpressionArgument[Any]) -> ColumnElement[Any]:
+    return func.coalesce(func.json_agg(aggregate_order_by(value, order_by)), literal_column("'[]'::json"), type_=JSON)
+
+
+class JsonCompanyRepository(CompanyRepository):
+    """
+    Loads a company with phones and activities aggregated by json_agg, so a company is one row of one statement.
+    Lists and exports are the same as in CompanyRepository
+    """
+
+    @staticmethod
+    async def _load_companies(session: AsyncSession, company_ids: Collection[int]) -> dict[int, Company]:
+        coordinates = cast(BuildingOrm.coordinates, Geometry(geometry_type="POINT", srid=COORDS_SYSTEM_2D))
+        phones = (
+            select(_json_list(func.json_build_object("id", PhoneOrm.id, "number", PhoneOrm.number), PhoneOrm.id))
+            .where(PhoneOrm.company_id == CompanyOrm.id)
+            .scalar_subquery()
+        )
+        activities = (
+            select(
+                _json_list(
+                    func.json_build_object(
+                        "id", ActivityOrm.id, "name", ActivityOrm.name, "parent_id", ActivityOrm.parent_id
+                    ),
+                    ActivityOrm.id,
+                )
+            )
+            .join(company_activity, company_activity.c.activity_id == ActivityOrm.id)
+            .where(company_activity.c.company_id == CompanyOrm.id)
+            .scalar_subquery()
+        )
+        result = await session.execute(
+            select(
+                CompanyOrm.id,
+                CompanyOrm.name,
+                CompanyOrm.legal_form,
+                CompanyOrm.version,
+                BuildingOrm.id.label("building_id"),
+                BuildingOrm.address,
+                func.ST_X(coordinates).label("x"),
+                func.ST_Y(coordinates).label("y"),
+                phones.label("phones"),
+                activities.label("activities"),
+            )
+            .join(BuildingOrm, BuildingOrm.id == CompanyOrm.building_id)
+            .where(CompanyOrm.id.in_(company_ids))
+        )
+        return {
+            row.id: Company(
+                id=row.id,
+                name=row.name,
+                legal_form=row.legal_form,
+                building=Building(id=row.building_id, address=row.address, latitude=row.y, longitude=row.x),
+                phones=[Phone(**x) for x in row.phones],
+                activities=[Activity(**x) for x in row.activities],
+                version=row.version,
+            )
+            for row in result
+        }
@@ -0,0 +1,177 @@
+import math
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.const import (
+    COORDS_SYSTEM_2D,
+    MAP_CLUSTER_CELLS_PER_TILE,
+    MAP_CLUSTER_MAX_ZOOM,
+    MAP_TILE_BUFFER,
+    MAP_TILE_EXTENT,
+)
+from config.settings import Settings
+from domain.exceptions import MapAreaTooLargeError
+from domain.models import MapCluster
+from domain.repositories import IMapRepository
+from infrastructure.repositories.activity_tree import ActivityTreeIndex
+
+ENVELOPE = f"ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, {COORDS_SYSTEM_2D})"
+
+# low zoom levels read the aggregates precomputed by the company_map_cluster materialized view
+PRECOMPUTED_CLUSTERS = text(
+    f"""
+    SELECT companies AS count, ST_Y(centroid) AS latitude, ST_X(centroid) AS longitude
+    FROM company_map_cluster
+    WHERE zoom = :zoom AND centroid && {ENVELOPE}
+    """
+)
+
+# higher zoom levels cover few buildings, they are aggregated on the fly with the same grid
+CLUSTERS = text(
+    f"""
+    WITH building_companies AS (
+        SELECT CAST(b.coordinates AS geometry) AS geom, count(*) AS companies
+        FROM building b JOIN company c ON c.building_id = b.id
+        WHERE ST_Covers(CAST({ENVELOPE} AS geography), b.coordinates)
+        GROUP BY b.id
+    )
+    SELECT
+        CAST(sum(companies) AS integer) AS count,
+        sum(ST_Y(geom) * companies) / sum(companies) AS latitude,
+        sum(ST_X(geom) * companies) / sum(companies) AS longitude
+    FROM building_companies
+    GROUP BY ST_SnapToGrid(geom, :cell_size)
+    """
+)
+
+REFRESH_CLUSTERS = text("REFRESH MATERIALIZED VIEW CONCURRENTLY company_map_cluster")
+
+# buildings of the tile with their number of companies and activity ids. Buildings are filtered in Web Mercator by
+# the tile envelope with its buffer, using the expression index of projected coordinates, as the envelope of low zoom
+# tiles is too large to be a geography polygon. The busiest buildings are kept when the tile has more than
+# :max_features of them
+TILE = text(
+    f"""
+    WITH bounds AS (
+        SELECT
+            ST_TileEnvelope(:z, :x, :y) AS geom,
+            ST_TileEnvelope(:z, :x, :y, margin => {MAP_TILE_BUFFER / MAP_TILE_EXTENT}) AS buffered
+    ),
+    features AS (
+        SELECT
+            b.id,
+            b.address,
+            count(DISTINCT c.id) AS companies,
+            array_to_string(array_agg(DISTINCT ca.activity_id), ',') AS activity_ids,
+            ST_AsMVTGeom(
+                ST_Transform(CAST(b.coordinates AS geometry), 3857), bounds.geom, {MAP_TILE_EXTENT}, {MAP_TILE_BUFFER}
+            ) AS geom
+        FROM building b
+        CROSS JOIN bounds
+        JOIN company c ON c.building_id = b.id
+        LEFT JOIN company_activity ca ON ca.company_id = c.id
+        WHERE ST_Transform(CAST(b.coordinates AS geometry), 3857) && bounds.buffered
+        AND (
+            CAST(:activity_ids AS integer[]) IS NULL
+            OR c.id IN (
+                SELECT company_id FROM company_activity WHERE activity_id = ANY(CAST(:activity_ids AS integer[]))
+            )
+        )
+        GROUP BY b.id, bounds.geom
+    ),
+    tile_features AS (
+        SELECT * FROM features WHERE geom IS NOT NULL ORDER BY companies DESC, id LIMIT :max_features
+    )
+    SELECT ST_AsMVT(tile_features, 'buildings', {MAP_TILE_EXTENT}, 'geom', 'id') FROM tile_features
+    """
+)
+
+
+# latitude limit of the Web Mercator projection of map tiles
+MERCATOR_MAX_LAT = 85.0511287798
+
+
+def cell_size(zoom: int) -> float:
+    """Grid cell width in degrees for the zoom level"""
+    return 360.0 / (MAP_CLUSTER_CELLS_PER_TILE * 2**zoom)
+
+
+def tiles_spanned(min_lat: float, min_lng: float, max_lat: float, max_lng: float, zoom: int) -> int:
+    """Number of map tiles of the zoom level covered by the bounding box"""
+    tiles = 2**zoom
+
+    def tile_x(lng: float) -> int:
+        return min(int((lng + 180) / 360 * tiles), tiles - 1)
+
+    def tile_y(lat: float) -> int:
+        lat = math.radians(max(min(lat, MERCATOR_MAX_LAT), -MERCATOR_MAX_LAT))
+        return min(int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * tiles), tiles - 1)
+
+    return (tile_x(max_lng) - tile_x(min_lng) + 1) * (tile_y(min_lat) - tile_y(max_lat) + 1)
+
+
+class MapRepository(IMapRepository):
+    def __init__(
+        self,
+        session: AsyncSession,
+        settings: Settings,
+        activity_tree: ActivityTreeIndex,
+        read_session: AsyncSession | None = None,
+    ) -> None:
+        self.session = session
+        self.read_session = read_session or session
+        self.settings = settings
+        self.activity_tree = activity_tree
+
+    async def clusters(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        zoom: int,
+    ) -> list[MapCluster]:
+        # clusters are bounded by the grid cells of the area, which grow 4 times with every zoom level
+        max_tiles = self.settings.map_clusters_max_tiles
+        if tiles_spanned(min_lat=min_lat, min_lng=min_lng, max_lat=max_lat, max_lng=max_lng, zoom=zoom) > max_tiles:
+            raise MapAreaTooLargeError(f"Bounding box spans more than {max_tiles} tiles at zoom {zoom}")
+        params = {"min_lat": min_lat, "min_lng": min_lng, "max_lat": max_lat, "max_lng": max_lng}
+        if zoom <= MAP_CLUSTER_MAX_ZOOM:
+            query, params = PRECOMPUTED_CLUSTERS, {**params, "zoom": zoom}
+        else:
+            query, params = CLUSTERS, {**params, "cell_size": cell_size(zoom)}
+        async with self.read_session() as session:
+            result = await session.execute(query, params)
+        return [MapCluster(count=row.count, latitude=row.latitude, longitude=row.longitude) for row in result]
+
+    async def refresh_clusters(self) -> None:
+        async with self.session() as session:
+            await session.execute(REFRESH_CLUSTERS)
+            await session.commit()
+
+    async def tile(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        activity_id: int | None = None,
+        activity_children: bool = False,
+        activity_depth: int = 2,
+    ) -> bytes:
+        activity_ids = None
+        if activity_id is not None:
+            activity_ids = [activity_id]
+            if activity_children:
+                activity_tree = await self.activity_tree.get()
+                activity_ids += activity_tree.descendants(activity_id, depth=activity_depth)
+        params = {
+            "z": z,
+            "x": x,
+            "y": y,
+            "activity_ids": activity_ids,
+            "max_features": self.settings.map_tile_max_features,
+        }
+        async with self.read_session() as session:
+            result = await session.execute(TILE, params)
+        return bytes(result.scalar_one() or b"")
@@ -0,0 +1,25 @@
+import re
+
+from sqlalchemy import ColumnElement, func
+
+from config.const import TEXT_SEARCH_CONFIG
+from infrastructure.models.models import CompanyOrm
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def prefix_tsquery(text: str) -> str | None:
+    """Builds tsquery text matching all words of the text, the words may be incomplete"""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def company_search(text: str) -> tuple[ColumnElement[bool], ColumnElement[float]] | None:
+    """Full-text condition and rank for the company name search, None if the text has no words"""
+    query_text = prefix_tsquery(text)
+    if query_text is None:
+        return None
+    query = func.to_tsquery(TEXT_SEARCH_CONFIG, query_text)
+    return CompanyOrm.search_vector.op("@@")(query), func.ts_rank(CompanyOrm.search_vector, query)
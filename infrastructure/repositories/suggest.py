@@ -0,0 +1,290 @@
+import asyncio
+import bisect
+import heapq
+import logging
+import re
+import time
+from collections.abc import Callable, Container, Iterable, Iterator, Sequence
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass
+from itertools import chain, islice
+
+from sqlalchemy import Integer, any_, cast, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.models import NameSuggestion, Suggestions
+from domain.repositories import ISuggestRepository
+from infrastructure.models.models import ActivityOrm, CompanyOrm
+from infrastructure.notifications import IChangeSubscriber
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_name(name: str) -> str:
+    return name.lower().replace("ё", "е")
+
+
+class PrefixIndex:
+    """
+    Names searchable by the prefix of any of their words. Name suffixes starting at each word are kept in a sorted
+    array, along with the ids and names they come from, so the lookup is a binary search followed by a scan over
+    matching keys only
+    """
+
+    def __init__(self, items: Iterable[tuple[int, str]] = (), max_words: int = 4) -> None:
+        self.max_words = max_words
+        self._keys: list[str] = []
+        self._ids: list[int] = []
+        self._names: list[str] = []
+        self._size = 0
+        self.add(items)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    async def build(cls, items: Sequence[tuple[int, str]], max_words: int = 4, batch_size: int = 100) -> "PrefixIndex":
+        """
+        Builds the index in slices of `batch_size` names, yielding to the event loop after each of them, so a large
+        catalogue does not stall lookups. The slices are sorted separately, then merged, again by slices
+        """
+        index = cls(max_words=max_words)
+        runs = []
+        for start in range(0, len(items), batch_size):
+            # reversed, so merged entries are popped from the end and freed along the way rather than all at once
+            runs.append(index._entries(items[start : start + batch_size])[::-1])
+            await asyncio.sleep(0)
+        merged = heapq.merge(*(cls._drain(x) for x in runs))
+        while entries := list(islice(merged, batch_size)):
+            index._keys.extend(x[0] for x in entries)
+            index._ids.extend(x[1] for x in entries)
+            index._names.extend(x[2] for x in entries)
+            await asyncio.sleep(0)
+        index._size = len(items)
+        return index
+
+    @staticmethod
+    def _drain(entries: list[tuple[str, int, str]]) -> Iterator[tuple[str, int, str]]:
+        while entries:
+            yield entries.pop()
+
+    def _entries(self, items: Iterable[tuple[int, str]]) -> list[tuple[str, int, str]]:
+        """Sorted suffixes of the names starting at each word, with the id and the name they come from"""
+        entries = []
+        for item_id, name in items:
+            normalized = normalize_name(name)
+            for match in list(_WORD_RE.finditer(normalized))[: self.max_words]:
+                entries.append((normalized[match.start() :], item_id, name))
+        entries.sort()
+        return entries
+
+    def add(self, items: Iterable[tuple[int, str]]) -> None:
+        """Adds new names, existing ids are expected to be handled by rebuilding the index"""
+        items = list(items)
+        entries = self._entries(items)
+        self._size += len(items)
+        if not entries:
+            return
+        # two sorted runs are merged by timsort in linear time
+        merged = sorted(chain(zip(self._keys, self._ids, self._names), entries))
+        self._keys = [x[0] for x in merged]
+        self._ids = [x[1] for x in merged]
+        self._names = [x[2] for x in merged]
+
+    def search(self, prefix: str, limit: int, exclude: Container[int] = ()) -> list[tuple[int, str]]:
+        prefix = normalize_name(prefix).strip()
+        if not prefix or limit <= 0:
+            return []
+        found: dict[int, str] = {}
+        for i in range(bisect.bisect_left(self._keys, prefix), len(self._keys)):
+            if not self._keys[i].startswith(prefix):
+                break
+            item_id = self._ids[i]
+            if item_id not in found and item_id not in exclude:
+                found[item_id] = self._names[i]
+                if len(found) >= limit:
+                    break
+        return list(found.items())
+
+
+@dataclass(frozen=True)
+class CompanyNames:
+    """Names of the last rebuild, except for the companies changed since then, which are searched by current name"""
+
+    rebuilt: PrefixIndex
+    changed: PrefixIndex
+    changed_ids: frozenset[int]
+
+    def __len__(self) -> int:
+        return len(self.rebuilt) + len(self.changed)
+
+    def search(self, prefix: str, limit: int) -> list[tuple[int, str]]:
+        found = self.rebuilt.search(prefix, limit, exclude=self.changed_ids)
+        return found + self.changed.search(prefix, limit - len(found))
+
+
+class SuggestIndex(IChangeSubscriber):
+    """
+    Per process prefix indexes of company and activity names. Indexes are loaded by the first lookup, later lookups
+    are served from the current indexes while a stale one is refreshed in the background. Companies notified as
+    added, renamed or removed are reloaded by id at most every `refresh_interval` seconds, into a small index that
+    overrides the main one for them, and activities are reloaded once notified. Both are rebuilt from scratch every
+    `rebuild_interval` seconds, or once notifications were lost. Changes notified less than `replica_lag` seconds ago
+    are reloaded within `primary_reads`, so they are not missed by a lagging replica
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        refresh_interval: float,
+        rebuild_interval: float,
+        primary_reads: Callable[[], AbstractContextManager[None]] | None = None,
+        replica_lag: float = 0.0,
+    ) -> None:
+        self.session = session
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.primary_reads = primary_reads
+        self.replica_lag = replica_lag
+        self.companies = CompanyNames(PrefixIndex(), PrefixIndex(), frozenset())
+        self.activities = PrefixIndex()
+        # ids of companies by the time they were notified, to be reloaded and reloaded since the rebuild
+        self._changed: dict[int, float] = {}
+        self._reloaded: dict[int, float] = {}
+        self._changed_names: dict[int, str] = {}
+        self._activities_changed_at: float | None = None
+        self._changes_lost = False
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task[None] | None = None
+
+    async def companies_changed(self, company_ids: Sequence[int]) -> None:
+        self._changed.update(dict.fromkeys(company_ids, time.monotonic()))
+
+    async def activities_changed(self) -> None:
+        self._activities_changed_at = time.monotonic()
+
+    async def reset(self) -> None:
+        self._changes_lost = True
+
+    def _rebuild_due(self) -> bool:
+        return self._changes_lost or time.monotonic() - self._rebuilt_at > self.rebuild_interval
+
+    def _is_stale(self) -> bool:
+        changed = bool(self._changed) or self._activities_changed_at is not None or self._rebuild_due()
+        return changed and time.monotonic() - self._refreshed_at > self.refresh_interval
+
+    async def get(self) -> tuple[CompanyNames, PrefixIndex]:
+        """Indexes of companies and activities"""
+        if not self._refreshed_at:
+            async with self._lock:
+                if not self._refreshed_at:
+                    await self.refresh()
+        elif self._is_stale() and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh_locked(self._rebuild_due()))
+            self._refresh_task.add_done_callback(self._refresh_done)
+        return self.companies, self.activities
+
+    async def _refresh_locked(self, rebuild: bool) -> None:
+        async with self._lock:
+            await self.refresh(rebuild=rebuild)
+
+    @staticmethod
+    def _refresh_done(task: asyncio.Task[None]) -> None:
+        # the indexes are kept, the refresh is retried by the next lookup
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("suggest index refresh failed", exc_info=task.exception())
+
+    def _reads(self, changed_at: Iterable[float]) -> AbstractContextManager[None]:
+        now = time.monotonic()
+        if self.primary_reads is not None and any(now - x < self.replica_lag for x in changed_at):
+            return self.primary_reads()
+        return nullcontext()
+
+    async def refresh(self, rebuild: bool = True) -> None:
+        # changes notified meanwhile are left for the next refresh, the ones taken are put back if it fails
+        changed, self._changed = self._changed, {}
+        activities_changed_at, self._activities_changed_at = self._activities_changed_at, None
+        changes_lost = self._changes_lost and rebuild
+        if rebuild:
+            self._changes_lost = False
+        try:
+            await self._refresh(rebuild, changed, activities_changed_at, changes_lost)
+        except BaseException:
+            self._changed = changed | self._changed
+            self._activities_changed_at = self._activities_changed_at or activities_changed_at
+            self._changes_lost = self._changes_lost or changes_lost
+            raise
+        self._refreshed_at = time.monotonic()
+
+    async def _refresh(
+        self, rebuild: bool, changed: dict[int, float], activities_changed_at: float | None, changes_lost: bool
+    ) -> None:
+        rebuilt = self.companies.rebuilt
+        activities = None
+        reloaded = self._reloaded
+        changed_names = self._changed_names
+        if rebuild:
+            # anything may have changed if notifications were lost, the primary is read to see all of it
+            with self.primary_reads() if self.primary_reads is not None and changes_lost else nullcontext():
+                async with self.session() as session:
+                    result = await session.execute(select(CompanyOrm.id, CompanyOrm.name))
+                    companies = [(row.id, row.name) for row in result]
+                    activities = await self._load_activities(session)
+            # a large catalogue takes a while to index, it is built by slices into a new index meanwhile served stale
+            rebuilt = await PrefixIndex.build(companies)
+            # changes reloaded shortly before may not be replayed yet by the replica the rebuild has read
+            now = time.monotonic()
+            changed = {x: at for x, at in reloaded.items() if now - at < self.replica_lag} | changed
+            reloaded, changed_names = {}, {}
+        elif activities_changed_at is not None:
+            with self._reads([activities_changed_at]):
+                async with self.session() as session:
+                    activities = await self._load_activities(session)
+
+        if changed:
+            with self._reads(changed.values()):
+                async with self.session() as session:
+                    # a single array parameter, as a large import may notify more ids than statement parameters allowed
+                    result = await session.execute(
+                        select(CompanyOrm.id, CompanyOrm.name).where(
+                            CompanyOrm.id == any_(cast(list(changed), ARRAY(Integer)))
+                        )
+                    )
+                    names = {row.id: row.name for row in result}
+            # removed companies are left out of both indexes
+            changed_names = {x: name for x, name in changed_names.items() if x not in changed} | names
+            reloaded = reloaded | changed
+        if rebuild or changed:
+            self.companies = CompanyNames(
+                rebuilt=rebuilt,
+                changed=await PrefixIndex.build(list(changed_names.items())),
+                changed_ids=frozenset(reloaded),
+            )
+            self._reloaded = reloaded
+            self._changed_names = changed_names
+        if activities is not None:
+            self.activities = PrefixIndex(activities)
+        if rebuild:
+            self._rebuilt_at = time.monotonic()
+
+    @staticmethod
+    async def _load_activities(session: AsyncSession) -> list[tuple[int, str]]:
+        result = await session.execute(select(ActivityOrm.id, ActivityOrm.name))
+        return [(row.id, row.name) for row in result]
+
+
+class SuggestRepository(ISuggestRepository):
+    def __init__(self, index: SuggestIndex) -> None:
+        self.index = index
+
+    async def suggest(self, prefix: str, limit: int) -> Suggestions:
+        companies, activities = await self.index.get()
+        return Suggestions(
+            companies=[NameSuggestion(id=x, name=name) for x, name in companies.search(prefix, limit)],
+            activities=[NameSuggestion(id=x, name=name) for x, name in activities.search(prefix, limit)],
+        )
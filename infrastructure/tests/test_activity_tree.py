@@ -0,0 +1,79 @@
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from config.containers import Container
+from infrastructure.models.models import ActivityOrm
+from infrastructure.repositories.activity_tree import ActivityTree, ActivityTreeIndex
+
+
+class TestActivityTree:
+    def test_descendants(self) -> None:
+        """
+        1
+            2
+                3
+                    4
+            5
+        6
+        """
+        tree = ActivityTree([(1, None), (2, 1), (3, 2), (4, 3), (5, 1), (6, None)])
+        assert len(tree) == 6
+        assert tree.descendants(1) == [2, 3, 4, 5]
+        assert tree.descendants(1, depth=1) == [2, 5]
+        assert tree.descendants(1, depth=2) == [2, 3, 5]
+        assert tree.descendants(2, depth=1) == [3]
+        assert tree.descendants(1, depth=0) == []
+        assert tree.descendants(6) == []
+        assert tree.descendants(100) == []
+
+    def test_orphans_are_roots(self) -> None:
+        tree = ActivityTree([(2, 1), (3, 2)])
+        assert 1 not in tree
+        assert tree.descendants(2) == [3]
+
+
+class TestActivityTreeIndex:
+    @pytest.mark.asyncio
+    async def test_get(self, container: Container, activities_tree_orm: tuple[ActivityOrm, ...]) -> None:
+        food, auto, cars, spare, _engine = activities_tree_orm
+        index = container.activity_tree()
+        tree = await index.get()
+        assert tree.descendants(auto.id, depth=2) == [cars.id, spare.id]
+        assert tree.descendants(food.id) == []
+        assert await index.get() is tree
+
+        index.invalidate()
+        assert await index.get() is not tree
+
+    @pytest.mark.asyncio
+    async def test_refresh_after_invalidate_reads_primary(self) -> None:
+        primary_loads = []
+        in_primary_reads = False
+
+        @contextmanager
+        def primary_reads() -> Iterator[None]:
+            nonlocal in_primary_reads
+            in_primary_reads = True
+            try:
+                yield
+            finally:
+                in_primary_reads = False
+
+        @asynccontextmanager
+        async def session() -> AsyncIterator[AsyncMock]:
+            primary_loads.append(in_primary_reads)
+            db = AsyncMock()
+            db.execute.return_value = MagicMock(**{"all.return_value": []})
+            yield db
+
+        index = ActivityTreeIndex(session=session, ttl=60, primary_reads=primary_reads, replica_lag=60)
+        await index.get()
+        index.invalidate()
+        await index.get()
+        index.replica_lag = 0
+        index.invalidate()
+        await index.get()
+        assert primary_loads == [False, True, False]
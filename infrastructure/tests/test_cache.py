@@ -0,0 +1,338 @@
+import asyncio
+from collections.abc import Iterator
+from contextlib import contextmanager
+from unittest.mock import AsyncMock, create_autospec
+
+import pytest
+
+from domain.repositories import ICompanyRepository
+from domain.tests.factories import CompanyFactory
+from infrastructure.cache import ISharedCacheBackend, LRUCache, SingleFlight
+from infrastructure.repositories.cached_company import CachedCompanyRepository
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeSharedCache(ISharedCacheBackend):
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.data.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.data[key] = value
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class TestLRUCache:
+    def test_eviction(self) -> None:
+        cache: LRUCache[int, str] = LRUCache(maxsize=2, ttl=10)
+        cache.set(1, "a")
+        cache.set(2, "b")
+        assert cache.get(1) == "a"
+        cache.set(3, "c")
+        assert cache.get(2) is None
+        assert cache.get(1) == "a"
+        assert cache.get(3) == "c"
+        assert len(cache) == 2
+        assert (cache.hits, cache.misses) == (3, 1)
+
+    def test_ttl(self) -> None:
+        clock = FakeClock()
+        cache: LRUCache[int, str] = LRUCache(maxsize=2, ttl=10, clock=clock)
+        cache.set(1, "a")
+        clock.now = 9
+        assert cache.get(1) == "a"
+        clock.now = 10
+        assert cache.get(1) is None
+        assert len(cache) == 0
+
+    def test_delete(self) -> None:
+        cache: LRUCache[int, str] = LRUCache(maxsize=2, ttl=10)
+        cache.set(1, "a")
+        cache.delete(1)
+        cache.delete(2)
+        assert cache.get(1) is None
+
+    def test_deleted_since(self) -> None:
+        cache: LRUCache[int, str] = LRUCache(maxsize=2, ttl=10)
+        generation = cache.generation
+        cache.delete(1)
+        assert cache.deleted_since(1, generation)
+        assert not cache.deleted_since(2, generation)
+        assert not cache.deleted_since(1, cache.generation)
+
+        # once the delete of the key is forgotten, older loads of any key are assumed stale
+        generation = cache.generation
+        cache.delete(2)
+        cache.delete(3)
+        cache.delete(4)
+        assert cache.deleted_since(1, generation)
+        assert not cache.deleted_since(1, cache.generation)
+
+    def test_deleted_within(self) -> None:
+        clock = FakeClock()
+        cache: LRUCache[int, str] = LRUCache(maxsize=2, ttl=10, clock=clock)
+        assert not cache.deleted_within(1, 5)
+        cache.delete(1)
+        clock.now = 4
+        assert cache.deleted_within(1, 5)
+        assert not cache.deleted_within(2, 5)
+        clock.now = 5
+        assert not cache.deleted_within(1, 5)
+
+        # a forgotten recent delete is assumed to be of any key
+        cache.delete(2)
+        cache.delete(3)
+        cache.delete(4)
+        assert cache.deleted_within(1, 5)
+        clock.now = 10
+        assert not cache.deleted_within(1, 5)
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    async def test_coalesces_concurrent_calls(self) -> None:
+        single_flight: SingleFlight[int, int] = SingleFlight()
+        calls = 0
+
+        async def load() -> int:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*(single_flight.do(1, load) for _ in range(10)))
+        assert results == [42] * 10
+        assert calls == 1
+
+        assert await single_flight.do(1, load) == 42
+        assert calls == 2
+
+    async def test_error_propagated(self) -> None:
+        single_flight: SingleFlight[int, int] = SingleFlight()
+
+        async def load() -> int:
+            await asyncio.sleep(0.01)
+            raise RuntimeError
+
+        results = await asyncio.gather(*(single_flight.do(1, load) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(x, RuntimeError) for x in results)
+
+    async def test_forget(self) -> None:
+        single_flight: SingleFlight[int, int] = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def load() -> int:
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return calls
+
+        first = asyncio.ensure_future(single_flight.do(1, load))
+        await asyncio.sleep(0)
+        single_flight.forget(1)
+        second = asyncio.ensure_future(single_flight.do(1, load))
+        third = asyncio.ensure_future(single_flight.do(1, load))
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(first, second, third) == [2, 2, 2]
+        assert calls == 2
+        assert not single_flight._calls
+
+
+@pytest.mark.asyncio
+class TestCachedCompanyRepository:
+    @staticmethod
+    def make_repo(shared_cache: ISharedCacheBackend | None = None) -> tuple[CachedCompanyRepository, AsyncMock]:
+        inner = create_autospec(ICompanyRepository)
+        repo = CachedCompanyRepository(
+            repo=inner,
+            cache=LRUCache(maxsize=10, ttl=10),
+            single_flight=SingleFlight(),
+            shared_cache=shared_cache,
+        )
+        return repo, inner
+
+    async def test_read_through(self) -> None:
+        repo, inner = self.make_repo()
+        company = CompanyFactory()
+        inner.get_by_id.return_value = company
+        assert await repo.get_by_id(company.id) == company
+        assert await repo.get_by_id(company.id) == company
+        inner.get_by_id.assert_awaited_once_with(company.id)
+
+    async def test_not_found_not_cached(self) -> None:
+        repo, inner = self.make_repo()
+        inner.get_by_id.return_value = None
+        assert await repo.get_by_id(1) is None
+        assert await repo.get_by_id(1) is None
+        assert inner.get_by_id.await_count == 2
+
+    async def test_concurrent_miss_single_load(self) -> None:
+        repo, inner = self.make_repo()
+        company = CompanyFactory()
+
+        async def get_by_id(company_id: int) -> object:
+            await asyncio.sleep(0.01)
+            return company
+
+        inner.get_by_id.side_effect = get_by_id
+        results = await asyncio.gather(*(repo.get_by_id(company.id) for _ in range(20)))
+        assert all(x == company for x in results)
+        inner.get_by_id.assert_awaited_once_with(company.id)
+
+    async def test_invalidate(self) -> None:
+        shared_cache = FakeSharedCache()
+        repo, inner = self.make_repo(shared_cache=shared_cache)
+        company = CompanyFactory()
+        inner.get_by_id.return_value = company
+        await repo.get_by_id(company.id)
+        assert shared_cache.data
+
+        await repo.invalidate(company.id)
+        assert not shared_cache.data
+        await repo.get_by_id(company.id)
+        assert inner.get_by_id.await_count == 2
+
+    async def test_invalidate_during_load(self) -> None:
+        shared_cache = FakeSharedCache()
+        repo, inner = self.make_repo(shared_cache=shared_cache)
+        stale, fresh = CompanyFactory(name="stale"), CompanyFactory(name="fresh")
+        loading, release = asyncio.Event(), asyncio.Event()
+
+        async def get_by_id(company_id: int) -> object:
+            loading.set()
+            await release.wait()
+            return stale
+
+        inner.get_by_id.side_effect = get_by_id
+        load = asyncio.ensure_future(repo.get_by_id(stale.id))
+        await loading.wait()
+        await repo.invalidate(stale.id)
+        release.set()
+        assert await load == stale
+        assert not shared_cache.data
+
+        inner.get_by_id.side_effect = None
+        inner.get_by_id.return_value = fresh
+        assert await repo.get_by_id(stale.id) == fresh
+        assert await repo.get_by_id(stale.id) == fresh
+        assert inner.get_by_id.await_count == 2
+
+    async def test_get_many_invalidate_during_load(self) -> None:
+        repo, inner = self.make_repo()
+        company = CompanyFactory()
+        loading, release = asyncio.Event(), asyncio.Event()
+
+        async def get_many(company_ids: list[int]) -> list[object]:
+            loading.set()
+            await release.wait()
+            return [company]
+
+        inner.get_many.side_effect = get_many
+        load = asyncio.ensure_future(repo.get_many([company.id]))
+        await loading.wait()
+        await repo.invalidate(company.id)
+        release.set()
+        assert await load == [company]
+        assert repo.cache.get(company.id) is None
+
+    async def test_invalidated_loads_from_primary(self) -> None:
+        inner = create_autospec(ICompanyRepository)
+        clock = FakeClock()
+        primary_loads = []
+        in_primary_reads = False
+
+        @contextmanager
+        def primary_reads() -> Iterator[None]:
+            nonlocal in_primary_reads
+            in_primary_reads = True
+            try:
+                yield
+            finally:
+                in_primary_reads = False
+
+        async def get_by_id(company_id: int) -> object:
+            primary_loads.append(in_primary_reads)
+            return company
+
+        async def get_many(company_ids: list[int]) -> list[object]:
+            primary_loads.append(in_primary_reads)
+            return [company]
+
+        repo = CachedCompanyRepository(
+            repo=inner,
+            cache=LRUCache(maxsize=10, ttl=10, clock=clock),
+            single_flight=SingleFlight(),
+            primary_reads=primary_reads,
+            replica_lag=2,
+        )
+        company = CompanyFactory()
+        inner.get_by_id.side_effect = get_by_id
+        inner.get_many.side_effect = get_many
+        await repo.get_by_id(company.id)
+        await repo.invalidate(company.id)
+        await repo.get_by_id(company.id)
+        await repo.invalidate(company.id)
+        await repo.get_many([company.id])
+        await repo.invalidate(company.id)
+        clock.now = 2
+        await repo.get_by_id(company.id)
+        assert primary_loads == [False, True, True, False]
+
+    async def test_shared_cache(self) -> None:
+        shared_cache = FakeSharedCache()
+        repo, inner = self.make_repo(shared_cache=shared_cache)
+        company = CompanyFactory(building__latitude=55.7558, building__longitude=37.6173)
+        inner.get_by_id.return_value = company
+        await repo.get_by_id(company.id)
+
+        # another process with empty local cache
+        other_repo, other_inner = self.make_repo(shared_cache=shared_cache)
+        assert await other_repo.get_by_id(company.id) == company
+        other_inner.get_by_id.assert_not_awaited()
+
+    async def test_get_many(self) -> None:
+        repo, inner = self.make_repo()
+        company_1, company_2 = CompanyFactory.build_batch(size=2)
+        inner.get_by_id.return_value = company_1
+        await repo.get_by_id(company_1.id)
+
+        inner.get_many.return_value = [company_2]
+        res = await repo.get_many([company_2.id, company_1.id, -1])
+        assert res == [company_2, company_1]
+        inner.get_many.assert_awaited_once_with([company_2.id, -1])
+
+        assert await repo.get_many([company_1.id, company_2.id]) == [company_1, company_2]
+        inner.get_many.assert_awaited_once()
+
+    async def test_bulk_upsert_invalidates(self) -> None:
+        repo, inner = self.make_repo()
+        company = CompanyFactory()
+        inner.get_by_id.return_value = company
+        await repo.get_by_id(company.id)
+
+        inner.bulk_upsert.return_value = 1
+        assert await repo.bulk_upsert([company]) == 1
+        inner.bulk_upsert.assert_awaited_once_with([company])
+        await repo.get_by_id(company.id)
+        assert inner.get_by_id.await_count == 2
+
+    async def test_list_filtered_delegated(self) -> None:
+        repo, inner = self.make_repo()
+        await repo.list_filtered(name="test", offset=10)
+        inner.list_filtered.assert_awaited_once()
+        assert inner.list_filtered.await_args.kwargs["name"] == "test"
+        assert inner.list_filtered.await_args.kwargs["offset"] == 10
@@ -1,10 +1,17 @@
 import pytest
+from sqlalchemy import delete, event, insert
+from geoalchemy2 import WKTElement
 from geoalchemy2.shape import to_shape
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config.const import COORDS_SYSTEM_2D
 from config.containers import Container
-from domain.models import Company, Building, Phone, Activity, CompanySummary
-from infrastructure.models.models import CompanyOrm, ActivityOrm
+from domain.exceptions import InvalidCursorError, InvalidSortError, UnknownActivityParentError
+from domain.models import Company, Building, Phone, Activity, CompanySort, CompanySummary, CountMode, SearchMode
+from domain.tests.factories import ActivityFactory, CompanyFactory, PhoneFactory
+from infrastructure.repositories.company import CompanyRepository
+from infrastructure.repositories.pagination import encode_cursor
+from infrastructure.models.models import CompanyOrm, ActivityOrm, PhoneOrm
 from infrastructure.tests.factories import (
     BuildingOrmFactory,
     CompanyOrmFactory,
@@ -31,9 +38,10 @@ class TestCompanyRepository:
         phone_orm_1, phone_orm_2 = PhoneOrmFactory.build_batch(size=2, company=company_orm)
         db.add_all([phone_orm_1, phone_orm_2])
         await db.commit()
+        await db.refresh(company_orm, ["version"])
 
         point = to_shape(building_orm.coordinates)
-        repo = container.company_repo()
+        repo = container.company_db_repo()
         res = await repo.get_by_id(company_orm.id)
 
         expected_res = Company(
@@ -43,8 +51,8 @@ class TestCompanyRepository:
             building=Building(
                 id=building_orm.id,
                 address=building_orm.address,
-                latitude=point.x,
-                longitude=point.y,
+                latitude=point.y,
+                longitude=point.x,
             ),
             phones=[
                 Phone(id=phone_orm_1.id, number=phone_orm_1.number),
@@ -54,15 +62,122 @@ class TestCompanyRepository:
                 Activity(id=activity_orm_1.id, name=activity_orm_1.name, parent_id=None),
                 Activity(id=activity_orm_2.id, name=activity_orm_2.name, parent_id=None),
             ],
+            version=company_orm.version,
         )
         assert res == expected_res
 
+    @pytest.mark.asyncio
+    async def test_get_by_id_version_bumped_on_change(self, db: AsyncSession, company_orm: CompanyOrm) -> None:
+        await db.refresh(company_orm, ["version"])
+        version = company_orm.version
+
+        db.add(PhoneOrmFactory.build(company=company_orm))
+        await db.commit()
+        await db.refresh(company_orm, ["version"])
+        assert company_orm.version == version + 1
+
+        company_orm.name = f"{company_orm.name} updated"
+        await db.commit()
+        await db.refresh(company_orm, ["version"])
+        assert company_orm.version == version + 2
+
+    @pytest.mark.asyncio
+    async def test_version_bumped_once_per_statement(self, db: AsyncSession, company_orm: CompanyOrm) -> None:
+        await db.refresh(company_orm, ["version"])
+        version = company_orm.version
+
+        # multi-row insert and delete, as written by the bulk import
+        numbers = ["+7 900 000-00-01", "+7 900 000-00-02", "+7 900 000-00-03"]
+        await db.execute(insert(PhoneOrm).values([{"company_id": company_orm.id, "number": x} for x in numbers]))
+        await db.execute(delete(PhoneOrm).where(PhoneOrm.company_id == company_orm.id))
+        await db.refresh(company_orm, ["version"])
+        assert company_orm.version == version + 2
+
     @pytest.mark.asyncio
     async def test_get_by_id_not_found(self, container: Container) -> None:
-        repo = container.company_repo()
+        repo = container.company_db_repo()
         res = await repo.get_by_id(-1)
         assert res is None
 
+    @pytest.mark.asyncio
+    async def test_get_many(self, db: AsyncSession, container: Container) -> None:
+        building_orm = BuildingOrmFactory()
+        activity_orm = ActivityOrmFactory()
+        db.add_all([building_orm, activity_orm])
+        await db.flush()
+        companies_orm = CompanyOrmFactory.build_batch(size=20, building=building_orm, activities=[activity_orm])
+        db.add_all(companies_orm)
+        await db.flush()
+        db.add_all([PhoneOrmFactory.build(company=x) for x in companies_orm])
+        await db.commit()
+
+        statements: list[str] = []
+        engine = db.bind.sync_engine
+
+        def listener(conn: object, cursor: object, statement: str, *args: object) -> None:
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            ids = [x.id for x in reversed(companies_orm)] + [-1]
+            res = await container.company_db_repo().get_many(ids)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert [x.id for x in res] == ids[:-1]
+        assert all(len(x.phones) == 1 and x.activities[0].id == activity_orm.id for x in res)
+        # companies with buildings, phones and activities, independent of the number of ids
+        assert len(statements) == 3
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert(self, db: AsyncSession, container: Container) -> None:
+        repo = container.company_db_repo()
+        parent = ActivityFactory(id=900_001, parent_id=None)
+        child = ActivityFactory(id=900_002, parent_id=parent.id)
+        companies = [
+            CompanyFactory(
+                id=900_000 + i,
+                building__id=900_000 + i % 2,
+                building__latitude=55.75,
+                building__longitude=37.61,
+                phones=[PhoneFactory(id=900_000 + i)],
+                activities=[child, parent],
+            )
+            for i in range(3)
+        ]
+        assert await repo.bulk_upsert(companies) == 3
+        res = await repo.get_many([x.id for x in companies])
+        assert [(x.name, x.building.id) for x in res] == [(x.name, x.building.id) for x in companies]
+        assert all((x.building.latitude, x.building.longitude) == (55.75, 37.61) for x in res)
+        assert [x.phones for x in res] == [x.phones for x in companies]
+        assert [x.activities for x in res] == [[parent, child]] * 3
+        versions = {x.id: x.version for x in res}
+
+        # unchanged companies are not written, phones and activities are replaced
+        companies[0].name = "updated"
+        companies[1].phones = [PhoneFactory(id=900_100, number="+7 900 000-00-00")]
+        companies[1].activities = [parent]
+        assert await repo.bulk_upsert(companies) == 1
+        res = await repo.get_many([x.id for x in companies])
+        assert res[0].name == "updated"
+        assert res[1].phones == companies[1].phones
+        assert res[1].activities == [parent]
+        assert res[2].version == versions[companies[2].id]
+        assert res[1].version > versions[companies[1].id]
+
+        # sequences continue after imported ids
+        db.add(CompanyOrmFactory.build(building_id=companies[0].building.id))
+        await db.flush()
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_unknown_parent(self, container: Container) -> None:
+        repo = container.company_db_repo()
+        child = ActivityFactory(id=900_002, parent_id=900_001)
+        company = CompanyFactory(id=900_000, building__id=900_000, activities=[child])
+        with pytest.raises(UnknownActivityParentError, match=r"activities \[900002\] refer to parents \[900001\]"):
+            await repo.bulk_upsert([company])
+        assert await repo.get_many([company.id]) == []
+
     @pytest.mark.asyncio
     async def test_list_filtered_all(self, db: AsyncSession, container: Container) -> None:
         building_orm = BuildingOrmFactory()
@@ -73,18 +188,201 @@ class TestCompanyRepository:
         db.add_all(companies_orm)
         await db.flush()
 
-        repo = container.company_repo()
+        repo = container.company_db_repo()
         settings = container.settings()
         res = await repo.list_filtered()
-        assert all([isinstance(c, CompanySummary) for c in res[0]]) is True
-        assert len(res[0]) == settings.company_items_per_page
-        assert res[1] == companies_count
+        assert all([isinstance(c, CompanySummary) for c in res.items]) is True
+        assert len(res.items) == settings.company_items_per_page
+        assert res.total == companies_count
 
         offset = 10
         res = await repo.list_filtered(offset=offset)
-        assert all([isinstance(c, CompanySummary) for c in res[0]]) is True
-        assert len(res[0]) == res[1] - offset
-        assert res[1] == companies_count
+        assert all([isinstance(c, CompanySummary) for c in res.items]) is True
+        assert len(res.items) == res.total - offset
+        assert res.total == companies_count
+
+    @pytest.mark.asyncio
+    async def test_stream_filtered(self, db: AsyncSession, container: Container) -> None:
+        building_orm = BuildingOrmFactory()
+        db.add(building_orm)
+        await db.flush()
+        companies_orm = CompanyOrmFactory.build_batch(size=25, building=building_orm)
+        db.add_all(companies_orm)
+        await db.commit()
+
+        repo = CompanyRepository(
+            session=container.db().session,
+            settings=container.settings().model_copy(update={"company_export_batch_size": 10}),
+            activity_tree=container.activity_tree(),
+        )
+        ids = sorted(x.id for x in companies_orm)
+        res = [x async for x in repo.stream_filtered(building_id=building_orm.id)]
+        assert [x.id for x in res] == ids
+        assert all(isinstance(x, CompanySummary) for x in res)
+
+        res = [x async for x in repo.stream_filtered(building_id=building_orm.id, after_id=ids[9])]
+        assert [x.id for x in res] == ids[10:]
+
+    @pytest.mark.asyncio
+    async def test_list_filtered_cursor(self, db: AsyncSession, container: Container) -> None:
+        building_orm = BuildingOrmFactory()
+        db.add(building_orm)
+        await db.flush()
+        companies_count = 25
+        companies_orm = CompanyOrmFactory.build_batch(size=companies_count, building=building_orm)
+        db.add_all(companies_orm)
+        await db.flush()
+
+        repo = container.company_db_repo()
+        settings = container.settings()
+        seen_ids: list[int] = []
+        res = await repo.list_filtered()
+        seen_ids += [c.id for c in res.items]
+        while res.next_cursor is not None:
+            assert len(res.items) == settings.company_items_per_page
+            res = await repo.list_filtered(cursor=res.next_cursor)
+            assert res.total == companies_count
+            seen_ids += [c.id for c in res.items]
+        assert seen_ids == sorted(c.id for c in companies_orm)
+
+    @pytest.mark.asyncio
+    async def test_list_filtered_fulltext(self, db: AsyncSession, container: Container) -> None:
+        building_orm = BuildingOrmFactory()
+        db.add(building_orm)
+        await db.flush()
+        best, other, *rest = [
+            CompanyOrmFactory.build(name=name, building=building_orm)
+            for name in ["Автомобили автомобилей", "Продажа автомобиля"]
+            + [f"Автомобильный салон {i}" for i in range(15)]
+            + ["Московская еда"]
+        ]
+        db.add_all([best, other, *rest])
+        await db.flush()
+
+        repo = container.company_db_repo()
+        # morphology, word order and incomplete words
+        res = await repo.list_filtered(name="автомобиль", search_mode=SearchMode.FULLTEXT)
+        assert [x.id for x in res.items[:2]] == [best.id, other.id]
+        res = await repo.list_filtered(name="еда моск", search_mode=SearchMode.FULLTEXT)
+        assert [x.name for x in res.items] == ["Московская еда"]
+        assert (await repo.list_filtered(name="?!", search_mode=SearchMode.FULLTEXT)).total == 0
+
+        # keyset pagination follows relevance order
+        seen_ids: list[int] = []
+        res = await repo.list_filtered(name="автомоб", search_mode=SearchMode.FULLTEXT)
+        seen_ids += [x.id for x in res.items]
+        while res.next_cursor is not None:
+            res = await repo.list_filtered(name="автомоб", search_mode=SearchMode.FULLTEXT, cursor=res.next_cursor)
+            seen_ids += [x.id for x in res.items]
+        assert seen_ids[0] == best.id
+        assert sorted(seen_ids) == sorted(x.id for x in [best, other, *rest[:-1]])
+
+        with pytest.raises(InvalidCursorError):
+            await repo.list_filtered(name="автомоб", search_mode=SearchMode.FULLTEXT, cursor=encode_cursor({"id": 1}))
+
+    @pytest.mark.asyncio
+    async def test_list_filtered_sort_distance(self, db: AsyncSession, container: Container) -> None:
+        # buildings 0, ~1.1 km and ~11 km north of the point
+        lat, lng = 55.7558, 37.6173
+        buildings = [
+            BuildingOrmFactory(coordinates=WKTElement(f"POINT({lng} {lat + x})", srid=COORDS_SYSTEM_2D))
+            for x in (0.1, 0.0, 0.01)
+        ]
+        db.add_all(buildings)
+        await db.flush()
+        far, near, middle = buildings
+        companies = [
+            CompanyOrmFactory.build(name=f"Компания {i}", building=building)
+            for i, building in enumerate([far, middle, near, middle, far, near] * 3)
+        ]
+        db.add_all(companies)
+        await db.flush()
+
+        repo = container.company_db_repo()
+        res = await repo.list_filtered(lat=lat, lng=lng, sort=CompanySort.DISTANCE)
+        assert res.total == len(companies)
+        distances = [x.distance_m for x in res.items]
+        assert distances == sorted(distances)
+        assert distances[0] == pytest.approx(0, abs=1)
+        assert distances[-1] == pytest.approx(1113, rel=0.01)
+
+        # keyset pagination follows distance order and combines with filters
+        seen: list[CompanySummary] = []
+        res = await repo.list_filtered(lat=lat, lng=lng, sort=CompanySort.DISTANCE, name="компания")
+        seen += res.items
+        while res.next_cursor is not None:
+            res = await repo.list_filtered(
+                lat=lat, lng=lng, sort=CompanySort.DISTANCE, name="компания", cursor=res.next_cursor
+            )
+            seen += res.items
+        assert sorted(x.id for x in seen) == sorted(x.id for x in companies)
+        assert [x.distance_m for x in seen] == sorted(x.distance_m for x in seen)
+        building_ids = {x.id: x.building_id for x in companies}
+        assert [building_ids[x.id] for x in seen] == [near.id] * 6 + [middle.id] * 6 + [far.id] * 6
+
+        res = await repo.list_filtered(lat=lat, lng=lng, radius=5000, sort=CompanySort.DISTANCE)
+        assert res.total == 12
+
+        with pytest.raises(InvalidSortError):
+            await repo.list_filtered(lat=lat, sort=CompanySort.DISTANCE)
+        with pytest.raises(InvalidCursorError):
+            await repo.list_filtered(lat=lat, lng=lng, sort=CompanySort.DISTANCE, cursor=encode_cursor({"id": 1}))
+
+    @pytest.mark.asyncio
+    async def test_list_filtered_window_count(self, db: AsyncSession, container: Container) -> None:
+        building_orm = BuildingOrmFactory()
+        db.add(building_orm)
+        await db.flush()
+        companies_count = 11
+        companies_orm = CompanyOrmFactory.build_batch(size=companies_count, building=building_orm)
+        db.add_all(companies_orm)
+        await db.flush()
+
+        settings = container.settings()
+        window_repo = CompanyRepository(
+            session=container.db().session,
+            settings=settings.model_copy(update={"company_list_window_count": True}),
+            activity_tree=container.activity_tree(),
+        )
+        count_repo = CompanyRepository(
+            session=container.db().session,
+            settings=settings.model_copy(update={"company_list_window_count": False}),
+            activity_tree=container.activity_tree(),
+        )
+        for offset in (0, 10, 20):
+            res = await window_repo.list_filtered(building_id=building_orm.id, offset=offset)
+            assert res == await count_repo.list_filtered(building_id=building_orm.id, offset=offset)
+            assert res.total == companies_count
+
+    @pytest.mark.asyncio
+    async def test_list_filtered_count_modes(self, db: AsyncSession, container: Container) -> None:
+        building_orm = BuildingOrmFactory()
+        db.add(building_orm)
+        await db.flush()
+        companies_orm = CompanyOrmFactory.build_batch(size=3, building=building_orm)
+        db.add_all(companies_orm)
+        await db.flush()
+
+        repo = container.company_db_repo()
+        res = await repo.list_filtered(building_id=building_orm.id, count=CountMode.EXACT)
+        assert res.total == 3
+        assert res.is_estimate is False
+
+        res = await repo.list_filtered(building_id=building_orm.id, count=CountMode.NONE)
+        assert len(res.items) == 3
+        assert res.total is None
+        assert res.is_estimate is False
+
+        res = await repo.list_filtered(building_id=building_orm.id, count=CountMode.ESTIMATE)
+        assert len(res.items) == 3
+        assert isinstance(res.total, int)
+        assert res.is_estimate is True
+
+    @pytest.mark.asyncio
+    async def test_list_filtered_invalid_cursor(self, container: Container) -> None:
+        repo = container.company_db_repo()
+        with pytest.raises(InvalidCursorError):
+            await repo.list_filtered(cursor="not a cursor")
 
     @pytest.mark.asyncio
     async def test_list_filtered_by_params(
@@ -93,54 +391,61 @@ class TestCompanyRepository:
         activities_tree_orm: tuple[ActivityOrm, ...],
         companies_search_setup: tuple[CompanyOrm, ...],
     ) -> None:
-        food, auto, cars, spare, engine = activities_tree_orm
+        _food, auto, cars, _spare, _engine = activities_tree_orm
         food_company, auto_company, cars_company, spare_company, engine_company = companies_search_setup
 
-        repo = container.company_repo()
+        repo = container.company_db_repo()
 
         # search by name
         res = await repo.list_filtered(name="моск")
-        assert len(res[0]) == 1
-        assert res[0][0].id == food_company.id
-        assert res[1] == 1
+        assert len(res.items) == 1
+        assert res.items[0].id == food_company.id
+        assert res.total == 1
 
         # search by building
         res = await repo.list_filtered(building_id=engine_company.building_id)
-        assert len(res[0]) == 1
-        assert res[0][0].id == engine_company.id
-        assert res[1] == 1
+        assert len(res.items) == 1
+        assert res.items[0].id == engine_company.id
+        assert res.total == 1
 
         # search by particular activity
         res = await repo.list_filtered(activity_id=cars.id)
-        assert len(res[0]) == 1
-        assert res[0][0].id == cars_company.id
-        assert res[1] == 1
+        assert len(res.items) == 1
+        assert res.items[0].id == cars_company.id
+        assert res.total == 1
 
         # search by activity with descendants activities of 3 level deep
         # should not give engine_company as it is level 4
         res = await repo.list_filtered(activity_id=auto.id, activity_children=True)
-        assert len(res[0]) == 3
-        assert res[1] == 3
-        res_ids = {c.id for c in res[0]}
+        assert len(res.items) == 3
+        assert res.total == 3
+        res_ids = {c.id for c in res.items}
         expected_ids = {auto_company.id, cars_company.id, spare_company.id}
         assert res_ids == expected_ids
 
+        # search by activity with descendants limited by requested depth
+        res = await repo.list_filtered(activity_id=auto.id, activity_children=True, activity_depth=3)
+        assert {c.id for c in res.items} == expected_ids | {engine_company.id}
+
+        res = await repo.list_filtered(activity_id=auto.id, activity_children=True, activity_depth=0)
+        assert {c.id for c in res.items} == {auto_company.id}
+
         # search by geo point and radius
         res = await repo.list_filtered(lng=37.6173, lat=55.7558, radius=500)  # exact point
-        assert len(res[0]) == 1
-        assert res[0][0].id == food_company.id
+        assert len(res.items) == 1
+        assert res.items[0].id == food_company.id
 
         res = await repo.list_filtered(lng=37.9269, lat=55.6806, radius=500)  # Lubertsi
-        assert len(res[0]) == 0
+        assert len(res.items) == 0
 
         res = await repo.list_filtered(lng=37.9269, lat=55.6806, radius=22000)  # Lubertsi
-        assert len(res[0]) == 1
-        assert res[0][0].id == food_company.id
+        assert len(res.items) == 1
+        assert res.items[0].id == food_company.id
 
         # search by geo square coordinates
         res = await repo.list_filtered(lngx=37.4275, latx=55.7571, lngy=37.7994, laty=55.6241)  # Moscow square
-        assert len(res[0]) == 1
-        assert res[0][0].id == food_company.id
+        assert len(res.items) == 1
+        assert res.items[0].id == food_company.id
 
         res = await repo.list_filtered(lngx=40.4275, latx=50.7571, lngy=40.7994, laty=50.6241)  # Wrong square
-        assert len(res[0]) == 0
+        assert len(res.items) == 0
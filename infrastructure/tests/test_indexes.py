@@ -0,0 +1,84 @@
+import json
+from typing import Any
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.containers import Container
+from domain.models import CompanySort
+from infrastructure.models.models import ActivityOrm, BuildingOrm, CompanyOrm
+from infrastructure.repositories.map import TILE
+from infrastructure.sql import Explain
+from infrastructure.tests.const import COORDS_MOSCOW
+
+
+async def explain_filtered(db: AsyncSession, container: Container, **filters: Any) -> str:
+    repo = container.company_db_repo()
+    conditions = await repo._get_filter_conditions(session=db, **filters)
+    query = select(func.count()).select_from(CompanyOrm).where(*conditions)
+    result = await db.execute(Explain(query))
+    return json.dumps(result.scalar_one())
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_list_filtered_uses_indexes(db: AsyncSession, container: Container, large_dataset: None) -> None:
+    # search by building
+    building_id = (await db.execute(select(func.min(BuildingOrm.id)))).scalar_one()
+    plan = await explain_filtered(db, container, building_id=building_id)
+    assert "ix_company_building_id" in plan
+
+    # search by name
+    plan = await explain_filtered(db, container, name="2ac59075b9")
+    assert "ix_company_name_trgm" in plan
+
+    # search by geo point and radius
+    lng, lat = COORDS_MOSCOW
+    plan = await explain_filtered(db, container, lng=lng, lat=lat, radius=500)
+    assert "idx_building_coordinates" in plan
+    assert "ix_company_building_id" in plan
+
+    # search by geo square
+    plan = await explain_filtered(db, container, lngx=37.6173, latx=55.7571, lngy=37.6274, laty=55.7541)
+    assert "idx_building_coordinates" in plan
+    assert "ix_company_building_id" in plan
+
+    # search by activity
+    activity_id = (await db.execute(select(func.min(ActivityOrm.id)))).scalar_one()
+    plan = await explain_filtered(db, container, activity_id=activity_id)
+    assert "ix_company_activity_activity_id" in plan
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_list_sorted_by_distance_uses_index(db: AsyncSession, container: Container, large_dataset: None) -> None:
+    statements: list[tuple[str, Any]] = []
+    engine = db.bind.sync_engine
+
+    def listener(conn: object, cursor: object, statement: str, parameters: Any, *args: object) -> None:
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        lng, lat = COORDS_MOSCOW
+        await container.company_db_repo().list_filtered(lat=lat, lng=lng, sort=CompanySort.DISTANCE)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    # nearest buildings are read from the GIST index in distance order instead of sorting all companies
+    statement, parameters = next(x for x in statements if "<->" in x[0])
+    conn = await db.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+    plan = json.dumps(result.scalar_one())
+    assert "idx_building_coordinates" in plan
+    assert '"Order By"' in plan
+    assert "WindowAgg" not in plan
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_tile_uses_index(db: AsyncSession, large_dataset: None) -> None:
+    params = {"z": 14, "x": 9904, "y": 5121, "activity_ids": None, "max_features": 5000}
+    result = await db.execute(Explain(TILE), params)
+    assert "ix_building_coordinates_mercator" in json.dumps(result.scalar_one())
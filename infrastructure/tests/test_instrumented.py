@@ -0,0 +1,51 @@
+from collections.abc import AsyncIterator
+from unittest.mock import create_autospec
+
+import pytest
+from prometheus_client import CollectorRegistry, Histogram
+from domain.models import CompanySummary
+from domain.repositories import ICompanyRepository
+from domain.tests.factories import CompanyFactory, CompanySummaryFactory
+from infrastructure.repositories.instrumented import InstrumentedCompanyRepository
+
+
+@pytest.mark.asyncio
+class TestInstrumentedCompanyRepository:
+    @staticmethod
+    def make_repo() -> tuple[InstrumentedCompanyRepository, ICompanyRepository, CollectorRegistry]:
+        inner = create_autospec(ICompanyRepository)
+        registry = CollectorRegistry()
+        histogram = Histogram("h", "H", ["repository", "method", "outcome"], registry=registry)
+        return InstrumentedCompanyRepository(inner, histogram=histogram), inner, registry
+
+    @staticmethod
+    def count(registry: CollectorRegistry, repo: InstrumentedCompanyRepository, method: str, outcome: str) -> float:
+        labels = {"repository": repo.name, "method": method, "outcome": outcome}
+        return registry.get_sample_value("h_count", labels) or 0
+
+    async def test_get_by_id(self) -> None:
+        repo, inner, registry = self.make_repo()
+        company = CompanyFactory()
+        inner.get_by_id.return_value = company
+        assert await repo.get_by_id(company.id) == company
+        assert self.count(registry, repo, "get_by_id", "ok") == 1
+
+    async def test_list_filtered_error(self) -> None:
+        repo, inner, registry = self.make_repo()
+        inner.list_filtered.side_effect = ValueError
+        with pytest.raises(ValueError):
+            await repo.list_filtered(name="test")
+        assert inner.list_filtered.await_args.kwargs["name"] == "test"
+        assert self.count(registry, repo, "list_filtered", "error") == 1
+
+    async def test_stream_filtered(self) -> None:
+        repo, inner, registry = self.make_repo()
+        companies = CompanySummaryFactory.build_batch(size=3)
+
+        async def stream_filtered(**kwargs: object) -> AsyncIterator[CompanySummary]:
+            for company in companies:
+                yield company
+
+        inner.stream_filtered.side_effect = stream_filtered
+        assert [x async for x in repo.stream_filtered(after_id=1)] == companies
+        assert self.count(registry, repo, "stream_filtered", "ok") == 1
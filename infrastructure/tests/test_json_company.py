@@ -0,0 +1,67 @@
+import pytest
+from dependency_injector import providers
+from geoalchemy2.shape import to_shape
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.containers import Container
+from config.settings import Settings
+from infrastructure.repositories.company import CompanyRepository
+from infrastructure.repositories.json_company import JsonCompanyRepository
+from infrastructure.tests.factories import (
+    ActivityOrmFactory,
+    BuildingOrmFactory,
+    CompanyOrmFactory,
+    PhoneOrmFactory,
+)
+
+
+class TestJsonCompanyRepository:
+    def test_selected_by_settings(self, container: Container) -> None:
+        assert type(container.company_db_repo()) is CompanyRepository
+        with container.settings.override(providers.Object(Settings(company_repository="json"))):
+            assert type(container.company_db_repo()) is JsonCompanyRepository
+
+    @pytest.mark.asyncio
+    async def test_get_many_same_as_rows(self, db: AsyncSession, container: Container) -> None:
+        building_orm = BuildingOrmFactory()
+        activity_orm_1, activity_orm_2 = ActivityOrmFactory(), ActivityOrmFactory()
+        db.add_all([building_orm, activity_orm_1, activity_orm_2])
+        await db.flush()
+        companies_orm = CompanyOrmFactory.build_batch(size=5, building=building_orm, activities=[activity_orm_2])
+        companies_orm[0].activities = [activity_orm_1, activity_orm_2]
+        companies_orm[1].activities = []
+        db.add_all(companies_orm)
+        await db.flush()
+        db.add_all(PhoneOrmFactory.build_batch(size=2, company=companies_orm[0]))
+        db.add_all([PhoneOrmFactory.build(company=x) for x in companies_orm[2:]])
+        await db.commit()
+
+        ids = [x.id for x in reversed(companies_orm)] + [-1]
+        expected = await container.company_db_repo().get_many(ids)
+
+        statements: list[str] = []
+        engine = db.bind.sync_engine
+
+        def listener(conn: object, cursor: object, statement: str, *args: object) -> None:
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            with container.settings.override(providers.Object(Settings(company_repository="json"))):
+                res = await container.company_db_repo().get_many(ids)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert res == expected
+        point = to_shape(building_orm.coordinates)
+        assert (res[0].building.latitude, res[0].building.longitude) == (point.y, point.x)
+        assert [x.id for x in res] == ids[:-1]
+        assert res[-2].phones == [] and res[-2].activities == []
+        # companies with phones and activities in one row each
+        assert len(statements) == 1
+
+    @pytest.mark.asyncio
+    async def test_get_by_id_not_found(self, container: Container) -> None:
+        with container.settings.override(providers.Object(Settings(company_repository="json"))):
+            assert await container.company_db_repo().get_by_id(-1) is None
@@ -0,0 +1,105 @@
+import pytest
+from geoalchemy2 import WKTElement
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.const import COORDS_SYSTEM_2D
+from config.containers import Container
+from domain.exceptions import MapAreaTooLargeError
+from infrastructure.models.models import ActivityOrm
+from infrastructure.repositories.map import MapRepository, cell_size, tiles_spanned
+from infrastructure.tests.factories import BuildingOrmFactory, CompanyOrmFactory
+
+
+def test_cell_size() -> None:
+    assert cell_size(0) == 45.0
+    assert cell_size(3) == cell_size(2) / 2
+
+
+def test_tiles_spanned() -> None:
+    world = {"min_lat": -90, "min_lng": -180, "max_lat": 90, "max_lng": 180}
+    assert tiles_spanned(**world, zoom=0) == 1
+    assert tiles_spanned(**world, zoom=4) == 256
+    assert tiles_spanned(min_lat=41.2, min_lng=19.6, max_lat=81.9, max_lng=180, zoom=3) == 12
+    assert tiles_spanned(min_lat=55.7558, min_lng=37.6173, max_lat=55.7558, max_lng=37.6173, zoom=22) == 1
+
+
+class TestMapRepository:
+    @pytest.mark.asyncio
+    async def test_clusters(self, db: AsyncSession, container: Container) -> None:
+        # two buildings in Moscow ~100 m apart and one in Saint Petersburg
+        points = [(55.7558, 37.6173), (55.7567, 37.6173), (59.9343, 30.3351)]
+        buildings = [
+            BuildingOrmFactory(coordinates=WKTElement(f"POINT({lng} {lat})", srid=COORDS_SYSTEM_2D))
+            for lat, lng in points
+        ]
+        db.add_all(buildings)
+        await db.flush()
+        moscow, moscow_near, spb = buildings
+        db.add_all(
+            CompanyOrmFactory.build(building=building) for building in [moscow, moscow, moscow_near, moscow_near, spb]
+        )
+        await db.flush()
+
+        repo = container.map_repo()
+        await repo.refresh_clusters()
+        bbox = {"min_lat": 41.2, "min_lng": 19.6, "max_lat": 81.9, "max_lng": 180.0}
+
+        clusters = sorted(await repo.clusters(**bbox, zoom=3), key=lambda x: x.count)
+        assert [x.count for x in clusters] == [1, 4]
+        assert clusters[0].latitude == pytest.approx(59.9343)
+        assert clusters[1].latitude == pytest.approx((55.7558 + 55.7567) / 2)
+        assert clusters[1].longitude == pytest.approx(37.6173)
+
+        # aggregated on the fly above precomputed zoom levels
+        moscow_bbox = {"min_lat": 55.755, "min_lng": 37.615, "max_lat": 55.757, "max_lng": 37.62}
+        clusters = await repo.clusters(**moscow_bbox, zoom=18)
+        assert sorted(x.count for x in clusters) == [2, 2]
+        clusters = await repo.clusters(**moscow_bbox, zoom=13)
+        assert [x.count for x in clusters] == [4]
+
+        assert await repo.clusters(min_lat=0, min_lng=0, max_lat=1, max_lng=1, zoom=3) == []
+
+    @pytest.mark.asyncio
+    async def test_clusters_area_too_large(self, container: Container) -> None:
+        with pytest.raises(MapAreaTooLargeError):
+            await container.map_repo().clusters(min_lat=55.7, min_lng=37.5, max_lat=55.8, max_lng=37.7, zoom=18)
+
+    @pytest.mark.asyncio
+    async def test_tile(
+        self, db: AsyncSession, container: Container, activities_tree_orm: tuple[ActivityOrm, ...]
+    ) -> None:
+        food, auto, cars, *_ = activities_tree_orm
+        buildings = [
+            BuildingOrmFactory(coordinates=WKTElement(f"POINT({lng} {lat})", srid=COORDS_SYSTEM_2D))
+            for lat, lng in [(55.7558, 37.6173), (55.7567, 37.6173)]
+        ]
+        db.add_all(buildings)
+        await db.flush()
+        db.add_all(
+            [
+                CompanyOrmFactory.build(building=buildings[0], activities=[food]),
+                CompanyOrmFactory.build(building=buildings[0], activities=[cars]),
+                CompanyOrmFactory.build(building=buildings[1], activities=[cars]),
+            ]
+        )
+        await db.flush()
+
+        repo = container.map_repo()
+        tile = await repo.tile(z=10, x=619, y=320)
+        assert b"buildings" in tile
+        assert b"activity_ids" in tile
+        assert await repo.tile(z=10, x=0, y=0) == b""
+        # the whole world in a single tile
+        assert b"buildings" in await repo.tile(z=0, x=0, y=0)
+
+        assert await repo.tile(z=10, x=619, y=320, activity_id=auto.id) == b""
+        filtered = await repo.tile(z=10, x=619, y=320, activity_id=auto.id, activity_children=True)
+        assert b"buildings" in filtered
+        assert filtered != tile
+
+        capped_repo = MapRepository(
+            session=repo.session,
+            settings=container.settings().model_copy(update={"map_tile_max_features": 1}),
+            activity_tree=repo.activity_tree,
+        )
+        assert len(await capped_repo.tile(z=10, x=619, y=320)) < len(tile)
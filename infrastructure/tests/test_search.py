@@ -0,0 +1,12 @@
+from infrastructure.repositories.search import prefix_tsquery
+
+
+class TestPrefixTsquery:
+    def test_words(self) -> None:
+        assert prefix_tsquery("Рога и  Копыта") == "рога:* & и:* & копыта:*"
+
+    def test_special_characters_dropped(self) -> None:
+        assert prefix_tsquery("ООО 'Рога' & (копыта)!:*") == "ооо:* & рога:* & копыта:*"
+
+    def test_no_words(self) -> None:
+        assert prefix_tsquery(" !? ") is None
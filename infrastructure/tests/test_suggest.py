@@ -0,0 +1,237 @@
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.containers import Container
+from domain.models import NameSuggestion
+from infrastructure.models.models import ActivityOrm, BuildingOrm, CompanyOrm
+from infrastructure.repositories.suggest import PrefixIndex, SuggestIndex, SuggestRepository
+from infrastructure.tests.factories import CompanyOrmFactory
+from infrastructure.tests.utils import create_async
+
+
+class TestPrefixIndex:
+    def test_search(self) -> None:
+        index = PrefixIndex([(1, "Рога и копыта"), (2, "Копыто"), (3, "Альфа-Рогатка"), (4, "Ёлка")])
+        assert len(index) == 4
+        assert index.search("рог", limit=10) == [(1, "Рога и копыта"), (3, "Альфа-Рогатка")]
+        assert index.search("Копыт", limit=10) == [(1, "Рога и копыта"), (2, "Копыто")]
+        assert index.search("рога и", limit=10) == [(1, "Рога и копыта")]
+        assert index.search("елк", limit=10) == [(4, "Ёлка")]
+        assert index.search("огат", limit=10) == []
+        assert index.search("  ", limit=10) == []
+
+    def test_limit_counts_unique_ids(self) -> None:
+        index = PrefixIndex([(1, "Сфера сфера сфера"), (2, "Сфера"), (3, "Сферический конь")])
+        assert index.search("сфер", limit=2) == [(1, "Сфера сфера сфера"), (2, "Сфера")]
+        assert index.search("сфер", limit=0) == []
+
+    def test_add(self) -> None:
+        index = PrefixIndex([(1, "Гранит")])
+        index.add([(2, "Графит"), (3, "Вектор")])
+        index.add([])
+        assert index.search("гра", limit=10) == [(1, "Гранит"), (2, "Графит")]
+        assert index.search("век", limit=10) == [(3, "Вектор")]
+
+    @pytest.mark.asyncio
+    async def test_build(self) -> None:
+        items = [(x, f"Компания {x % 7} номер {x}") for x in range(50)]
+        index = await PrefixIndex.build(items, batch_size=8)
+        expected = PrefixIndex(items)
+        assert len(index) == 50
+        assert (index._keys, index._ids, index._names) == (expected._keys, expected._ids, expected._names)
+        assert index.search("номер 4", limit=2) == [(4, "Компания 4 номер 4"), (40, "Компания 5 номер 40")]
+
+    def test_max_words(self) -> None:
+        index = PrefixIndex([(1, "один два три")], max_words=2)
+        assert index.search("два", limit=10) == [(1, "один два три")]
+        assert index.search("три", limit=10) == []
+
+
+class FakeSession:
+    """Returns the queued rows of (id, name) for each statement, waiting for `release` if it is set"""
+
+    def __init__(self) -> None:
+        self.results: list[list[Any]] = []
+        self.release: asyncio.Event | None = None
+        self.refreshes = 0
+
+    def queue(self, *results: list[tuple[int, str]]) -> None:
+        for rows in results:
+            self.results.append([SimpleNamespace(id=x, name=name) for x, name in rows])
+
+    @asynccontextmanager
+    async def __call__(self) -> AsyncIterator["FakeSession"]:
+        self.refreshes += 1
+        if self.release is not None:
+            await self.release.wait()
+        yield self
+
+    async def execute(self, statement: object) -> list[Any]:
+        return self.results.pop(0)
+
+
+class PrimaryReads:
+    def __init__(self) -> None:
+        self.entered = 0
+
+    @contextmanager
+    def __call__(self) -> Iterator[None]:
+        self.entered += 1
+        yield
+
+
+@pytest.mark.asyncio
+class TestSuggestIndex:
+    async def test_refreshed_in_background(self) -> None:
+        session = FakeSession()
+        index = SuggestIndex(session=session, refresh_interval=0, rebuild_interval=3600)
+        repo = SuggestRepository(index=index)
+        session.queue([(1, "Гранит")], [(1, "Грузоперевозки")])
+        result = await repo.suggest("гр", limit=10)
+        assert [x.id for x in result.companies] == [1]
+        rebuilt = index.companies.rebuilt
+
+        # nothing is reloaded until a change is notified
+        await repo.suggest("гр", limit=10)
+        assert session.refreshes == 1
+        await index.companies_changed([2])
+
+        # stale index is served while the refresh waits for the database, a single refresh runs at a time
+        session.release = asyncio.Event()
+        session.queue([(2, "Графит")])
+        result = await repo.suggest("гр", limit=10)
+        assert [x.id for x in result.companies] == [1]
+        await repo.suggest("гр", limit=10)
+        await asyncio.sleep(0)
+        assert session.refreshes == 2
+
+        session.release.set()
+        assert index._refresh_task is not None
+        await index._refresh_task
+        assert index.companies.rebuilt is rebuilt
+        assert len(index.companies.changed) == 1
+        result = await repo.suggest("гр", limit=10)
+        assert [x.id for x in result.companies] == [1, 2]
+        assert [x.id for x in (await repo.suggest("гр", limit=1)).companies] == [1]
+
+    async def test_changed_companies(self) -> None:
+        session = FakeSession()
+        index = SuggestIndex(session=session, refresh_interval=3600, rebuild_interval=3600)
+        session.queue([(1, "Гранит"), (2, "Графит"), (5, "Гравий")], [])
+        await index.refresh()
+
+        # renamed, added below the largest id and removed
+        await index.companies_changed([2, 3, 5])
+        session.queue([(2, "Вектор"), (3, "Грот")])
+        await index.refresh(rebuild=False)
+        assert index.companies.search("гр", limit=10) == [(1, "Гранит"), (3, "Грот")]
+        assert index.companies.search("гр", limit=1) == [(1, "Гранит")]
+        assert index.companies.search("век", limit=10) == [(2, "Вектор")]
+
+        await index.companies_changed([3])
+        session.queue([(3, "Грот и сыновья")])
+        await index.refresh(rebuild=False)
+        assert index.companies.search("гр", limit=10) == [(1, "Гранит"), (3, "Грот и сыновья")]
+        assert index.companies.changed_ids == {2, 3, 5}
+
+        session.queue([(1, "Гранит"), (2, "Вектор"), (3, "Грот и сыновья")], [])
+        await index.refresh()
+        assert len(index.companies.rebuilt) == 3
+        assert len(index.companies.changed) == 0
+        assert index.companies.search("гр", limit=10) == [(1, "Гранит"), (3, "Грот и сыновья")]
+
+    async def test_activities_changed(self) -> None:
+        session = FakeSession()
+        index = SuggestIndex(session=session, refresh_interval=0, rebuild_interval=3600)
+        session.queue([], [(1, "Грузоперевозки")])
+        await index.get()
+        await index.activities_changed()
+        session.queue([(1, "Перевозки"), (2, "Гравировка")])
+        await index.get()
+        assert index._refresh_task is not None
+        await index._refresh_task
+        _, activities = await index.get()
+        assert activities.search("гр", limit=10) == [(2, "Гравировка")]
+
+    async def test_recent_changes_read_from_primary(self) -> None:
+        session = FakeSession()
+        primary_reads = PrimaryReads()
+        index = SuggestIndex(
+            session=session,
+            refresh_interval=3600,
+            rebuild_interval=3600,
+            primary_reads=primary_reads,
+            replica_lag=60,
+        )
+        session.queue([(1, "Гранит")], [])
+        await index.refresh()
+        assert primary_reads.entered == 0
+        await index.companies_changed([2])
+        session.queue([(2, "Графит")])
+        await index.refresh(rebuild=False)
+        assert primary_reads.entered == 1
+
+        # the replica has not replayed the insert yet, the company is read from the primary again
+        session.queue([(1, "Гранит")], [], [(2, "Графит")])
+        await index.refresh()
+        assert primary_reads.entered == 2
+        assert index.companies.search("гр", limit=10) == [(1, "Гранит"), (2, "Графит")]
+
+        # notifications were lost, the rebuild reads everything from the primary
+        await index.reset()
+        assert index._rebuild_due()
+        session.queue([(1, "Гранит"), (2, "Графит")], [], [(2, "Графит")])
+        await index.refresh()
+        assert primary_reads.entered == 4
+        assert not index._rebuild_due()
+
+    async def test_failed_refresh_keeps_index(self) -> None:
+        session = FakeSession()
+        index = SuggestIndex(session=session, refresh_interval=0, rebuild_interval=3600)
+        session.queue([(1, "Гранит")], [])
+        await index.get()
+        await index.companies_changed([2])
+        companies, _ = await index.get()
+        assert index._refresh_task is not None
+        with pytest.raises(IndexError):
+            await index._refresh_task
+        assert index.companies is companies
+        # the change is reloaded by the next refresh
+        assert list(index._changed) == [2]
+
+
+class TestSuggestRepository:
+    @pytest.mark.asyncio
+    async def test_suggest(
+        self,
+        db: AsyncSession,
+        container: Container,
+        company_orm: CompanyOrm,
+        building_orm: BuildingOrm,
+        activities_tree_orm: tuple[ActivityOrm, ...],
+    ) -> None:
+        repo = container.suggest_repo()
+        result = await repo.suggest(company_orm.name[:3], limit=5)
+        assert NameSuggestion(id=company_orm.id, name=company_orm.name) in result.companies
+
+        result = await repo.suggest("легк", limit=5)
+        assert result.activities == [NameSuggestion(id=activities_tree_orm[2].id, name="Легковые")]
+
+        # notified companies are reloaded on the next refresh without rebuilding the index
+        new_company = await create_async(
+            db=db, model=CompanyOrmFactory(name="Уникальное имя", building_id=building_orm.id)
+        )
+        index = container.suggest_index()
+        rebuilt = index.companies.rebuilt
+        await index.companies_changed([new_company.id])
+        await index.refresh(rebuild=False)
+        assert index.companies.rebuilt is rebuilt
+        assert len(index.companies.changed) == 1
+        result = await repo.suggest("уникальн", limit=5)
+        assert result.companies == [NameSuggestion(id=new_company.id, name="Уникальное имя")]
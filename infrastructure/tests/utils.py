@@ -1,6 +1,7 @@
 from typing import TypeVar
 
 from geoalchemy2 import WKTElement
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.const import COORDS_SYSTEM_2D
@@ -88,3 +89,60 @@ async def create_demo_companies(
     )
 
     return food_company, auto_company, cars_company, spare_company, engine_company
+
+
+async def create_large_dataset(
+    db: AsyncSession,
+    companies: int = 1_000_000,
+    buildings: int = 100_000,
+    activities: int = 1_000,
+) -> None:
+    """
+    Seeds the database with a synthetic dataset generated on the server side and refreshes planner statistics
+    """
+    activity_ids = await db.execute(
+        text(
+            "WITH ins AS (INSERT INTO activity (name) SELECT 'activity ' || g FROM generate_series(1, :n) g "
+            "RETURNING id) SELECT min(id), max(id) FROM ins"
+        ),
+        {"n": activities},
+    )
+    activity_min, _ = activity_ids.one()
+
+    building_ids = await db.execute(
+        text(
+            "WITH ins AS (INSERT INTO building (address, coordinates) "
+            "SELECT 'address ' || g, "
+            "ST_SetSRID(ST_MakePoint(20 + random() * 40, 40 + random() * 25), :srid)::geography "
+            "FROM generate_series(1, :n) g RETURNING id) SELECT min(id), max(id) FROM ins"
+        ),
+        {"n": buildings, "srid": COORDS_SYSTEM_2D},
+    )
+    building_min, _ = building_ids.one()
+
+    company_ids = await db.execute(
+        text(
+            "WITH ins AS (INSERT INTO company (name, legal_form, building_id) "
+            "SELECT 'company ' || md5(g::text), 'ООО', :building_min + g % :buildings "
+            "FROM generate_series(1, :n) g RETURNING id) SELECT min(id), max(id) FROM ins"
+        ),
+        {"n": companies, "building_min": building_min, "buildings": buildings},
+    )
+    company_min, company_max = company_ids.one()
+
+    # company version trigger would update every company once more
+    await db.execute(text("ALTER TABLE company_activity DISABLE TRIGGER USER"))
+    await db.execute(
+        text(
+            "INSERT INTO company_activity (company_id, activity_id) "
+            "SELECT id, :activity_min + id % :activities FROM company WHERE id BETWEEN :company_min AND :company_max"
+        ),
+        {
+            "activity_min": activity_min,
+            "activities": activities,
+            "company_min": company_min,
+            "company_max": company_max,
+        },
+    )
+    await db.execute(text("ALTER TABLE company_activity ENABLE TRIGGER USER"))
+    await db.execute(text("ANALYZE activity, building, company, company_activity"))
@@ -1,10 +1,47 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 
+from api.health import health_router
+from api.metrics import MetricsMiddleware, metrics_router, register_container_metrics
 from api.v1.company import company_router
+from api.v1.map import map_router
+from api.v1.suggest import suggest_router
 from config.containers import Container
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    db = app.container.db()
+    lifecycle = app.container.lifecycle()
+    change_listener = app.container.change_listener()
+    # listening before warming up, so changes committed meanwhile are not kept in the caches
+    await change_listener.start()
+    changes = asyncio.create_task(change_listener.run())
+    await lifecycle.warm_up()
+    replica_checks = asyncio.create_task(db.run_replica_checks())
+    metrics_writer = asyncio.create_task(app.container.metrics().run())
+    yield
+    lifecycle.drain()
+    replica_checks.cancel()
+    changes.cancel()
+    await change_listener.close()
+    # awaited, so the gauges of the worker are removed before it exits
+    metrics_writer.cancel()
+    with suppress(asyncio.CancelledError):
+        await metrics_writer
+    await db.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 container = Container()
 app.container = container
 app.include_router(company_router, prefix="/api")
+app.include_router(suggest_router, prefix="/api")
+app.include_router(map_router, prefix="/api")
+app.include_router(metrics_router)
+app.include_router(health_router)
+app.add_middleware(MetricsMiddleware)
+register_container_metrics(container)
@@ -0,0 +1,260 @@
+"""
+Load tests the running API with every companies list filter combination and company detail requests. Filter values
+are sampled from the configured database, so run it against a dataset from `scripts.generate_dataset`. List filters
+are drawn per request, names from the words of sampled companies along with a random page, so requests rarely repeat
+within the list cache TTL. Details are drawn from a sample of companies, so they mostly hit the company cache once it
+is warm. Run the API with `COMPANY_CACHE_SIZE=0 COMPANY_LIST_CACHE_SIZE=0` to measure without caches at all.
+
+    python -m scripts.bench_api --base-url http://127.0.0.1:8000 --requests 2000 --concurrency 20 \
+        --output bench/$(git rev-parse --short HEAD).json --compare bench/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+import asyncpg
+import httpx
+
+from config.settings import Settings
+from config.utils import assemble_dsn
+from scripts.bench_utils import summarize
+
+SAMPLE_SIZE = 1000
+# searched when the database has no company names to sample
+NAMES = ["рог", "альфа", "вектор", "гранит", "сфера", "техно"]
+# center latitude, longitude of the densest and a sparse area of the generated dataset
+POINTS = [(55.7558, 37.6173), (59.9343, 30.3351), (43.1155, 131.8855)]
+
+
+@dataclass
+class Samples:
+    company_ids: list[int]
+    building_ids: list[int]
+    activity_ids: list[int]
+    parent_activity_ids: list[int]
+    names: list[str]
+
+
+async def load_samples(settings: Settings) -> Samples:
+    dsn = assemble_dsn(
+        host=settings.db_host,
+        port=settings.db_port,
+        user=settings.db_user,
+        password=settings.db_password,
+        database=settings.db_name,
+        is_async=False,
+    )
+    conn = await asyncpg.connect(dsn)
+    try:
+        company_ids = await conn.fetch("SELECT id FROM company ORDER BY random() LIMIT $1", SAMPLE_SIZE)
+        building_ids = await conn.fetch(
+            "SELECT DISTINCT building_id FROM company TABLESAMPLE SYSTEM (1) LIMIT $1", SAMPLE_SIZE
+        )
+        activity_ids = await conn.fetch("SELECT id FROM activity ORDER BY random() LIMIT $1", SAMPLE_SIZE)
+        parent_ids = await conn.fetch(
+            "SELECT DISTINCT parent_id FROM activity WHERE parent_id IS NOT NULL ORDER BY parent_id LIMIT $1",
+            SAMPLE_SIZE,
+        )
+        # prefixes of 3 to 5 letters of the words of company names
+        names = await conn.fetch(
+            r"""
+            SELECT DISTINCT lower(left(word, 3 + (random() * 2)::int))
+            FROM (SELECT regexp_split_to_table(name, '\W+') AS word FROM company TABLESAMPLE SYSTEM (1)) AS words
+            WHERE length(word) >= 3
+            LIMIT $1
+            """,
+            SAMPLE_SIZE,
+        )
+    finally:
+        await conn.close()
+    return Samples(
+        company_ids=[x[0] for x in company_ids],
+        building_ids=[x[0] for x in building_ids],
+        activity_ids=[x[0] for x in activity_ids],
+        parent_activity_ids=[x[0] for x in parent_ids] or [x[0] for x in activity_ids],
+        names=[x[0] for x in names] or NAMES,
+    )
+
+
+def square(lat: float, lng: float, size: float) -> dict[str, float]:
+    return {"latx": lat + size, "lngx": lng - size, "laty": lat - size, "lngy": lng + size}
+
+
+def scenarios(s: Samples, rng: random.Random) -> dict[str, Callable[[], tuple[str, str, dict[str, Any]]]]:
+    """Each scenario returns method, path and params of the next request"""
+    companies = "/api/v1/companies/"
+
+    def name() -> dict[str, Any]:
+        return {"name": rng.choice(s.names), "offset": rng.randrange(0, 10) * 10}
+
+    def point(radius: int) -> dict[str, Any]:
+        lat, lng = rng.choice(POINTS)
+        return {"lat": lat + rng.uniform(-0.05, 0.05), "lng": lng + rng.uniform(-0.05, 0.05), "radius": radius}
+
+    def nearest() -> dict[str, Any]:
+        lat, lng = rng.choice(POINTS)
+        return {"lat": lat + rng.uniform(-0.05, 0.05), "lng": lng + rng.uniform(-0.05, 0.05), "sort": "distance"}
+
+    def box(size: float) -> dict[str, Any]:
+        lat, lng = rng.choice(POINTS)
+        return square(lat + rng.uniform(-0.05, 0.05), lng + rng.uniform(-0.05, 0.05), size)
+
+    def tile(zoom: int) -> str:
+        lat, lng = rng.choice(POINTS)
+        n = 2**zoom
+        x = int((lng + rng.uniform(-0.05, 0.05) + 180) / 360 * n)
+        y = int((1 - math.asinh(math.tan(math.radians(lat + rng.uniform(-0.05, 0.05)))) / math.pi) / 2 * n)
+        return f"/api/v1/tiles/{zoom}/{x}/{y}.mvt"
+
+    return {
+        "detail": lambda: ("GET", f"{companies}{rng.choice(s.company_ids)}/", {}),
+        "batch_100": lambda: ("POST", f"{companies}batch/", {"ids": rng.sample(s.company_ids, 100)}),
+        "list_all": lambda: ("GET", companies, {"offset": rng.randrange(0, 100) * 10}),
+        "list_deep_offset": lambda: ("GET", companies, {"offset": rng.randrange(10_000, 100_000)}),
+        "list_count_estimate": lambda: ("GET", companies, {"count": "estimate", **name()}),
+        "list_count_none": lambda: ("GET", companies, {"count": "none", **name()}),
+        "list_building": lambda: ("GET", companies, {"building_id": rng.choice(s.building_ids)}),
+        "list_activity": lambda: ("GET", companies, {"activity_id": rng.choice(s.activity_ids)}),
+        "list_activity_children": lambda: (
+            "GET",
+            companies,
+            {"activity_id": rng.choice(s.parent_activity_ids), "activity_children": True, "activity_depth": 3},
+        ),
+        "list_name": lambda: ("GET", companies, name()),
+        "list_radius": lambda: ("GET", companies, point(rng.choice([500, 2000, 10_000]))),
+        "list_square": lambda: ("GET", companies, box(rng.choice([0.01, 0.05, 0.2]))),
+        "list_nearest": lambda: ("GET", companies, nearest()),
+        "list_activity_nearest": lambda: (
+            "GET",
+            companies,
+            {"activity_id": rng.choice(s.parent_activity_ids), "activity_children": True, **nearest()},
+        ),
+        "list_activity_radius": lambda: (
+            "GET",
+            companies,
+            {"activity_id": rng.choice(s.parent_activity_ids), "activity_children": True, **point(5000)},
+        ),
+        "list_name_square": lambda: ("GET", companies, {**name(), **box(0.1)}),
+        "map_clusters_country": lambda: (
+            "GET",
+            "/api/v1/map/clusters/",
+            {"latx": 41.2, "lngx": 19.6, "laty": 81.9, "lngy": 180, "zoom": rng.choice([2, 3, 4])},
+        ),
+        "map_clusters_city": lambda: ("GET", "/api/v1/map/clusters/", {**box(0.2), "zoom": 11}),
+        "map_tile": lambda: ("GET", tile(rng.choice([8, 11, 14])), {}),
+        "suggest": lambda: ("GET", "/api/v1/suggest/", {"q": rng.choice(s.names)[: rng.randint(1, 4)]}),
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    next_request: Callable[[], tuple[str, str, dict[str, Any]]],
+    requests: int,
+    concurrency: int,
+) -> dict[str, float]:
+    latencies: list[float] = []
+    errors = 0
+    queue: asyncio.Queue[tuple[str, str, dict[str, Any]]] = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(next_request())
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            method, path, params = queue.get_nowait()
+            started = time.perf_counter()
+            if method == "GET":
+                response = await client.get(path, params=params)
+            else:
+                response = await client.request(method, path, json=params)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"requests": requests, "errors": errors, "rps": requests / elapsed, **summarize(latencies)}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]] | None) -> None:
+    header = f"{'scenario':<24} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    print(header + ("  Δp50 %  Δp95 %   Δrps %" if baseline else ""))
+    for scenario, r in results.items():
+        line = (
+            f"{scenario:<24} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+            f"{r['errors']:>7}"
+        )
+        if baseline and scenario in baseline:
+            b = baseline[scenario]
+            line += "".join(f" {(r[key] / b[key] - 1) * 100:>+7.1f}" for key in ("p50_ms", "p95_ms", "rps"))
+        print(line)
+
+
+async def run(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    settings = Settings()
+    rng = random.Random(args.seed)
+    samples = await load_samples(settings)
+    selected = scenarios(samples, rng)
+    if args.scenario:
+        selected = {k: v for k, v in selected.items() if k in args.scenario}
+
+    headers = {"Authorization": f"Token {settings.api_key}"}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results: dict[str, dict[str, float]] = {}
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, limits=limits, timeout=60) as client:
+        for scenario, next_request in selected.items():
+            # warm up connections, caches of the activity tree and prepared statements
+            await run_scenario(client, next_request, requests=args.concurrency, concurrency=args.concurrency)
+            results[scenario] = await run_scenario(client, next_request, args.requests, args.concurrency)
+    return results
+
+
+def main(args: argparse.Namespace) -> None:
+    results = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "base_url": args.base_url,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenario", action="append", help="run only given scenarios, may be repeated")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    main(parser.parse_args())
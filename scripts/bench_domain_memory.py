@@ -0,0 +1,115 @@
+"""
+Reports memory taken by 100k companies on the read path: slotted domain objects, the same objects with a per instance
+`__dict__` and the ORM object graph the repository used to build before copying it into domain objects.
+No database is needed.
+
+    python -m scripts.bench_domain_memory --companies 100000
+"""
+
+import argparse
+import dataclasses
+import gc
+import json
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from geoalchemy2 import WKTElement
+
+from config.const import COORDS_SYSTEM_2D
+from domain.models import Activity, Building, Company, CompanySummary, Phone
+from infrastructure.models.models import ActivityOrm, BuildingOrm, CompanyOrm, PhoneOrm
+
+PHONES = 2
+ACTIVITIES = 2
+
+
+def with_dict(cls: type) -> type:
+    """Same dataclass without slots"""
+    fields = [
+        (x.name, x.type) if x.default is dataclasses.MISSING else (x.name, x.type, x.default)
+        for x in dataclasses.fields(cls)
+    ]
+    return dataclasses.make_dataclass(cls.__name__, fields)
+
+
+def domain_companies(count: int, models: dict[str, type]) -> list[Any]:
+    return [
+        models["Company"](
+            id=i,
+            name=f"Рога и копыта {i}",
+            legal_form="ООО",
+            building=models["Building"](id=i, address=f"г. Москва, ул. Ленина, д. {i}", latitude=55.7, longitude=37.6),
+            phones=[models["Phone"](id=i * PHONES + j, number=f"+7 900 {i:07d}") for j in range(PHONES)],
+            activities=[models["Activity"](id=j, name=f"Деятельность {j}", parent_id=None) for j in range(ACTIVITIES)],
+            version=1,
+        )
+        for i in range(count)
+    ]
+
+
+def orm_companies(count: int) -> list[CompanyOrm]:
+    activities = [ActivityOrm(id=j, name=f"Деятельность {j}", parent_id=None) for j in range(ACTIVITIES)]
+    return [
+        CompanyOrm(
+            id=i,
+            name=f"Рога и копыта {i}",
+            legal_form="ООО",
+            version=1,
+            building=BuildingOrm(
+                id=i,
+                address=f"г. Москва, ул. Ленина, д. {i}",
+                coordinates=WKTElement("POINT(37.6 55.7)", srid=COORDS_SYSTEM_2D),
+            ),
+            phones=[PhoneOrm(id=i * PHONES + j, number=f"+7 900 {i:07d}") for j in range(PHONES)],
+            activities=activities,
+        )
+        for i in range(count)
+    ]
+
+
+def summaries(count: int, cls: type) -> list[Any]:
+    return [cls(id=i, name=f"Рога и копыта {i}", legal_form="ООО") for i in range(count)]
+
+
+def measure(build: Callable[[], list[Any]]) -> float:
+    """Megabytes allocated by the built objects"""
+    gc.collect()
+    tracemalloc.start()
+    objects = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current / 2**20
+
+
+def main(args: argparse.Namespace) -> None:
+    count = args.companies
+    slotted = {"Company": Company, "Building": Building, "Phone": Phone, "Activity": Activity}
+    unslotted = {name: with_dict(cls) for name, cls in slotted.items()}
+    results = {
+        "company_slotted": measure(lambda: domain_companies(count, slotted)),
+        "company_dict": measure(lambda: domain_companies(count, unslotted)),
+        "company_orm_graph": measure(lambda: orm_companies(count)),
+        "summary_slotted": measure(lambda: summaries(count, CompanySummary)),
+        "summary_dict": measure(lambda: summaries(count, with_dict(CompanySummary))),
+    }
+    per = 100_000 / count
+    print(f"{'objects':<20} {'MB per 100k companies':>22}")
+    for name, megabytes in results.items():
+        print(f"{name:<20} {megabytes * per:>22.1f}")
+    previous = results["company_orm_graph"] + results["company_dict"]
+    print(
+        f"read path: {previous * per:.1f} MB before, {results['company_slotted'] * per:.1f} MB now per 100k companies"
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"companies": count, "mb": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=100_000)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    main(parser.parse_args())
@@ -0,0 +1,124 @@
+"""
+Compares CompanyRepository.list_filtered execution paths against the configured database:
+page query followed by a separate count query vs single statement with `count(*) OVER ()` total.
+The baseline is the list query before both: ORM entities with their building loaded by `selectinload`,
+followed by a separate count query.
+
+    python -m scripts.bench_list_query --iterations 200 --output list_query.json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import selectinload
+
+from config.database import DbManager
+from config.settings import Settings
+from domain.models import CompanySummary, CompanySummaryPage
+from infrastructure.models.models import CompanyOrm
+from infrastructure.repositories.activity_tree import ActivityTreeIndex
+from infrastructure.repositories.company import CompanyRepository
+from scripts.bench_utils import summarize
+
+SCENARIOS: dict[str, dict[str, Any]] = {
+    "all": {},
+    "name": {"name": "ком"},
+    "radius": {"lng": 37.6173, "lat": 55.7558, "radius": 5000},
+    "square": {"lngx": 37.4275, "latx": 55.7571, "lngy": 37.7994, "laty": 55.6241},
+    "deep_offset": {"offset": 1000},
+}
+
+
+class BaselineCompanyRepository(CompanyRepository):
+    """List query before the window count: ORM entities with their building, then a separate count query"""
+
+    async def list_filtered(self, offset: int = 0, **filters: Any) -> CompanySummaryPage:  # type: ignore[override]
+        async with self.read_session() as session:
+            conditions = await self._get_filter_conditions(session=session, **filters)
+            query = (
+                select(CompanyOrm)
+                .options(selectinload(CompanyOrm.building))
+                .where(*conditions)
+                .limit(self.settings.company_items_per_page)
+                .offset(offset)
+            )
+            companies = (await session.execute(query)).scalars().all()
+            total = (
+                await session.execute(select(func.count()).select_from(CompanyOrm).where(*conditions))
+            ).scalar_one()
+        return CompanySummaryPage(
+            items=[CompanySummary(id=c.id, name=c.name, legal_form=c.legal_form) for c in companies],
+            total=total,
+        )
+
+
+async def run_scenario(
+    db: DbManager, repo_class: type[CompanyRepository], settings: Settings, filters: dict[str, Any], iterations: int
+) -> dict:
+    statements = 0
+
+    def count_statement(*_: Any) -> None:
+        nonlocal statements
+        statements += 1
+
+    activity_tree = ActivityTreeIndex(session=db.session, ttl=settings.activity_tree_ttl)
+    repo = repo_class(session=db.session, settings=settings, activity_tree=activity_tree)
+    # warm up connections and prepared statements
+    await repo.list_filtered(**filters)
+
+    event.listen(db.engine.sync_engine, "before_cursor_execute", count_statement)
+    latencies = []
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            await repo.list_filtered(**filters)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        event.remove(db.engine.sync_engine, "before_cursor_execute", count_statement)
+    return {"round_trips": statements / iterations, **summarize(latencies)}
+
+
+async def run(iterations: int) -> dict[str, dict[str, dict]]:
+    settings = Settings()
+    db = DbManager(settings=settings)
+    modes: dict[str, tuple[type[CompanyRepository], Settings]] = {
+        "baseline": (BaselineCompanyRepository, settings),
+        "separate_count": (CompanyRepository, settings.model_copy(update={"company_list_window_count": False})),
+        "window_count": (CompanyRepository, settings.model_copy(update={"company_list_window_count": True})),
+    }
+    results: dict[str, dict[str, dict]] = {}
+    try:
+        for scenario, filters in SCENARIOS.items():
+            results[scenario] = {}
+            for mode, (repo_class, mode_settings) in modes.items():
+                results[scenario][mode] = await run_scenario(db, repo_class, mode_settings, filters, iterations)
+    finally:
+        await db.dispose()
+    return results
+
+
+def main(iterations: int, output: str | None) -> None:
+    results = asyncio.run(run(iterations))
+    print(f"{'scenario':<12} {'mode':<15} {'round trips':>11} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for scenario, modes_results in results.items():
+        for mode, r in modes_results.items():
+            print(
+                f"{scenario:<12} {mode:<15} {r['round_trips']:>11.1f} {r['mean_ms']:>9.2f} "
+                f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}"
+            )
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+    main(iterations=args.iterations, output=args.output)
@@ -0,0 +1,113 @@
+"""
+Measures per-request serialization cost of the company details and companies list responses: the previous path of
+`dataclasses.asdict`/`from_attributes` validation into response models followed by FastAPI `response_model` validation
+and JSON encoding, against direct encoding of domain objects by `api.v1.serializers`.
+
+    python -m scripts.bench_serialization --iterations 20000 --output serialization.json
+"""
+
+import argparse
+import dataclasses
+import json
+import time
+from collections.abc import Callable
+
+from pydantic import TypeAdapter
+
+from api.v1.schemas import CompanyListResponse, CompanyResponse, CompanySummaryResponse
+from api.v1.serializers import encode_companies_list, encode_company
+from domain.models import Activity, Building, Company, CompanySummary, Phone
+from scripts.bench_utils import summarize
+from usecases.company import CompaniesListUseCaseResponse
+
+
+def make_company(company_id: int) -> Company:
+    return Company(
+        id=company_id,
+        name=f"Рога и копыта {company_id}",
+        legal_form="ООО",
+        building=Building(id=company_id, address="г. Москва, ул. Ленина, д. 1", latitude=55.7558, longitude=37.6173),
+        phones=[Phone(id=company_id * 10 + i, number=f"+7 900 000-00-0{i}") for i in range(3)],
+        activities=[Activity(id=i, name=f"Деятельность {i}", parent_id=i - 1 or None) for i in range(1, 4)],
+        version=1,
+    )
+
+
+def make_list(size: int) -> CompaniesListUseCaseResponse:
+    items = [CompanySummary(id=i, name=f"Рога и копыта {i}", legal_form="ООО") for i in range(size)]
+    return CompaniesListUseCaseResponse(items=items, total=size * 100, next_cursor="eyJpZCI6MTB9")
+
+
+def fastapi_encode(adapter: TypeAdapter, content: object) -> bytes:
+    # what FastAPI does with the returned model when `response_model` is set
+    value = adapter.validate_python(content, from_attributes=True)
+    data = adapter.dump_python(value, mode="json")
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+company_response_adapter = TypeAdapter(CompanyResponse)
+company_list_response_adapter = TypeAdapter(CompanyListResponse)
+
+
+def detail_previous(company: Company) -> bytes:
+    return fastapi_encode(company_response_adapter, CompanyResponse.model_validate(dataclasses.asdict(company)))
+
+
+def list_previous(result: CompaniesListUseCaseResponse) -> bytes:
+    items = [CompanySummaryResponse.model_validate(x, from_attributes=True) for x in result.items]
+    response = CompanyListResponse(
+        items=items,
+        total=result.total,
+        next_cursor=result.next_cursor,
+        is_estimate=result.is_estimate,
+    )
+    return fastapi_encode(company_list_response_adapter, response)
+
+
+def measure(encode: Callable[[], bytes], iterations: int) -> dict[str, float]:
+    for _ in range(min(iterations, 1000)):
+        encode()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        encode()
+        timings.append(time.perf_counter() - started)
+    return {"bytes": len(encode()), **summarize(timings)}
+
+
+def main(args: argparse.Namespace) -> None:
+    company = make_company(1)
+    page = make_list(args.page_size)
+    batch = [make_company(i) for i in range(args.page_size)]
+    assert json.loads(detail_previous(company)) == json.loads(encode_company(company))
+    assert json.loads(list_previous(page)) == json.loads(encode_companies_list(page))
+
+    scenarios: dict[str, Callable[[], bytes]] = {
+        "detail_previous": lambda: detail_previous(company),
+        "detail_direct": lambda: encode_company(company),
+        "list_previous": lambda: list_previous(page),
+        "list_direct": lambda: encode_companies_list(page),
+        "detail_x_page_previous": lambda: b"".join(detail_previous(x) for x in batch),
+        "detail_x_page_direct": lambda: b"".join(encode_company(x) for x in batch),
+    }
+    results = {name: measure(encode, args.iterations) for name, encode in scenarios.items()}
+
+    print(f"{'scenario':<24} {'bytes':>7} {'mean µs':>9} {'p50 µs':>9} {'p99 µs':>9}")
+    for name, r in results.items():
+        mean, p50, p99 = (r[key] * 1000 for key in ("mean_ms", "p50_ms", "p99_ms"))
+        print(f"{name:<24} {r['bytes']:>7} {mean:>9.1f} {p50:>9.1f} {p99:>9.1f}")
+    for endpoint in ("detail", "list", "detail_x_page"):
+        speedup = results[f"{endpoint}_previous"]["mean_ms"] / results[f"{endpoint}_direct"]["mean_ms"]
+        print(f"{endpoint}: {speedup:.1f}x faster")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"page_size": args.page_size, "iterations": args.iterations, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument("--page-size", type=int, default=10, help="items of the companies list page")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    main(parser.parse_args())
@@ -0,0 +1,12 @@
+import statistics
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    """Latency summary in milliseconds"""
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
@@ -11,6 +11,7 @@ async def main() -> None:
         activities = await create_demo_activities(db=session)
         await create_demo_companies(db=session, activities=activities)
         await session.commit()
+    await db.dispose()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,206 @@
+"""
+Bulk loads a large synthetic dataset into the configured database with COPY:
+
+- activity taxonomy of `--activity-depth` levels with `--fanout` children per node
+- buildings clustered around real city centers, so geo searches hit dense and sparse areas
+- companies spread over buildings with a long tail, 1-3 activities and 0-3 phones each
+
+    python -m scripts.generate_dataset --companies 2000000 --buildings 200000 --truncate
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import random
+import time
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+
+import asyncpg
+
+from config.const import COORDS_SYSTEM_2D
+from config.settings import Settings
+from config.utils import assemble_dsn
+
+CHUNK_SIZE = 50_000
+
+# name, latitude, longitude, weight, spread in degrees
+CITIES = [
+    ("Москва", 55.7558, 37.6173, 40, 0.15),
+    ("Санкт-Петербург", 59.9343, 30.3351, 20, 0.12),
+    ("Новосибирск", 55.0084, 82.9357, 6, 0.08),
+    ("Екатеринбург", 56.8389, 60.6057, 6, 0.08),
+    ("Казань", 55.7961, 49.1064, 5, 0.07),
+    ("Нижний Новгород", 56.2965, 43.9361, 5, 0.07),
+    ("Краснодар", 45.0355, 38.9753, 4, 0.06),
+    ("Самара", 53.1959, 50.1002, 4, 0.06),
+    ("Владивосток", 43.1155, 131.8855, 2, 0.05),
+]
+STREETS = ["Ленина", "Мира", "Гагарина", "Садовая", "Центральная", "Лесная", "Школьная", "Новая", "Советская"]
+WORDS = ["Рога", "Копыта", "Альфа", "Вектор", "Север", "Гранит", "Сфера", "Стандарт", "Прогресс", "Радуга", "Техно"]
+LEGAL_FORMS = ["ООО", "ИП", "АО", "ПАО"]
+TRIGGER_TABLES = ["company", "phone", "company_activity"]
+
+
+async def csv_chunks(rows: Iterator[Sequence[object]], table: str) -> AsyncIterator[bytes]:
+    started = time.perf_counter()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    written = 0
+    for row in rows:
+        writer.writerow(row)
+        written += 1
+        if written % CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            print(f"{table}: {written:,} rows, {written / (time.perf_counter() - started):,.0f} rows/s", flush=True)
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+    print(f"{table}: {written:,} rows in {time.perf_counter() - started:.1f}s", flush=True)
+
+
+async def copy(conn: asyncpg.Connection, table: str, columns: list[str], rows: Iterator[Sequence[object]]) -> None:
+    await conn.copy_to_table(table, source=csv_chunks(rows, table), columns=columns, format="csv")
+
+
+async def next_id(conn: asyncpg.Connection, table: str) -> int:
+    return await conn.fetchval(f"SELECT coalesce(max(id), 0) + 1 FROM {table}")
+
+
+def activity_rows(first_id: int, depth: int, fanout: int) -> tuple[list[tuple[int, str, int | None]], list[int]]:
+    rows: list[tuple[int, str, int | None]] = []
+    level: list[tuple[int, str]] = [(0, "")]
+    for _ in range(depth):
+        next_level = []
+        for parent_id, parent_name in level:
+            for i in range(1, fanout + 1):
+                activity_id = first_id + len(rows)
+                name = f"{parent_name}.{i}" if parent_name else f"Деятельность {i}"
+                rows.append((activity_id, name, parent_id or None))
+                next_level.append((activity_id, name))
+        level = next_level
+    leaves = [x[0] for x in level]
+    return rows, leaves
+
+
+def building_rows(rng: random.Random, first_id: int, count: int) -> Iterator[tuple[int, str, str]]:
+    weights = [x[3] for x in CITIES]
+    for i in range(count):
+        city, lat, lng, _, spread = rng.choices(CITIES, weights=weights)[0]
+        lat, lng = rng.gauss(lat, spread), rng.gauss(lng, spread * 1.8)
+        address = f"г. {city}, ул. {rng.choice(STREETS)}, д. {rng.randint(1, 200)}"
+        yield first_id + i, address, f"SRID={COORDS_SYSTEM_2D};POINT({lng:.6f} {lat:.6f})"
+
+
+def company_rows(
+    rng: random.Random, first_id: int, count: int, building_ids: Callable[[], int]
+) -> Iterator[tuple[int, str, str, int]]:
+    for i in range(count):
+        name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {first_id + i}"
+        yield first_id + i, name, rng.choice(LEGAL_FORMS), building_ids()
+
+
+def phone_rows(rng: random.Random, first_id: int, company_ids: range) -> Iterator[tuple[int, int, str]]:
+    phone_id = first_id
+    for company_id in company_ids:
+        for _ in range(rng.choices([0, 1, 2, 3], weights=[1, 5, 3, 1])[0]):
+            digits = [rng.randint(0, 99), rng.randint(0, 999), rng.randint(0, 99), rng.randint(0, 99)]
+            number = "+7 9{:02d} {:03d}-{:02d}-{:02d}".format(*digits)
+            yield phone_id, company_id, number
+            phone_id += 1
+
+
+def company_activity_rows(
+    rng: random.Random, company_ids: range, activity_ids: list[int], leaves: list[int]
+) -> Iterator[tuple[int, int]]:
+    for company_id in company_ids:
+        # most companies are linked to the most specific activities
+        pool = leaves if rng.random() < 0.8 else activity_ids
+        for activity_id in set(rng.choices(pool, k=rng.randint(1, 3))):
+            yield company_id, activity_id
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings = Settings()
+    dsn = assemble_dsn(
+        host=settings.db_host,
+        port=settings.db_port,
+        user=settings.db_user,
+        password=settings.db_password,
+        database=settings.db_name,
+        is_async=False,
+    )
+    rng = random.Random(args.seed)
+    conn = await asyncpg.connect(dsn)
+    started = time.perf_counter()
+    try:
+        async with conn.transaction():
+            if args.truncate:
+                await conn.execute("TRUNCATE company_activity, phone, company, building, activity RESTART IDENTITY")
+            # company version triggers would update every company again for its phones and activity links
+            for table in TRIGGER_TABLES:
+                await conn.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+
+            activities, leaves = activity_rows(await next_id(conn, "activity"), args.activity_depth, args.fanout)
+            await copy(conn, "activity", ["id", "name", "parent_id"], iter(activities))
+            activity_ids = [x[0] for x in activities]
+
+            first_building = await next_id(conn, "building")
+            await copy(
+                conn,
+                "building",
+                ["id", "address", "coordinates"],
+                building_rows(rng, first_building, args.buildings),
+            )
+
+            # a few buildings host many companies, most host one or two
+            def popular_building_id() -> int:
+                return first_building + min(int(rng.paretovariate(1.2)) - 1, args.buildings - 1)
+
+            def random_building_id() -> int:
+                return popular_building_id() if rng.random() < 0.3 else first_building + rng.randrange(args.buildings)
+
+            first_company = await next_id(conn, "company")
+            company_ids = range(first_company, first_company + args.companies)
+            await copy(
+                conn,
+                "company",
+                ["id", "name", "legal_form", "building_id"],
+                company_rows(rng, first_company, args.companies, random_building_id),
+            )
+            await copy(
+                conn,
+                "phone",
+                ["id", "company_id", "number"],
+                phone_rows(rng, await next_id(conn, "phone"), company_ids),
+            )
+            await copy(
+                conn,
+                "company_activity",
+                ["company_id", "activity_id"],
+                company_activity_rows(rng, company_ids, activity_ids, leaves),
+            )
+
+            for table in TRIGGER_TABLES:
+                await conn.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+            for table in ("activity", "building", "company", "phone"):
+                await conn.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+                )
+        await conn.execute("ANALYZE activity, building, company, phone, company_activity")
+        await conn.execute("REFRESH MATERIALIZED VIEW company_map_cluster")
+    finally:
+        await conn.close()
+    print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=1_000_000)
+    parser.add_argument("--buildings", type=int, default=100_000)
+    parser.add_argument("--activity-depth", type=int, default=5)
+    parser.add_argument("--fanout", type=int, default=6, help="children per activity")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="remove existing data first")
+    asyncio.run(main(parser.parse_args()))
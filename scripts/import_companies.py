@@ -0,0 +1,97 @@
+"""
+Imports companies from NDJSON, one company per line in the format of the company details endpoint:
+
+    {"id": 1, "name": "...", "legal_form": "ООО",
+     "building": {"id": 1, "address": "...", "latitude": 55.75, "longitude": 37.61},
+     "phones": [{"id": 1, "number": "..."}], "activities": [{"id": 1, "name": "...", "parent_id": null}]}
+
+Existing companies are updated, their phones and activities are replaced with the imported ones. Parent activities
+have to be in the database or linked to a company of the same batch, otherwise the import stops at that batch, while
+earlier batches stay imported.
+
+    python -m scripts.import_companies registry.ndjson --batch-size 5000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections.abc import AsyncIterator
+from contextlib import nullcontext, suppress
+from itertools import islice
+from typing import IO
+
+from config.containers import Container
+from domain.exceptions import UnknownActivityParentError
+from domain.models import Activity, Building, Company, Phone
+
+
+def parse_company(line: str) -> Company:
+    raw = json.loads(line)
+    return Company(
+        id=raw["id"],
+        name=raw["name"],
+        legal_form=raw["legal_form"],
+        building=Building(**raw["building"]),
+        phones=[Phone(**x) for x in raw.get("phones", [])],
+        activities=[Activity(**x) for x in raw.get("activities", [])],
+    )
+
+
+async def read_companies(file: IO[str], chunk_size: int = 1000) -> AsyncIterator[Company]:
+    """
+    Lines are read by chunks in a thread, as reading stdin or a slow mount would block the event loop. The next chunk
+    is read while companies of the current one are consumed, so reading overlaps with the upsert of a batch
+    """
+
+    def read_chunk() -> list[str]:
+        return list(islice(file, chunk_size))
+
+    next_chunk = asyncio.ensure_future(asyncio.to_thread(read_chunk))
+    try:
+        while lines := await next_chunk:
+            next_chunk = asyncio.ensure_future(asyncio.to_thread(read_chunk))
+            for line in lines:
+                if line.strip():
+                    yield parse_company(line)
+    finally:
+        # a thread can not be interrupted, the pending read is waited for before the file is closed
+        with suppress(Exception):
+            await next_chunk
+
+
+async def main(args: argparse.Namespace, file: IO[str]) -> None:
+    container = Container()
+    if args.batch_size:
+        container.settings().company_import_batch_size = args.batch_size
+    db = container.db()
+    use_case = container.companies_import_uc()
+    started = time.perf_counter()
+    companies = written = 0
+    try:
+        async for report in use_case.execute(read_companies(file)):
+            companies += report.companies
+            written += report.written
+            print(
+                f"batch {report.batch}: {report.companies} companies, {report.written} written, "
+                f"{report.seconds:.2f}s, {report.companies_per_second:,.0f} companies/s",
+                flush=True,
+            )
+        await container.map_repo().refresh_clusters()
+    except UnknownActivityParentError as e:
+        sys.exit(f"import stopped after {companies} companies: {e}")
+    finally:
+        await db.dispose()
+    elapsed = time.perf_counter() - started
+    print(f"imported {companies} companies ({written} written) in {elapsed:.1f}s, {companies / elapsed:,.0f}/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="NDJSON file, - for stdin")
+    parser.add_argument("--batch-size", type=int, help="companies per transaction")
+    args = parser.parse_args()
+    # opened outside the event loop, stdin is left open
+    with nullcontext(sys.stdin) if args.path == "-" else open(args.path, encoding="utf-8") as file:
+        asyncio.run(main(args, file))
@@ -0,0 +1,28 @@
+"""
+Refreshes the precomputed map clusters of the companies, run it periodically, e.g. from cron every few minutes.
+Clusters are rebuilt without blocking concurrent reads.
+
+    python -m scripts.refresh_map_clusters
+"""
+
+import argparse
+import asyncio
+import time
+
+from config.containers import Container
+
+
+async def main() -> None:
+    container = Container()
+    db = container.db()
+    started = time.perf_counter()
+    try:
+        await container.map_repo().refresh_clusters()
+    finally:
+        await db.dispose()
+    print(f"map clusters refreshed in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+    asyncio.run(main())
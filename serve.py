@@ -0,0 +1,72 @@
+"""
+Production entry point, runs WEB_WORKERS processes (one per CPU by default) sharing the listening socket. Every
+worker has its own pool and caches, and accepts traffic once they are warmed up. Workers share metrics through
+PROMETHEUS_MULTIPROC_DIR, a temporary directory unless set, so a scrape served by any of them reports all of them.
+
+    python -m serve
+"""
+
+import os
+import signal
+import tempfile
+import time
+from pathlib import Path
+from types import FrameType
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from main import app
+
+
+class Server(uvicorn.Server):
+    """
+    On SIGTERM the worker keeps serving for `drain_delay` seconds with readiness failing, so load balancers stop
+    routing new requests to it. Then it stops accepting connections and waits for requests in flight to complete
+    """
+
+    def __init__(self, config: uvicorn.Config, drain_delay: float) -> None:
+        super().__init__(config)
+        self.drain_delay = drain_delay
+        self.drain_started: float | None = None
+
+    def handle_exit(self, sig: int, frame: FrameType | None) -> None:
+        if sig == signal.SIGTERM and self.started and self.drain_started is None:
+            self.drain_started = time.monotonic()
+            app.container.lifecycle().drain()
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        if self.drain_started is not None and time.monotonic() - self.drain_started >= self.drain_delay:
+            self.should_exit = True
+        return await super().on_tick(counter)
+
+
+def main() -> None:
+    settings = app.container.settings()
+    config = uvicorn.Config(
+        "main:app",
+        host=settings.web_host,
+        port=settings.web_port,
+        workers=settings.web_workers or os.cpu_count(),
+        timeout_graceful_shutdown=settings.web_shutdown_timeout,
+    )
+    server = Server(config, drain_delay=settings.web_drain_delay)
+    if config.workers > 1:
+        # workers are spawned, so they read the settings and the metrics directory from the environment inherited
+        # from here, before prometheus_client is imported
+        metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+        if metrics_dir:
+            # metrics of workers of a previous run would be aggregated with the new ones
+            for path in Path(metrics_dir).glob("*.db"):
+                path.unlink()
+        else:
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="metrics-")
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
+import dataclasses
 import logging
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Sequence
 from dataclasses import dataclass
 
-from domain.models import Company, CompanySummary
+from domain.cache import ICache
+from domain.models import Company, CompanySort, CompanySummary, CountMode, SearchMode
 from domain.repositories import ICompanyRepository
 
 logger = logging.getLogger(__name__)
@@ -15,6 +19,14 @@ class GetCompanyByIdUseCase:
         return await self.company_repo.get_by_id(company_id)
 
 
+class GetCompaniesByIdsUseCase:
+    def __init__(self, company_repo: ICompanyRepository):
+        self.company_repo = company_repo
+
+    async def execute(self, company_ids: Sequence[int]) -> list[Company]:
+        return await self.company_repo.get_many(company_ids)
+
+
 @dataclass
 class CompaniesListUseCaseRequest:
     building_id: int | None
@@ -29,12 +41,19 @@ class CompaniesListUseCaseRequest:
     laty: float | None
     lngy: float | None
     offset: int
+    cursor: str | None = None
+    count: CountMode = CountMode.EXACT
+    activity_depth: int = 2
+    search_mode: SearchMode = SearchMode.SUBSTRING
+    sort: CompanySort = CompanySort.ID
 
 
 @dataclass
 class CompaniesListUseCaseResponse:
     items: list[CompanySummary]
-    total: int
+    total: int | None
+    next_cursor: str | None = None
+    is_estimate: bool = False
 
 
 class CompaniesListUseCase:
@@ -42,11 +61,13 @@ class CompaniesListUseCase:
         self.company_repo = company_repo
 
     async def execute(self, request: CompaniesListUseCaseRequest) -> CompaniesListUseCaseResponse:
-        companies, total = await self.company_repo.list_filtered(
+        page = await self.company_repo.list_filtered(
             building_id=request.building_id,
             activity_id=request.activity_id,
             activity_children=request.activity_children,
+            activity_depth=request.activity_depth,
             name=request.name,
+            search_mode=request.search_mode,
             lat=request.lat,
             lng=request.lng,
             radius=request.radius,
@@ -55,5 +76,144 @@ class CompaniesListUseCase:
             laty=request.laty,
             lngy=request.lngy,
             offset=request.offset,
+            cursor=request.cursor,
+            count=request.count,
+            sort=request.sort,
+        )
+        return CompaniesListUseCaseResponse(
+            items=page.items,
+            total=page.total,
+            next_cursor=page.next_cursor,
+            is_estimate=page.is_estimate,
+        )
+
+
+class CachedCompaniesListUseCase:
+    """
+    Serves repeated searches from cache. Requests are normalized before lookup and execution, coordinates are rounded
+    to `coords_precision` decimal places, so searches around nearby points share an entry
+    """
+
+    coords_fields = ("lat", "lng", "latx", "lngx", "laty", "lngy")
+
+    def __init__(
+        self,
+        use_case: CompaniesListUseCase,
+        cache: ICache[tuple, CompaniesListUseCaseResponse],
+        coords_precision: int,
+    ):
+        self.use_case = use_case
+        self.cache = cache
+        self.coords_precision = coords_precision
+
+    async def execute(self, request: CompaniesListUseCaseRequest) -> CompaniesListUseCaseResponse:
+        request = self.normalize(request)
+        key = dataclasses.astuple(request)
+        response = self.cache.get(key)
+        if response is None:
+            response = await self.use_case.execute(request)
+            self.cache.set(key, response)
+        return response
+
+    def normalize(self, request: CompaniesListUseCaseRequest) -> CompaniesListUseCaseRequest:
+        coords = {
+            field: round(value, self.coords_precision)
+            for field in self.coords_fields
+            if (value := getattr(request, field)) is not None
+        }
+        name = request.name.strip().lower() if request.name else None
+        activity_children = request.activity_id is not None and request.activity_children
+        return dataclasses.replace(
+            request,
+            name=name or None,
+            search_mode=request.search_mode if name else CompaniesListUseCaseRequest.search_mode,
+            activity_children=activity_children,
+            activity_depth=request.activity_depth if activity_children else CompaniesListUseCaseRequest.activity_depth,
+            **coords,
+        )
+
+
+@dataclass
+class CompaniesExportUseCaseRequest:
+    building_id: int | None = None
+    activity_id: int | None = None
+    activity_children: bool = False
+    activity_depth: int = 2
+    name: str | None = None
+    search_mode: SearchMode = SearchMode.SUBSTRING
+    lat: float | None = None
+    lng: float | None = None
+    radius: int | None = None
+    latx: float | None = None
+    lngx: float | None = None
+    laty: float | None = None
+    lngy: float | None = None
+    after_id: int | None = None
+
+
+class CompaniesExportUseCase:
+    def __init__(self, company_repo: ICompanyRepository):
+        self.company_repo = company_repo
+
+    def execute(self, request: CompaniesExportUseCaseRequest) -> AsyncIterator[CompanySummary]:
+        return self.company_repo.stream_filtered(**dataclasses.asdict(request))
+
+
+@dataclass
+class CompaniesImportBatchReport:
+    batch: int
+    companies: int
+    written: int
+    seconds: float
+
+    @property
+    def companies_per_second(self) -> float:
+        return self.companies / self.seconds if self.seconds else 0.0
+
+
+class CompaniesImportUseCase:
+    """
+    Upserts companies by batches of `batch_size`, each batch is written in its own transaction. Caches of the web
+    workers are invalidated by the database notifications of the committed changes
+    """
+
+    def __init__(
+        self,
+        company_repo: ICompanyRepository,
+        batch_size: int,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.company_repo = company_repo
+        self.batch_size = batch_size
+        self.clock = clock
+
+    async def execute(self, companies: AsyncIterable[Company]) -> AsyncIterator[CompaniesImportBatchReport]:
+        batch: dict[int, Company] = {}
+        number = 0
+        async for company in companies:
+            # the same row can not be updated twice by one statement, the latest version of a company wins
+            batch[company.id] = company
+            if len(batch) >= self.batch_size:
+                number += 1
+                yield await self._write(number, list(batch.values()))
+                batch = {}
+        if batch:
+            yield await self._write(number + 1, list(batch.values()))
+
+    async def _write(self, number: int, companies: list[Company]) -> CompaniesImportBatchReport:
+        started = self.clock()
+        written = await self.company_repo.bulk_upsert(companies)
+        report = CompaniesImportBatchReport(
+            batch=number,
+            companies=len(companies),
+            written=written,
+            seconds=self.clock() - started,
+        )
+        logger.info(
+            "import batch %s: %s companies, %s written, %.0f companies/s",
+            report.batch,
+            report.companies,
+            report.written,
+            report.companies_per_second,
         )
-        return CompaniesListUseCaseResponse(items=companies, total=total)
+        return report
@@ -0,0 +1,46 @@
+import dataclasses
+from dataclasses import dataclass
+
+from domain.models import MapCluster
+from domain.repositories import IMapRepository
+
+
+@dataclass
+class MapClustersUseCaseRequest:
+    latx: float
+    lngx: float
+    laty: float
+    lngy: float
+    zoom: int
+
+
+class MapClustersUseCase:
+    def __init__(self, map_repo: IMapRepository):
+        self.map_repo = map_repo
+
+    async def execute(self, request: MapClustersUseCaseRequest) -> list[MapCluster]:
+        return await self.map_repo.clusters(
+            min_lat=min(request.latx, request.laty),
+            min_lng=min(request.lngx, request.lngy),
+            max_lat=max(request.latx, request.laty),
+            max_lng=max(request.lngx, request.lngy),
+            zoom=request.zoom,
+        )
+
+
+@dataclass
+class MapTileUseCaseRequest:
+    z: int
+    x: int
+    y: int
+    activity_id: int | None = None
+    activity_children: bool = False
+    activity_depth: int = 2
+
+
+class MapTileUseCase:
+    def __init__(self, map_repo: IMapRepository):
+        self.map_repo = map_repo
+
+    async def execute(self, request: MapTileUseCaseRequest) -> bytes:
+        return await self.map_repo.tile(**dataclasses.asdict(request))
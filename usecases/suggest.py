@@ -0,0 +1,10 @@
+from domain.models import Suggestions
+from domain.repositories import ISuggestRepository
+
+
+class SuggestUseCase:
+    def __init__(self, suggest_repo: ISuggestRepository):
+        self.suggest_repo = suggest_repo
+
+    async def execute(self, prefix: str, limit: int) -> Suggestions:
+        return await self.suggest_repo.suggest(prefix, limit)
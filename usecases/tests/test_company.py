@@ -1,11 +1,13 @@
 import dataclasses
+from collections.abc import AsyncIterator
 from unittest.mock import AsyncMock
 
 import pytest
 
 from config.containers import Container
+from domain.models import Company, CompanySummary, CompanySummaryPage, SearchMode
 from domain.tests.factories import CompanyFactory, CompanySummaryFactory
-from usecases.company import CompaniesListUseCaseResponse
+from usecases.company import CompaniesExportUseCaseRequest, CompaniesListUseCaseResponse
 from usecases.tests.factories import CompaniesListUseCaseRequestFactory
 
 
@@ -28,12 +30,21 @@ class TestGetCompanyByIdUseCase:
         assert result is None
         company_repo_mock.get_by_id.assert_awaited_once_with(id_arg)
 
+    async def test_companies_by_ids(self, container: Container, company_repo_mock: AsyncMock) -> None:
+        uc = container.get_companies_by_ids_uc()
+        companies = CompanyFactory.build_batch(size=3)
+        company_repo_mock.get_many.return_value = companies
+        ids = [x.id for x in companies]
+        result = await uc.execute(ids)
+        assert result == companies
+        company_repo_mock.get_many.assert_awaited_once_with(ids)
+
     async def test_companies_list(self, container: Container, company_repo_mock: AsyncMock) -> None:
         size = 10
         total = 15
-        uc = container.companies_list_uc()
+        uc = container.companies_list_uncached_uc()
         companies = CompanySummaryFactory.build_batch(size=size)
-        company_repo_mock.list_filtered.return_value = companies, total
+        company_repo_mock.list_filtered.return_value = CompanySummaryPage(items=companies, total=total)
         request = CompaniesListUseCaseRequestFactory()
         result = await uc.execute(request)
         expected_result = CompaniesListUseCaseResponse(
@@ -43,3 +54,92 @@ class TestGetCompanyByIdUseCase:
         assert result == expected_result
         expected_args = dataclasses.asdict(request)
         company_repo_mock.list_filtered.assert_awaited_once_with(**expected_args)
+
+
+@pytest.mark.asyncio
+class TestCachedCompaniesListUseCase:
+    async def test_repeated_request_cached(self, container: Container, company_repo_mock: AsyncMock) -> None:
+        uc = container.companies_list_uc()
+        page = CompanySummaryPage(items=CompanySummaryFactory.build_batch(size=2), total=2)
+        company_repo_mock.list_filtered.return_value = page
+        request = CompaniesListUseCaseRequestFactory()
+        result = await uc.execute(request)
+        assert result == CompaniesListUseCaseResponse(items=page.items, total=page.total)
+        assert await uc.execute(request) == result
+        company_repo_mock.list_filtered.assert_awaited_once()
+
+        await uc.execute(dataclasses.replace(request, offset=request.offset + 10))
+        assert company_repo_mock.list_filtered.await_count == 2
+
+    async def test_normalized(self, container: Container, company_repo_mock: AsyncMock) -> None:
+        uc = container.companies_list_uc()
+        settings = container.settings()
+        company_repo_mock.list_filtered.return_value = CompanySummaryPage(items=[], total=0)
+        request = CompaniesListUseCaseRequestFactory(
+            name=" Name ",
+            lat=55.75581,
+            lng=37.61731,
+            activity_id=None,
+            activity_children=True,
+            activity_depth=5,
+        )
+        await uc.execute(request)
+        await uc.execute(dataclasses.replace(request, name="name", lat=55.75582, lng=37.61729))
+        company_repo_mock.list_filtered.assert_awaited_once()
+        kwargs = company_repo_mock.list_filtered.await_args.kwargs
+        assert kwargs["name"] == "name"
+        assert kwargs["lat"] == round(55.75581, settings.company_list_cache_coords_precision)
+        assert kwargs["lng"] == round(37.61731, settings.company_list_cache_coords_precision)
+        assert kwargs["activity_children"] is False
+        assert kwargs["activity_depth"] == 2
+
+    async def test_search_mode_normalized(self, container: Container, company_repo_mock: AsyncMock) -> None:
+        uc = container.companies_list_uc()
+        company_repo_mock.list_filtered.return_value = CompanySummaryPage(items=[], total=0)
+        request = CompaniesListUseCaseRequestFactory(name=None, search_mode=SearchMode.FULLTEXT)
+        await uc.execute(request)
+        await uc.execute(dataclasses.replace(request, search_mode=SearchMode.SUBSTRING))
+        company_repo_mock.list_filtered.assert_awaited_once()
+        assert company_repo_mock.list_filtered.await_args.kwargs["search_mode"] == SearchMode.SUBSTRING
+
+        await uc.execute(dataclasses.replace(request, name="name"))
+        await uc.execute(dataclasses.replace(request, name="name", search_mode=SearchMode.SUBSTRING))
+        assert company_repo_mock.list_filtered.await_count == 3
+
+
+@pytest.mark.asyncio
+class TestCompaniesExportUseCase:
+    async def test_export(self, container: Container, company_repo_mock: AsyncMock) -> None:
+        companies = CompanySummaryFactory.build_batch(size=3)
+
+        async def stream_filtered(**kwargs: object) -> AsyncIterator[CompanySummary]:
+            for company in companies:
+                yield company
+
+        company_repo_mock.stream_filtered.side_effect = stream_filtered
+        uc = container.companies_export_uc()
+        request = CompaniesExportUseCaseRequest(activity_id=1, after_id=10)
+        result = [x async for x in uc.execute(request)]
+        assert result == companies
+        company_repo_mock.stream_filtered.assert_called_once_with(**dataclasses.asdict(request))
+
+
+@pytest.mark.asyncio
+class TestCompaniesImportUseCase:
+    async def test_import_by_batches(self, container: Container, company_repo_mock: AsyncMock) -> None:
+        container.settings().company_import_batch_size = 2
+        companies = CompanyFactory.build_batch(size=5)
+        company_repo_mock.bulk_upsert.return_value = 2
+
+        async def read() -> AsyncIterator[Company]:
+            for company in [*companies, companies[4]]:
+                yield company
+
+        uc = container.companies_import_uc()
+        reports = [x async for x in uc.execute(read())]
+        assert [(x.batch, x.companies, x.written) for x in reports] == [(1, 2, 2), (2, 2, 2), (3, 1, 2)]
+        assert [x.args[0] for x in company_repo_mock.bulk_upsert.await_args_list] == [
+            companies[:2],
+            companies[2:4],
+            companies[4:],
+        ]
@@ -0,0 +1,32 @@
+from unittest.mock import AsyncMock, create_autospec
+
+import pytest
+
+from config.containers import Container
+from domain.models import MapCluster
+from domain.repositories import IMapRepository
+from usecases.map import MapClustersUseCaseRequest, MapTileUseCaseRequest
+
+
+@pytest.mark.asyncio
+class TestMapUseCases:
+    async def test_clusters(self, container: Container) -> None:
+        map_repo_mock: AsyncMock = create_autospec(IMapRepository)
+        container.map_repo.override(map_repo_mock)
+        clusters = [MapCluster(count=3, latitude=55.75, longitude=37.61)]
+        map_repo_mock.clusters.return_value = clusters
+        request = MapClustersUseCaseRequest(latx=56.0, lngx=37.0, laty=55.0, lngy=38.0, zoom=8)
+        result = await container.map_clusters_uc().execute(request)
+        assert result == clusters
+        map_repo_mock.clusters.assert_awaited_once_with(min_lat=55.0, min_lng=37.0, max_lat=56.0, max_lng=38.0, zoom=8)
+
+    async def test_tile(self, container: Container) -> None:
+        map_repo_mock: AsyncMock = create_autospec(IMapRepository)
+        container.map_repo.override(map_repo_mock)
+        map_repo_mock.tile.return_value = b"tile"
+        request = MapTileUseCaseRequest(z=10, x=619, y=320, activity_id=1)
+        result = await container.map_tile_uc().execute(request)
+        assert result == b"tile"
+        map_repo_mock.tile.assert_awaited_once_with(
+            z=10, x=619, y=320, activity_id=1, activity_children=False, activity_depth=2
+        )
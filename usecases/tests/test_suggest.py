@@ -0,0 +1,19 @@
+from unittest.mock import AsyncMock, create_autospec
+
+import pytest
+
+from config.containers import Container
+from domain.models import NameSuggestion, Suggestions
+from domain.repositories import ISuggestRepository
+
+
+@pytest.mark.asyncio
+class TestSuggestUseCase:
+    async def test_suggest(self, container: Container) -> None:
+        suggest_repo_mock: AsyncMock = create_autospec(ISuggestRepository)
+        container.suggest_repo.override(suggest_repo_mock)
+        suggestions = Suggestions(companies=[NameSuggestion(id=1, name="Рога")], activities=[])
+        suggest_repo_mock.suggest.return_value = suggestions
+        result = await container.suggest_uc().execute("рог", 5)
+        assert result == suggestions
+        suggest_repo_mock.suggest.assert_awaited_once_with("рог", 5)